@@ -3,19 +3,26 @@
 Flask 应用主入口，定义 API 路由和应用初始化逻辑。
 """
 
+import functools
+import json
 import os
-import sqlite3
+import signal
+import sys
+import time
 
-import jwt
-from flask import Flask, request, jsonify, send_from_directory
+import click
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_apscheduler import APScheduler
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
-from services import auth_service, image_service, model_service
+from services import (
+    admission, auth_service, batch_service, crypto_session, expiry_service, http_client, image_service, job_service,
+    metrics, model_service, quota_service, schema, session_service
+)
 from services.config import Config
-from utils.sm2 import decrypt_data  # 导入加密函数
+from utils import sm2
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -29,19 +36,27 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # 初始化数据库
 def init_db():
-    """初始化数据库，创建所需表"""
-    with app.app_context():
-        db = sqlite3.connect(app.config['DATABASE'])
-        cursor = db.cursor()
-        with app.open_resource('services/schema.sql', mode='r') as f:
-             db.cursor().executescript(f.read())
-        db.commit()
-        db.close()
+    """初始化数据库结构并执行未应用的迁移"""
+    schema.migrate()
 
 
 # 初始化 Flask-Limiter 用于速率限制
+def rate_limit_key():
+    """限流键：携带有效会话令牌时为用户标识，否则为客户端 IP (同一出口 IP 下的用户互不影响)"""
+    return quota_service.client_key(optional_session_data(), get_remote_address())
+
+
+def quota_enabled():
+    """启用用户配额时，按次数的固定限制让位于配额"""
+    return quota_service.ENABLED
+
+
+# 单张与批量图片处理共用的速率限制 (作用域 'process')，批量请求按条目数计数
+PROCESS_RATE_LIMIT = "10 per minute"
+
+
 limiter = Limiter(
-    key_func=get_remote_address, # 使用客户端IP作为限流键
+    key_func=rate_limit_key,
     app=app,
     default_limits=["200 per day", "50 per hour"],
     storage_uri=app.config.get('RATELIMIT_STORAGE_URL', 'memory://') # 默认使用内存存储
@@ -53,10 +68,81 @@ scheduler = APScheduler()
 scheduler.init_app(app)
 
 
-@scheduler.task('interval', id='do_cleanup', hours=1)
+@scheduler.task('interval', id='do_cleanup', seconds=Config.EXPIRY_INTERVAL_SECONDS,
+                max_instances=1, coalesce=True)
 def cleanup_task():
-    """定时任务：每小时清理过期文件和数据库记录"""
-    image_service.cleanup_expired_files()
+    """定时任务：高频小批量清理过期文件和数据库记录"""
+    expiry_service.expire_uploads()
+
+
+@scheduler.task('interval', id='do_reconcile', hours=1, max_instances=1, coalesce=True)
+def reconcile_task():
+    """定时任务：每小时回收无数据库记录的孤儿文件并清理过期任务记录"""
+    expiry_service.reconcile_orphans()
+    job_service.purge_expired_jobs()
+    session_service.purge_expired_revocations()
+    app.logger.info(f"清理统计: {expiry_service.get_stats()}")
+
+
+def warm_caches():
+    """启动时从 SQLite 预热翻译缓存，并按配置预置常用提示词的翻译"""
+    try:
+        loaded = model_service.warm_translation_cache()
+        app.logger.info(f"已预热 {loaded} 条翻译缓存")
+        seed_path = app.config['TRANSLATION_CACHE_SEED_FILE']
+        if seed_path:
+            seeded, failed = model_service.seed_translation_cache(seed_path)
+            app.logger.info(f"已预置 {seeded} 条翻译缓存，失败 {failed} 条")
+    except Exception as e:
+        app.logger.error(f"预热翻译缓存时出错: {e}")
+
+
+if metrics.ENABLED:
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        g.metrics_start = time.perf_counter()
+        metrics.HTTP_IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+
+    @app.after_request
+    def record_request_metrics(response):
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - g.metrics_start,
+            endpoint=g.metrics_endpoint, method=request.method, status=response.status_code
+        )
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        if 'metrics_endpoint' in g:
+            metrics.HTTP_IN_FLIGHT.dec(endpoint=g.metrics_endpoint)
+
+
+@app.cli.command('seed-translations')
+@click.argument('seed_path')
+def seed_translations_command(seed_path):
+    """从文件预置常用提示词的翻译缓存：flask --app app seed-translations prompts.jsonl"""
+    init_db()
+    seeded, failed = model_service.seed_translation_cache(seed_path)
+    click.echo(f"已预置 {seeded} 条翻译缓存，失败 {failed} 条")
+
+
+@app.cli.command('revoke-token')
+@click.argument('token')
+def revoke_token_command(token):
+    """吊销单个会话令牌：flask --app app revoke-token <JWT>"""
+    init_db()
+    session_service.revoke_token(token)
+    click.echo("已吊销会话令牌")
+
+
+@app.cli.command('revoke-user')
+@click.argument('github_id')
+def revoke_user_command(github_id):
+    """吊销用户此前签发的全部会话令牌：flask --app app revoke-user <GitHub 用户 ID>"""
+    init_db()
+    session_service.revoke_user(auth_service.hash_identifier(github_id))
+    click.echo("已吊销该用户的全部会话令牌")
 
 
 # --- 辅助函数 ---
@@ -67,18 +153,133 @@ def get_session_data():
     :return: JWT 载荷 (payload) 字典
     :raises PermissionError: 如果令牌缺失、格式错误或已过期/无效
     """
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        raise PermissionError("缺少或无效的 Authorization 头")
-    token = auth_header.split(' ')[1]
+    token = session_service.bearer_token(request.headers.get('Authorization'))
+    # 校验结果有缓存，并检查令牌是否已被吊销
+    return session_service.verify_token(token)  # 返回包含 identifier 和 github_login 的载荷
+
+
+def optional_session_data():
+    """
+    获取会话数据，未登录或令牌无效时返回 None (用于不强制登录的接口)。
+    """
+    if 'session_data' not in g:
+        try:
+            g.session_data = get_session_data()
+        except PermissionError:
+            g.session_data = None
+    return g.session_data
+
+
+def charge_quota(operation, session_data=None, units=1):
+    """
+    按操作成本扣减当前用户 (未登录时为客户端 IP) 的配额。
+    :raises quota_service.QuotaExceededError: 如果超出配额
+    """
+    quota_service.charge(quota_service.client_key(session_data, get_remote_address()), operation, units)
+
+
+def quota_exceeded(e):
+    """超出配额时的 429 响应"""
+    return jsonify({'error': str(e), 'retry_after': e.retry_after}), 429, {'Retry-After': str(e.retry_after)}
+
+
+def overloaded(e):
+    """上游过载、未被准入时的 503 响应"""
+    return jsonify({'error': str(e), 'retry_after': e.retry_after}), 503, {'Retry-After': str(e.retry_after)}
+
+
+def require_session(view):
+    """
+    路由装饰器：校验会话后将 JWT 载荷作为 session_data 参数传给视图函数，会话无效时返回 403。
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            session_data = get_session_data()
+        except PermissionError as e:
+            return jsonify({'error': str(e)}), 403
+        return view(*args, session_data=session_data, **kwargs)
+    return wrapper
+
+
+def wants_async():
+    """
+    判断本次 /api/process 请求是否以异步任务方式处理。
+    """
+    flag = request.args.get('async') or request.form.get('async')
+    if flag is None:
+        return app.config['PROCESS_ASYNC_DEFAULT']
+    return flag.lower() in ('1', 'true', 'yes')
+
+
+def wants_stream():
+    """
+    判断客户端是否请求以 SSE 方式推送结果 (Accept: text/event-stream 或 stream=1)。
+    """
+    return request.args.get('stream') == '1' or 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def event_stream(events):
+    """
+    将产出 SSE 文本的生成器包装为流式响应。
+    """
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def sse_event(event, data):
+    """
+    格式化一条 SSE 事件。
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def batch_encrypted_prompts():
+    """
+    批量请求的加密提示词列表：prompts 可重复，或为 JSON 数组字符串；未提供时使用 prompt。
+    :raises ValueError: 如果 JSON 数组格式错误
+    """
+    encrypted_prompts = request.form.getlist('prompts')
+    if len(encrypted_prompts) == 1 and encrypted_prompts[0].lstrip().startswith('['):
+        encrypted_prompts = json.loads(encrypted_prompts[0])
+    if not encrypted_prompts and request.form.get('prompt'):
+        encrypted_prompts = [request.form['prompt']]
+    return encrypted_prompts
+
+
+def batch_item_count():
+    """
+    批量请求计入图片处理速率限制的次数：条目数，至少为 1，至多为 BATCH_MAX_ITEMS (超出的请求随后被拒绝)。
+    """
+    files = [f for f in request.files.getlist('image') if f.filename]
     try:
-        # 解码 JWT 令牌
-        payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        return payload  # 返回包含 identifier 和 github_login 的载荷
-    except jwt.ExpiredSignatureError:
-        raise PermissionError("会话已过期")
-    except jwt.InvalidTokenError:
-        raise PermissionError("无效的会话令牌")
+        count = max(len(files), len(batch_encrypted_prompts()))
+    except ValueError:
+        count = 1
+    return min(max(count, 1), app.config['BATCH_MAX_ITEMS'])
+
+
+def run_process_job(file_path, prompt, content_hash=None):
+    """
+    执行图片处理，同步请求与异步任务共用。
+    :return: 返回给前端的结果字典
+    """
+    # 调用模型服务处理图片 (内部包含合规检查和结果缓存)
+    return model_service.call_bailian(file_path, prompt, content_hash)
+
+
+def get_owned_job(job_id, session_data):
+    """
+    获取当前会话用户所属的任务。
+    :raises LookupError: 如果任务不存在或不属于当前用户
+    """
+    job = job_service.get_job(job_id)
+    if job is None or job['owner'] != session_data.get('identifier'):
+        raise LookupError("任务不存在或已过期")
+    return job
 
 
 # --- API 路由 ---
@@ -89,6 +290,15 @@ def index():
     return "图像处理后端服务正在运行。"
 
 
+@app.route('/metrics')
+@limiter.exempt
+def metrics_endpoint():
+    """以 Prometheus 文本格式输出本进程的指标 (METRICS_ENABLED 关闭时返回 404)"""
+    if not metrics.ENABLED:
+        return jsonify({'error': '指标未启用'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 # 1. 获取 GitHub 授权 URL
 @app.route('/api/auth/github', methods=['GET'])
 @limiter.limit("10 per minute") # 速率限制：每分钟最多10次
@@ -139,10 +349,12 @@ def github_callback():
 
 # 3. 提示词翻译
 @app.route('/api/translate', methods=['POST'])
-@limiter.limit("20 per minute") # 速率限制：每分钟最多20次
+@limiter.limit("20 per minute", exempt_when=quota_enabled) # 未启用配额时：每分钟最多20次
 def translate_prompt():
     """
     接收加密的中文提示词，进行解密、合规检查、翻译，返回加密的英文提示词。
+    请求头 Accept 包含 text/event-stream (或 stream=1) 时以 SSE 逐段推送译文：
+    delta 事件 {'text': 片段}，结束时 done 事件 {'en_prompt': 完整译文}，出错时 error 事件 {'error': ...}。
     """
     try:
         # 从请求体获取 JSON 数据
@@ -150,9 +362,15 @@ def translate_prompt():
         encrypted_prompt = data.get('prompt')
         if not encrypted_prompt:
             return jsonify({'error': '缺少提示词'}), 400
+        # 翻译无需登录，携带有效会话令牌时计入用户配额，否则计入客户端 IP
+        charge_quota('translate', optional_session_data())
 
-        # SM2 解密提示词
-        prompt = decrypt_data(encrypted_prompt)
+        # 解密提示词 (SM2 密文或加密会话的 SM4 密文)
+        prompt = crypto_session.decrypt_prompt(encrypted_prompt)
+
+        if wants_stream():
+            # 合规检查在此同步完成，开始推送后只可能出现翻译错误
+            return event_stream(translation_events(model_service.stream_translation(prompt)))
 
         # 调用模型服务进行翻译 (内部包含合规检查)
         en_prompt = model_service.call_silicon_flow_qwen3(prompt)
@@ -163,15 +381,38 @@ def translate_prompt():
 
         return jsonify({'en_prompt': en_prompt}), 200
 
+    except quota_service.QuotaExceededError as e:
+        return quota_exceeded(e)
     except PermissionError as e:
         return jsonify({'error': str(e)}), 403  # 会话过期/无效 或 内容不合规
     except ValueError as e:  # 合规检查失败或翻译失败
         return jsonify({'error': str(e)}), 400
+    except http_client.CircuitOpenError as e:  # 上游熔断中
+        return jsonify({'error': str(e)}), 503
+    except admission.OverloadedError as e:  # 上游繁忙，未被准入
+        return overloaded(e)
     except Exception as e:
         app.logger.error(f"翻译提示词时出错: {e}")
         return jsonify({'error': '翻译失败'}), 500
 
 
+def translation_events(chunks):
+    """
+    将译文片段转换为 SSE 事件。
+    """
+    parts = []
+    try:
+        for text in chunks:
+            parts.append(text)
+            yield sse_event('delta', {'text': text})
+        yield sse_event('done', {'en_prompt': ''.join(parts)})
+    except (ValueError, admission.OverloadedError) as e:
+        yield sse_event('error', {'error': str(e)})
+    except Exception as e:
+        app.logger.error(f"流式翻译提示词时出错: {e}")
+        yield sse_event('error', {'error': '翻译失败'})
+
+
 # 4. 静态文件服务 (用于访问上传的图片)
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
@@ -185,14 +426,15 @@ def uploaded_file(filename):
 
 # 5. 图片处理
 @app.route('/api/process', methods=['POST'])
-@limiter.limit("10 per minute") # 速率限制：每分钟最多10次
-def process_image():
+# 未启用配额时：与批量处理合计每分钟最多10个条目
+@limiter.shared_limit(PROCESS_RATE_LIMIT, scope='process', exempt_when=quota_enabled)
+@require_session
+def process_image(session_data):
     """
-    接收图片和加密提示词，进行解密、图片处理，返回处理后图片的 Base64 编码。
+    接收图片和加密提示词，进行解密、图片处理，返回处理后图片 (Base64 编码或结果文件 URL)。
     """
     try:
-        # 验证会话并获取用户信息
-        session_data = get_session_data()  # 获取完整session数据
+        # 获取会话中的用户信息
         hashed_identifier = session_data.get('identifier')
         github_login = session_data.get('github_login', 'unknown_user')
 
@@ -213,42 +455,241 @@ def process_image():
 
         if not encrypted_prompt:
             return jsonify({'error': '缺少提示词'}), 400
+        charge_quota('process', session_data)
 
-        # SM2 解密提示词
-        prompt = decrypt_data(encrypted_prompt)
-
-        # 保存临时文件
-        filename, file_path, file_url_path = image_service.save_temp_image(file)
-        # image_url = f"{request.host_url.rstrip('/')}{file_url_path}" # 本地文件路径，非必需
-
-        # 调用模型服务处理图片 (内部包含合规检查)
-        result_b64 = model_service.call_bailian(file_path, prompt)
+        # 解密提示词 (SM2 密文或加密会话的 SM4 密文)
+        prompt = crypto_session.decrypt_prompt(encrypted_prompt)
 
-        # 保存上传记录到数据库 (使用 GitHub ID)
-        conn = sqlite3.connect(app.config['DATABASE'])
-        cursor = conn.cursor()
-        # 可以选择存储 github_login 以便查询
-        cursor.execute(
-            "INSERT INTO image_uploads (phone, filename, path) VALUES (?, ?, ?)",
-            (hashed_identifier, f"{github_login}_{filename}", file_path)  # 示例：在文件名前加用户名
+        # 保存临时文件 (按内容去重)，并记录上传到数据库 (使用 GitHub ID)
+        filename, file_path, file_url_path, content_hash = image_service.save_temp_image(
+            file, hashed_identifier, github_login
         )
-        conn.commit()
-        conn.close()
-
-        return jsonify({'result': result_b64}), 200
+        # image_url = f"{request.host_url.rstrip('/')}{file_url_path}" # 本地文件路径，非必需
 
+        if wants_async():
+            # 入队后立即返回任务 ID，由工作线程池执行
+            job_id = job_service.submit_job(
+                hashed_identifier, run_process_job, file_path, prompt, content_hash
+            )
+            return jsonify({
+                'job_id': job_id,
+                'status': job_service.JOB_PENDING,
+                'status_url': f"/api/jobs/{job_id}",
+                'events_url': f"/api/jobs/{job_id}/events"
+            }), 202
+
+        return jsonify(run_process_job(file_path, prompt, content_hash)), 200
+
+    except quota_service.QuotaExceededError as e:
+        return quota_exceeded(e)
     except PermissionError as e:
         return jsonify({'error': str(e)}), 403  # 会话过期/无效 或 内容不合规
     except ValueError as e:  # 文件类型/大小错误, 模型调用错误
         return jsonify({'error': str(e)}), 400
+    except job_service.JobQueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    except http_client.CircuitOpenError as e:
+        return jsonify({'error': str(e)}), 503
+    except admission.OverloadedError as e:
+        return overloaded(e)
     except Exception as e:
         app.logger.error(f"处理图片时出错: {e}")
         return jsonify({'error': '图片处理失败'}), 500
 
 
-if __name__ == '__main__':
+# 6. 查询图片处理任务状态
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@require_session
+def get_job_status(job_id, session_data):
+    """
+    轮询异步任务的状态，任务完成后返回与同步接口相同的结果字段。
+    """
+    try:
+        job = get_owned_job(job_id, session_data)
+        return jsonify(job_service.public_view(job)), 200
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        app.logger.error(f"查询任务状态时出错: {e}")
+        return jsonify({'error': '查询任务状态失败'}), 500
+
+
+# 7. 以 SSE 推送图片处理任务状态
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+@require_session
+def stream_job_events(job_id, session_data):
+    """
+    以 Server-Sent Events 推送任务状态变化，任务结束或超时后关闭连接。
+    """
+    try:
+        job = get_owned_job(job_id, session_data)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+
+    def generate(job):
+        deadline = time.monotonic() + app.config['JOB_EVENTS_TIMEOUT']
+        last_seen = None
+        while job is not None:
+            if job['updated_at'] != last_seen:
+                last_seen = job['updated_at']
+                yield sse_event(job['status'], job_service.public_view(job))
+            else:
+                yield ": keep-alive\n\n"  # 心跳，防止代理断开空闲连接
+            if job['status'] in job_service.FINISHED_STATES or time.monotonic() >= deadline:
+                return
+            job = job_service.wait_for_update(job_id, last_seen, timeout=15)
+
+    return event_stream(generate(job))
+
+
+# 8. 批量图片处理 (一张图片 + 多个提示词，或多张图片 + 一个提示词)
+@app.route('/api/process/batch', methods=['POST'])
+@limiter.limit("5 per minute", exempt_when=quota_enabled)
+# 每个条目计一次，与单张图片处理共用限制
+@limiter.shared_limit(PROCESS_RATE_LIMIT, scope='process', exempt_when=quota_enabled, cost=batch_item_count)
+@require_session
+def process_image_batch(session_data):
+    """
+    一次请求完成多个图片编辑，上传、解密与会话校验只进行一次。
+    表单字段：image (可重复)，prompts (可重复，或 JSON 数组字符串) 或 prompt。
+    请求头 Accept 包含 text/event-stream (或 stream=1) 时以 SSE 按完成顺序逐条推送结果，
+    否则处理完毕后按条目顺序返回 {'items': [...]}。
+    """
+    try:
+        hashed_identifier = session_data.get('identifier')
+        github_login = session_data.get('github_login', 'unknown_user')
+
+        files = [f for f in request.files.getlist('image') if f.filename]
+        if not files:
+            return jsonify({'error': '未提供图片文件'}), 400
+        encrypted_prompts = batch_encrypted_prompts()
+        if not encrypted_prompts or not all(encrypted_prompts):
+            return jsonify({'error': '缺少提示词'}), 400
+        if len(files) > 1 and len(encrypted_prompts) > 1:
+            return jsonify({'error': '多张图片时只能提供一个提示词'}), 400
+        if max(len(files), len(encrypted_prompts)) > app.config['BATCH_MAX_ITEMS']:
+            return jsonify({'error': f"单次最多处理 {app.config['BATCH_MAX_ITEMS']} 个条目"}), 400
+        # 按条目数计费
+        charge_quota('process', session_data, max(len(files), len(encrypted_prompts)))
+
+        # 相同密文只解密一次
+        decrypted = {}
+        for encrypted_prompt in encrypted_prompts:
+            if encrypted_prompt not in decrypted:
+                decrypted[encrypted_prompt] = crypto_session.decrypt_prompt(encrypted_prompt)
+        prompts = [decrypted[encrypted_prompt] for encrypted_prompt in encrypted_prompts]
+        saved = [image_service.save_temp_image(f, hashed_identifier, github_login) for f in files]
+        if len(saved) == 1:
+            items = [(saved[0][1], prompt, saved[0][3]) for prompt in prompts]
+        else:
+            items = [(file_path, prompts[0], content_hash) for _, file_path, _, content_hash in saved]
+    except quota_service.QuotaExceededError as e:
+        return quota_exceeded(e)
+    except ValueError as e:  # 文件类型/大小错误, 提示词格式错误
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"处理批量图片请求时出错: {e}")
+        return jsonify({'error': '图片处理失败'}), 500
+
+    results = batch_service.run_batch(items)
+    if wants_stream():
+        def generate():
+            for item in results:
+                yield sse_event('item', item)
+            yield sse_event('done', {'count': len(items)})
+
+        return event_stream(generate())
+    return jsonify({'items': sorted(results, key=lambda item: item['index'])}), 200
+
+
+# 9. 批量合规检查
+@app.route('/api/compliance/batch', methods=['POST'])
+@limiter.limit("10 per minute", exempt_when=quota_enabled)
+@require_session
+def compliance_batch(session_data):
+    """
+    接收加密的提示词列表 {'prompts': [...]}，批量进行合规检查，
+    按输入顺序返回 {'verdicts': ['ALLOWED' | 'DISALLOWED' | null, ...]} (null 表示检查失败)。
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        encrypted_prompts = data.get('prompts')
+        if not isinstance(encrypted_prompts, list) or not encrypted_prompts:
+            return jsonify({'error': '缺少提示词'}), 400
+        if len(encrypted_prompts) > app.config['COMPLIANCE_BATCH_MAX_ITEMS']:
+            return jsonify({'error': f"单次最多检查 {app.config['COMPLIANCE_BATCH_MAX_ITEMS']} 条提示词"}), 400
+        charge_quota('compliance', session_data, len(encrypted_prompts))
+
+        prompts = [crypto_session.decrypt_prompt(encrypted_prompt) for encrypted_prompt in encrypted_prompts]
+        verdicts = model_service.compliance_check_batch(prompts)
+        return jsonify({'verdicts': verdicts}), 200
+
+    except quota_service.QuotaExceededError as e:
+        return quota_exceeded(e)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"批量合规检查时出错: {e}")
+        return jsonify({'error': '合规检查失败'}), 500
+
+
+# 10. 建立加密会话 (SM2 密钥交换)
+@app.route('/api/crypto/session', methods=['POST'])
+@limiter.limit("10 per minute")
+@require_session
+def create_crypto_session(session_data):
+    """
+    接收 SM2 加密的会话密钥 {'key': ...}，返回 {'session_id': ..., 'expires_in': 秒数}。
+    之后的提示词可以 sm4:<session_id>:... 格式提交，会话过期后重新交换密钥。
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        encrypted_key = data.get('key')
+        if not encrypted_key:
+            return jsonify({'error': '缺少会话密钥'}), 400
+        session_id, expires_in = crypto_session.create_session(encrypted_key, session_data.get('identifier'))
+        return jsonify({'session_id': session_id, 'expires_in': expires_in}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"建立加密会话时出错: {e}")
+        return jsonify({'error': '建立加密会话失败'}), 500
+
+
+# 11. 退出登录 (吊销当前会话令牌)
+@app.route('/api/auth/logout', methods=['POST'])
+@require_session
+def logout(session_data):
+    """
+    吊销请求中的会话令牌，之后使用该令牌的请求均返回 403。
+    """
+    try:
+        session_service.revoke_token(session_service.bearer_token(request.headers.get('Authorization')))
+        return jsonify({'message': '已退出登录'}), 200
+    except ValueError as e:  # 旧版令牌不包含 jti
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"退出登录时出错: {e}")
+        return jsonify({'error': '退出登录失败'}), 500
+
+
+def create_app():
+    """
+    执行启动初始化并返回应用。导入本模块不做初始化 (进程池子进程、flask 命令等导入时没有副作用)，
+    WSGI 部署时使用 app:create_app() 作为入口。
+    """
     init_db()  # 初始化数据库
+    sm2.get_decryptor()  # 完成 SM2 私钥预计算，密钥无效时启动即失败
+    warm_caches()
+    return app
+
+
+if __name__ == '__main__':
+    # 收到 SIGTERM 时正常退出，使进程池等资源在退出时得到清理
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    create_app()
     scheduler.start()  # 启动定时任务
     # 注意：生产环境不要使用 debug=True
-    app.run(debug=False, host='0.0.0.0', port=5001)
+    app.run(debug=False, host='0.0.0.0', port=Config.SERVER_PORT)
 
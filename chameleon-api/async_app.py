@@ -0,0 +1,639 @@
+# /async_app.py
+"""
+异步服务模式入口 (aiohttp)，提供与 app.py 相同的路由和响应结构，前端无需修改。
+模型与 GitHub 调用使用异步 HTTP 客户端，单个进程即可同时挂起大量进行中的上游调用；
+SM2 解密、图片处理、SQLite 读写等阻塞操作交给线程池执行。
+启动：python async_app.py
+"""
+
+import functools
+import json
+import logging
+import os
+import time
+
+from aiohttp import web
+from apscheduler.schedulers.background import BackgroundScheduler
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from werkzeug.datastructures import FileStorage
+from werkzeug.security import safe_join
+
+from services import (
+    admission, async_auth_service, async_http_client, async_model_service, auth_service, batch_service,
+    crypto_session, expiry_service, http_client, image_service, job_service, metrics, model_service, quota_service,
+    schema, session_service
+)
+from services.async_model_service import run_blocking
+from services.config import Config
+from utils import sm2
+
+logger = logging.getLogger(__name__)
+
+# 与 app.py 的 Flask-Limiter 配置保持一致：按用户标识 (未登录时为客户端 IP) 和路由计数，未单独指定的路由使用默认限制
+_rate_limiter = FixedWindowRateLimiter(storage_from_string(Config.RATELIMIT_STORAGE_URL))
+DEFAULT_LIMITS = [(parse("200 per day"), None, None, None), (parse("50 per hour"), None, None, None)]
+
+routes = web.RouteTableDef()
+
+
+def rate_limit(limit, exempt_when=None, scope=None, cost=None):
+    """
+    为路由指定速率限制，例如 @rate_limit("10 per minute")；None 表示不限制。可叠加多个限制。
+    :param exempt_when: 返回 True 时跳过该限制 (同 Flask-Limiter 的 exempt_when)
+    :param scope: 共享限制的作用域，作用域相同的路由共用计数 (同 Flask-Limiter 的 shared_limit)；缺省按路由计数
+    :param cost: 每次请求计入的次数，为以请求为参数的协程函数；缺省为 1
+    """
+    def decorator(handler):
+        limits = getattr(handler, 'rate_limits', [])
+        handler.rate_limits = limits + [(parse(limit), exempt_when, scope, cost)] if limit else limits
+        return handler
+    return decorator
+
+
+def quota_enabled():
+    """启用用户配额时，按次数的固定限制让位于配额"""
+    return quota_service.ENABLED
+
+
+# 单张与批量图片处理共用的速率限制 (作用域 'process')，批量请求按条目数计数
+PROCESS_RATE_LIMIT = "10 per minute"
+
+
+@web.middleware
+async def rate_limit_middleware(request, handler):
+    if Config.RATELIMIT_ENABLED and request.method != 'OPTIONS':
+        endpoint = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        key = quota_service.client_key(await optional_session_data(request), request.remote)
+        for item, exempt_when, scope, cost in getattr(handler, 'rate_limits', DEFAULT_LIMITS):
+            if exempt_when and exempt_when():
+                continue
+            amount = await cost(request) if cost else 1
+            if not await run_blocking(_rate_limiter.hit, item, scope or endpoint, key, cost=amount):
+                return web.json_response({'error': f"请求过于频繁: {item}"}, status=429)
+    return await handler(request)
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """与 Flask-CORS 默认配置一致：允许任意来源，并处理预检请求"""
+    if request.method == 'OPTIONS' and 'Access-Control-Request-Method' in request.headers:
+        return web.Response(headers={
+            'Access-Control-Allow-Methods': request.headers['Access-Control-Request-Method'],
+            'Access-Control-Allow-Headers': request.headers.get('Access-Control-Request-Headers', '*'),
+        })
+    return await handler(request)
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """记录接口请求耗时与进行中的请求数 (流式响应统计到处理函数返回，即推送结束)"""
+    resource = request.match_info.route.resource
+    endpoint = resource.canonical if resource else 'unmatched'
+    start = time.perf_counter()
+    status = 500
+    with metrics.HTTP_IN_FLIGHT.track_inprogress(endpoint=endpoint):
+        try:
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start, endpoint=endpoint, method=request.method, status=status
+            )
+
+
+async def add_cors_headers(request, response):
+    # 在响应发送前添加，流式响应同样适用
+    response.headers['Access-Control-Allow-Origin'] = '*'
+
+
+# --- 辅助函数 ---
+
+async def get_session_data(request):
+    """
+    从请求头的 Authorization Bearer Token 中获取并验证 JWT 会话数据。
+    校验 (签名验证、吊销查询) 在线程池中执行，不阻塞事件循环。
+    :raises PermissionError: 如果令牌缺失、格式错误或已过期/无效
+    """
+    token = session_service.bearer_token(request.headers.get('Authorization'))
+    # 校验结果缓存在内存中，吊销检查只在布隆过滤器命中或定期同步时读取存储
+    return await run_blocking(session_service.verify_token, token)
+
+
+async def optional_session_data(request):
+    """获取会话数据，未登录或令牌无效时返回 None (用于不强制登录的接口)"""
+    try:
+        return await get_session_data(request)
+    except PermissionError:
+        return None
+
+
+async def charge_quota(request, operation, session_data=None, units=1):
+    """
+    按操作成本扣减当前用户 (未登录时为客户端 IP) 的配额。
+    :raises quota_service.QuotaExceededError: 如果超出配额
+    """
+    key = quota_service.client_key(session_data, request.remote)
+    await run_blocking(quota_service.charge, key, operation, units)
+
+
+def quota_exceeded(e):
+    """超出配额时的 429 响应"""
+    return web.json_response({'error': str(e), 'retry_after': e.retry_after}, status=429,
+                             headers={'Retry-After': str(e.retry_after)})
+
+
+def overloaded(e):
+    """上游过载、未被准入时的 503 响应"""
+    return web.json_response({'error': str(e), 'retry_after': e.retry_after}, status=503,
+                             headers={'Retry-After': str(e.retry_after)})
+
+
+def require_session(handler):
+    """路由装饰器：校验会话后将 JWT 载荷作为 session_data 参数传给处理函数，会话无效时返回 403"""
+    @functools.wraps(handler)
+    async def wrapper(request):
+        try:
+            session_data = await get_session_data(request)
+        except PermissionError as e:
+            return error(str(e), 403)
+        return await handler(request, session_data)
+    return wrapper
+
+
+def error(message, status):
+    return web.json_response({'error': message}, status=status)
+
+
+def wants_stream(request):
+    """判断客户端是否请求以 SSE 方式推送结果 (Accept: text/event-stream 或 stream=1)"""
+    return request.query.get('stream') == '1' or 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def sse_event(event, data):
+    """格式化一条 SSE 事件"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+async def event_stream(request, events):
+    """
+    将产出 SSE 文本的异步生成器写入流式响应。
+    """
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    await response.prepare(request)
+    async for chunk in events:
+        await response.write(chunk)
+    await response.write_eof()
+    return response
+
+
+async def iterate_blocking(iterator):
+    """在线程池中逐项消费同步迭代器"""
+    sentinel = object()
+    while True:
+        item = await run_blocking(next, iterator, sentinel)
+        if item is sentinel:
+            return
+        yield item
+
+
+def to_file_storage(field):
+    """将 aiohttp 的上传字段转换为 image_service 使用的 FileStorage"""
+    return FileStorage(stream=field.file, filename=field.filename, content_type=field.content_type)
+
+
+def upload_fields(form, name):
+    return [field for field in form.getall(name, []) if isinstance(field, web.FileField) and field.filename]
+
+
+def batch_encrypted_prompts(form):
+    """
+    批量请求的加密提示词列表：prompts 可重复，或为 JSON 数组字符串；未提供时使用 prompt。
+    :raises ValueError: 如果 JSON 数组格式错误
+    """
+    encrypted_prompts = form.getall('prompts', [])
+    if len(encrypted_prompts) == 1 and encrypted_prompts[0].lstrip().startswith('['):
+        encrypted_prompts = json.loads(encrypted_prompts[0])
+    if not encrypted_prompts and form.get('prompt'):
+        encrypted_prompts = [form['prompt']]
+    return encrypted_prompts
+
+
+async def batch_item_count(request):
+    """
+    批量请求计入图片处理速率限制的次数：条目数，至少为 1，至多为 BATCH_MAX_ITEMS (超出的请求随后被拒绝)。
+    表单解析结果由 aiohttp 缓存，处理函数再次读取时不重复解析。
+    """
+    form = await request.post()
+    try:
+        count = max(len(upload_fields(form, 'image')), len(batch_encrypted_prompts(form)))
+    except ValueError:
+        count = 1
+    return min(max(count, 1), Config.BATCH_MAX_ITEMS)
+
+
+async def get_owned_job(request, session_data):
+    """
+    获取当前会话用户所属的任务。
+    :raises LookupError: 如果任务不存在或不属于当前用户
+    """
+    job = await run_blocking(job_service.get_job, request.match_info['job_id'])
+    if job is None or job['owner'] != session_data.get('identifier'):
+        raise LookupError("任务不存在或已过期")
+    return job
+
+
+# --- API 路由 ---
+
+@routes.get('/')
+async def index(request):
+    """根路径，返回服务运行状态"""
+    return web.Response(text="图像处理后端服务正在运行。")
+
+
+@routes.get('/metrics')
+@rate_limit(None)
+async def metrics_endpoint(request):
+    """以 Prometheus 文本格式输出本进程的指标 (METRICS_ENABLED 关闭时返回 404)"""
+    if not metrics.ENABLED:
+        return error('指标未启用', 404)
+    return web.Response(
+        body=metrics.render().encode('utf-8'), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    )
+
+
+# 1. 获取 GitHub 授权 URL
+@routes.get('/api/auth/github')
+@rate_limit("10 per minute")
+async def github_auth(request):
+    try:
+        return web.json_response({'auth_url': auth_service.get_github_authorize_url()})
+    except Exception as e:
+        logger.error(f"获取 GitHub 授权 URL 时出错: {e}")
+        return error('获取 GitHub 授权 URL 失败', 500)
+
+
+# 2. GitHub OAuth2 回调处理
+@routes.post('/api/auth/github/callback')
+async def github_callback(request):
+    try:
+        data = await request.json()
+        if not data:
+            return error('缺少 JSON 数据', 400)
+        code = data.get('code')
+        if not code:
+            return error('缺少授权码', 400)
+        jwt_token, github_login = await async_auth_service.verify_github_login(code)
+        return web.json_response({'token': jwt_token, 'identifier': github_login, 'message': '登录成功'})
+    except Exception as e:
+        logger.error(f"处理 GitHub 回调时出错: {e}")
+        return error(str(e), 400)
+
+
+# 3. 提示词翻译
+@routes.post('/api/translate')
+@rate_limit("20 per minute", exempt_when=quota_enabled)
+async def translate_prompt(request):
+    try:
+        data = await request.json()
+        encrypted_prompt = data.get('prompt')
+        if not encrypted_prompt:
+            return error('缺少提示词', 400)
+        await charge_quota(request, 'translate', await optional_session_data(request))
+        prompt = await run_blocking(crypto_session.decrypt_prompt, encrypted_prompt)
+
+        if not wants_stream(request):
+            en_prompt = await async_model_service.call_silicon_flow_qwen3(prompt)
+            return web.json_response({'en_prompt': en_prompt})
+        # 合规检查在此完成，开始推送后只可能出现翻译错误
+        chunks = await async_model_service.stream_translation(prompt)
+    except quota_service.QuotaExceededError as e:
+        return quota_exceeded(e)
+    except PermissionError as e:
+        return error(str(e), 403)
+    except ValueError as e:
+        return error(str(e), 400)
+    except http_client.CircuitOpenError as e:
+        return error(str(e), 503)
+    except admission.OverloadedError as e:
+        return overloaded(e)
+    except Exception as e:
+        logger.error(f"翻译提示词时出错: {e}")
+        return error('翻译失败', 500)
+
+    return await event_stream(request, translation_events(chunks))
+
+
+async def translation_events(chunks):
+    """将译文片段转换为 SSE 事件"""
+    parts = []
+    try:
+        async for text in chunks:
+            parts.append(text)
+            yield sse_event('delta', {'text': text})
+        yield sse_event('done', {'en_prompt': ''.join(parts)})
+    except (ValueError, admission.OverloadedError) as e:
+        yield sse_event('error', {'error': str(e)})
+    except Exception as e:
+        logger.error(f"流式翻译提示词时出错: {e}")
+        yield sse_event('error', {'error': '翻译失败'})
+
+
+# 4. 静态文件服务 (用于访问上传的图片)
+@routes.get('/uploads/{filename}')
+async def uploaded_file(request):
+    file_path = safe_join(Config.UPLOAD_FOLDER, request.match_info['filename'])
+    if file_path is None or not os.path.isfile(file_path):
+        raise web.HTTPNotFound()
+    return web.FileResponse(file_path)
+
+
+# 5. 图片处理
+@routes.post('/api/process')
+@rate_limit(PROCESS_RATE_LIMIT, exempt_when=quota_enabled, scope='process')
+@require_session
+async def process_image(request, session_data):
+    try:
+        hashed_identifier = session_data.get('identifier')
+        github_login = session_data.get('github_login', 'unknown_user')
+
+        form = await request.post()
+        files = form.getall('image', [])
+        if not files or not isinstance(files[0], web.FileField):
+            return error('未提供图片文件', 400)
+        if not files[0].filename:
+            return error('未选择图片', 400)
+        encrypted_prompt = form.get('prompt')
+        if not encrypted_prompt:
+            return error('缺少提示词', 400)
+        await charge_quota(request, 'process', session_data)
+
+        prompt = await run_blocking(crypto_session.decrypt_prompt, encrypted_prompt)
+        _, file_path, _, content_hash = await run_blocking(
+            image_service.save_temp_image, to_file_storage(files[0]), hashed_identifier, github_login
+        )
+
+        flag = request.query.get('async') or form.get('async')
+        if Config.PROCESS_ASYNC_DEFAULT if flag is None else flag.lower() in ('1', 'true', 'yes'):
+            job_id = await run_blocking(
+                job_service.submit_job, hashed_identifier, model_service.call_bailian, file_path, prompt, content_hash
+            )
+            return web.json_response({
+                'job_id': job_id,
+                'status': job_service.JOB_PENDING,
+                'status_url': f"/api/jobs/{job_id}",
+                'events_url': f"/api/jobs/{job_id}/events"
+            }, status=202)
+
+        result = await async_model_service.call_bailian(file_path, prompt, content_hash)
+        return web.json_response(result)
+    except quota_service.QuotaExceededError as e:
+        return quota_exceeded(e)
+    except PermissionError as e:
+        return error(str(e), 403)
+    except ValueError as e:
+        return error(str(e), 400)
+    except (job_service.JobQueueFullError, http_client.CircuitOpenError) as e:
+        return error(str(e), 503)
+    except admission.OverloadedError as e:
+        return overloaded(e)
+    except Exception as e:
+        logger.error(f"处理图片时出错: {e}")
+        return error('图片处理失败', 500)
+
+
+# 6. 查询图片处理任务状态
+@routes.get('/api/jobs/{job_id}')
+@require_session
+async def get_job_status(request, session_data):
+    try:
+        job = await get_owned_job(request, session_data)
+        return web.json_response(job_service.public_view(job))
+    except LookupError as e:
+        return error(str(e), 404)
+    except Exception as e:
+        logger.error(f"查询任务状态时出错: {e}")
+        return error('查询任务状态失败', 500)
+
+
+# 7. 以 SSE 推送图片处理任务状态
+@routes.get('/api/jobs/{job_id}/events')
+@require_session
+async def stream_job_events(request, session_data):
+    try:
+        job = await get_owned_job(request, session_data)
+    except LookupError as e:
+        return error(str(e), 404)
+
+    async def generate(job):
+        deadline = time.monotonic() + Config.JOB_EVENTS_TIMEOUT
+        last_seen = None
+        while job is not None:
+            if job['updated_at'] != last_seen:
+                last_seen = job['updated_at']
+                yield sse_event(job['status'], job_service.public_view(job))
+            else:
+                yield b": keep-alive\n\n"  # 心跳，防止代理断开空闲连接
+            if job['status'] in job_service.FINISHED_STATES or time.monotonic() >= deadline:
+                return
+            job = await run_blocking(job_service.wait_for_update, job['id'], last_seen, 15)
+
+    return await event_stream(request, generate(job))
+
+
+# 8. 批量图片处理
+@routes.post('/api/process/batch')
+@rate_limit("5 per minute", exempt_when=quota_enabled)
+# 每个条目计一次，与单张图片处理共用限制
+@rate_limit(PROCESS_RATE_LIMIT, exempt_when=quota_enabled, scope='process', cost=batch_item_count)
+@require_session
+async def process_image_batch(request, session_data):
+    try:
+        hashed_identifier = session_data.get('identifier')
+        github_login = session_data.get('github_login', 'unknown_user')
+
+        form = await request.post()
+        files = upload_fields(form, 'image')
+        if not files:
+            return error('未提供图片文件', 400)
+        encrypted_prompts = batch_encrypted_prompts(form)
+        if not encrypted_prompts or not all(encrypted_prompts):
+            return error('缺少提示词', 400)
+        if len(files) > 1 and len(encrypted_prompts) > 1:
+            return error('多张图片时只能提供一个提示词', 400)
+        if max(len(files), len(encrypted_prompts)) > Config.BATCH_MAX_ITEMS:
+            return error(f"单次最多处理 {Config.BATCH_MAX_ITEMS} 个条目", 400)
+        # 按条目数计费
+        await charge_quota(request, 'process', session_data, max(len(files), len(encrypted_prompts)))
+
+        decrypted = {}
+        for encrypted_prompt in encrypted_prompts:
+            if encrypted_prompt not in decrypted:
+                decrypted[encrypted_prompt] = await run_blocking(crypto_session.decrypt_prompt, encrypted_prompt)
+        prompts = [decrypted[encrypted_prompt] for encrypted_prompt in encrypted_prompts]
+        saved = [
+            await run_blocking(image_service.save_temp_image, to_file_storage(f), hashed_identifier, github_login)
+            for f in files
+        ]
+        if len(saved) == 1:
+            items = [(saved[0][1], prompt, saved[0][3]) for prompt in prompts]
+        else:
+            items = [(file_path, prompts[0], content_hash) for _, file_path, _, content_hash in saved]
+    except quota_service.QuotaExceededError as e:
+        return quota_exceeded(e)
+    except ValueError as e:
+        return error(str(e), 400)
+    except Exception as e:
+        logger.error(f"处理批量图片请求时出错: {e}")
+        return error('图片处理失败', 500)
+
+    results = iterate_blocking(batch_service.run_batch(items))
+    if wants_stream(request):
+        async def generate():
+            async for item in results:
+                yield sse_event('item', item)
+            yield sse_event('done', {'count': len(items)})
+
+        return await event_stream(request, generate())
+    collected = [item async for item in results]
+    return web.json_response({'items': sorted(collected, key=lambda item: item['index'])})
+
+
+# 9. 批量合规检查
+@routes.post('/api/compliance/batch')
+@rate_limit("10 per minute", exempt_when=quota_enabled)
+@require_session
+async def compliance_batch(request, session_data):
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+        encrypted_prompts = data.get('prompts') if isinstance(data, dict) else None
+        if not isinstance(encrypted_prompts, list) or not encrypted_prompts:
+            return error('缺少提示词', 400)
+        if len(encrypted_prompts) > Config.COMPLIANCE_BATCH_MAX_ITEMS:
+            return error(f"单次最多检查 {Config.COMPLIANCE_BATCH_MAX_ITEMS} 条提示词", 400)
+        await charge_quota(request, 'compliance', session_data, len(encrypted_prompts))
+
+        prompts = await run_blocking(lambda: [crypto_session.decrypt_prompt(p) for p in encrypted_prompts])
+        verdicts = await run_blocking(model_service.compliance_check_batch, prompts)
+        return web.json_response({'verdicts': verdicts})
+    except quota_service.QuotaExceededError as e:
+        return quota_exceeded(e)
+    except ValueError as e:
+        return error(str(e), 400)
+    except Exception as e:
+        logger.error(f"批量合规检查时出错: {e}")
+        return error('合规检查失败', 500)
+
+
+# 10. 建立加密会话 (SM2 密钥交换)
+@routes.post('/api/crypto/session')
+@rate_limit("10 per minute")
+@require_session
+async def create_crypto_session(request, session_data):
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+        encrypted_key = data.get('key') if isinstance(data, dict) else None
+        if not encrypted_key:
+            return error('缺少会话密钥', 400)
+        session_id, expires_in = await run_blocking(
+            crypto_session.create_session, encrypted_key, session_data.get('identifier')
+        )
+        return web.json_response({'session_id': session_id, 'expires_in': expires_in})
+    except ValueError as e:
+        return error(str(e), 400)
+    except Exception as e:
+        logger.error(f"建立加密会话时出错: {e}")
+        return error('建立加密会话失败', 500)
+
+
+# 11. 退出登录 (吊销当前会话令牌)
+@routes.post('/api/auth/logout')
+@require_session
+async def logout(request, session_data):
+    try:
+        token = session_service.bearer_token(request.headers.get('Authorization'))
+        await run_blocking(session_service.revoke_token, token)
+        return web.json_response({'message': '已退出登录'})
+    except ValueError as e:  # 旧版令牌不包含 jti
+        return error(str(e), 400)
+    except Exception as e:
+        logger.error(f"退出登录时出错: {e}")
+        return error('退出登录失败', 500)
+
+
+# --- 应用初始化 ---
+
+def reconcile_task():
+    """定时任务：每小时回收无数据库记录的孤儿文件并清理过期任务记录"""
+    expiry_service.reconcile_orphans()
+    job_service.purge_expired_jobs()
+    session_service.purge_expired_revocations()
+
+
+async def on_startup(app):
+    await run_blocking(schema.migrate)
+    await run_blocking(sm2.get_decryptor)
+    # 在线程池中加载吊销记录索引，避免首个请求在事件循环中读取存储
+    await run_blocking(session_service.rebuild_index)
+    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+    # 启动时从 SQLite 预热翻译缓存
+    await run_blocking(model_service.warm_translation_cache)
+    if Config.TRANSLATION_CACHE_SEED_FILE:
+        await run_blocking(model_service.seed_translation_cache, Config.TRANSLATION_CACHE_SEED_FILE)
+
+
+async def on_cleanup(app):
+    await async_http_client.close()
+
+
+def create_app(start_scheduler=True):
+    """
+    创建异步服务应用。
+    :param start_scheduler: 是否启动定时清理任务 (多进程部署时只需一个进程启动)
+    """
+    middlewares = [cors_middleware, rate_limit_middleware]
+    if metrics.ENABLED:
+        middlewares.insert(0, metrics_middleware)
+    app = web.Application(
+        middlewares=middlewares,
+        client_max_size=Config.MAX_CONTENT_LENGTH
+    )
+    app.add_routes(routes)
+    app.on_response_prepare.append(add_cors_headers)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+
+    if start_scheduler:
+        scheduler = BackgroundScheduler()
+        scheduler.add_job(expiry_service.expire_uploads, 'interval', id='do_cleanup',
+                          seconds=Config.EXPIRY_INTERVAL_SECONDS, max_instances=1, coalesce=True)
+        scheduler.add_job(reconcile_task, 'interval', id='do_reconcile', hours=1, max_instances=1, coalesce=True)
+
+        async def start(app):
+            scheduler.start()
+
+        async def stop(app):
+            scheduler.shutdown(wait=False)
+
+        app.on_startup.append(start)
+        app.on_cleanup.append(stop)
+    return app
+
+
+if __name__ == '__main__':
+    web.run_app(create_app(), host='0.0.0.0', port=Config.SERVER_PORT)
@@ -0,0 +1,329 @@
+"""
+压测用的本地模拟上游：在同一端口下按路径前缀模拟以下服务，各自可配置延迟、抖动与错误率。
+- /siliconflow: 硅基流动 chat/completions (合规检查、翻译、合并调用、批量合规、SSE 流式翻译)；
+- /backup:      备用 LLM 后端 (同上，用于压测多后端路由与对冲请求)；
+- /dashscope:   百炼图片编辑 (上传凭证、OSS 表单上传、提交任务、查询任务)；
+- /results:     结果图片托管；
+- /github:      GitHub OAuth (授权码换令牌、用户信息)。
+
+用法 (在 chameleon-api 目录下)：
+python -m benchmarks.fake_upstreams [--port 18080] [--profile siliconflow:latency=300,jitter=50,errors=0.01]
+启动后输出指向模拟服务的环境变量，可直接用于启动被测服务。
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import random
+import re
+import shlex
+import time
+import uuid
+
+from aiohttp import web
+from PIL import Image
+
+UPSTREAMS = ('siliconflow', 'backup', 'dashscope', 'results', 'github')
+
+
+class Profile:
+    """
+    单个上游的响应特征。
+    :param latency: 基础延迟 (毫秒)
+    :param jitter: 在基础延迟上随机增加的延迟上限 (毫秒)
+    :param errors: 返回错误响应的概率 (0-1)
+    :param status: 错误响应的状态码
+    :param slow: 响应变慢 (长尾) 的概率 (0-1)
+    :param slow_latency: 变慢时额外增加的延迟 (毫秒)
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, errors=0.0, status=500, slow=0.0, slow_latency=0.0):
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.errors = float(errors)
+        self.status = int(status)
+        self.slow = float(slow)
+        self.slow_latency = float(slow_latency)
+
+    def to_dict(self):
+        return {'latency': self.latency, 'jitter': self.jitter, 'errors': self.errors, 'status': self.status,
+                'slow': self.slow, 'slow_latency': self.slow_latency}
+
+    async def delay(self):
+        seconds = (self.latency + random.uniform(0, self.jitter)) / 1000
+        if self.slow > 0 and random.random() < self.slow:
+            seconds += self.slow_latency / 1000
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def should_fail(self):
+        return self.errors > 0 and random.random() < self.errors
+
+
+# 各上游的默认特征，接近真实服务的量级
+DEFAULT_PROFILES = {
+    'siliconflow': {'latency': 300, 'jitter': 100},
+    'backup': {'latency': 300, 'jitter': 100},
+    'dashscope': {'latency': 80, 'jitter': 20},
+    'results': {'latency': 20, 'jitter': 10},
+    'github': {'latency': 150, 'jitter': 50},
+}
+
+
+def parse_profiles(specs):
+    """
+    解析命令行中的上游特征，格式为 <上游>:latency=毫秒,jitter=毫秒,errors=概率,status=状态码,slow=概率,slow_latency=毫秒。
+    :return: {上游: Profile}
+    :raises ValueError: 如果上游名称或参数无效
+    """
+    options = {name: dict(values) for name, values in DEFAULT_PROFILES.items()}
+    for spec in specs or []:
+        name, _, params = spec.partition(':')
+        if name not in UPSTREAMS:
+            raise ValueError(f"未知的上游: {name}，可选: {', '.join(UPSTREAMS)}")
+        for item in filter(None, params.split(',')):
+            key, _, value = item.partition('=')
+            if key not in ('latency', 'jitter', 'errors', 'status', 'slow', 'slow_latency'):
+                raise ValueError(f"未知的上游参数: {key}")
+            options[name][key] = float(value)
+    return {name: Profile(**values) for name, values in options.items()}
+
+
+def build_result_image(size):
+    """生成结果图片 (PNG)，内容为随机噪声，避免压缩后体积失真"""
+    width, height = size
+    image = Image.frombytes('RGB', (width, height), random.randbytes(width * height * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def fake_translation(text):
+    """根据原文生成确定的 "译文"，相同原文得到相同结果"""
+    return f"edit the image as described, variant {hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]}"
+
+
+def chat_completion(content):
+    return {
+        'id': uuid.uuid4().hex,
+        'object': 'chat.completion',
+        'model': 'Qwen/Qwen3-8B',
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+    }
+
+
+class FakeUpstreams:
+    """模拟上游服务的状态 (百炼任务、统计) 与路由"""
+
+    def __init__(self, profiles, task_seconds=2.0, image_size=(1024, 1024)):
+        self.profiles = profiles
+        self.task_seconds = task_seconds
+        self.result_png = build_result_image(image_size)
+        self.tasks = {}
+        self.stats = {name: {'requests': 0, 'errors': 0} for name in UPSTREAMS}
+        self.started_at = time.time()
+
+    async def _simulate(self, upstream):
+        """
+        按上游特征等待，并决定是否返回错误。
+        :return: 需要返回的错误响应，正常时返回 None
+        """
+        profile = self.profiles[upstream]
+        self.stats[upstream]['requests'] += 1
+        await profile.delay()
+        if profile.should_fail():
+            self.stats[upstream]['errors'] += 1
+            return web.json_response({'code': 'InjectedError', 'message': '模拟的上游错误'}, status=profile.status)
+        return None
+
+    # --- 硅基流动 ---
+
+    async def chat_completions(self, request):
+        return await self._chat_completions(request, 'siliconflow')
+
+    async def backup_chat_completions(self, request):
+        return await self._chat_completions(request, 'backup')
+
+    async def _chat_completions(self, request, upstream):
+        error = await self._simulate(upstream)
+        if error is not None:
+            return error
+        payload = await request.json()
+        prompt = payload['messages'][-1]['content']
+        text = prompt.rsplit('文本内容：', 1)[-1]
+
+        if '"verdicts"' in prompt:
+            # 批量合规：文本列表在提示词末尾以 JSON 数组给出
+            items = json.loads(prompt.rsplit('文本列表：', 1)[-1])
+            return web.json_response(chat_completion(json.dumps({'verdicts': ['ALLOWED'] * len(items)})))
+        if '"allowed"' in prompt:
+            content = json.dumps({'allowed': True, 'en_prompt': fake_translation(text)})
+            return web.json_response(chat_completion(content))
+        if 'en_prompt' in prompt:
+            content = json.dumps({'en_prompt': fake_translation(text)})
+            if payload.get('stream'):
+                return await self._stream_completion(request, content)
+            return web.json_response(chat_completion(content))
+        return web.json_response(chat_completion('ALLOWED'))
+
+    async def _stream_completion(self, request, content):
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        for i in range(0, len(content), 8):
+            chunk = {'choices': [{'index': 0, 'delta': {'content': content[i:i + 8]}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    # --- 百炼 ---
+
+    async def upload_policy(self, request):
+        error = await self._simulate('dashscope')
+        if error is not None:
+            return error
+        return web.json_response({
+            'request_id': uuid.uuid4().hex,
+            'data': {
+                'upload_host': f"{request.scheme}://{request.host}/dashscope/oss",
+                'upload_dir': f"bench/{uuid.uuid4().hex}",
+                'oss_access_key_id': 'fake', 'signature': 'fake', 'policy': 'fake',
+                'x_oss_object_acl': 'private', 'x_oss_forbid_overwrite': 'true',
+                'expire_in_seconds': 300, 'max_file_size_mb': 100, 'capacity_limit_mb': 999999,
+            }
+        })
+
+    async def oss_upload(self, request):
+        error = await self._simulate('dashscope')
+        if error is not None:
+            return error
+        await request.read()
+        return web.Response(status=200)
+
+    async def submit_task(self, request):
+        error = await self._simulate('dashscope')
+        if error is not None:
+            return error
+        await request.read()
+        task_id = uuid.uuid4().hex
+        self.tasks[task_id] = time.monotonic() + self.task_seconds
+        return web.json_response({
+            'request_id': uuid.uuid4().hex,
+            'output': {'task_id': task_id, 'task_status': 'PENDING'}
+        })
+
+    async def fetch_task(self, request):
+        error = await self._simulate('dashscope')
+        if error is not None:
+            return error
+        task_id = request.match_info['task_id']
+        ready_at = self.tasks.get(task_id)
+        if ready_at is None:
+            return web.json_response({'code': 'InvalidParameter', 'message': '任务不存在'}, status=400)
+        output = {'task_id': task_id, 'task_status': 'RUNNING'}
+        if time.monotonic() >= ready_at:
+            output['task_status'] = 'SUCCEEDED'
+            output['results'] = [{'url': f"{request.scheme}://{request.host}/results/{task_id}.png"}]
+        return web.json_response({'request_id': uuid.uuid4().hex, 'output': output, 'usage': {'image_count': 1}})
+
+    # --- 结果图片 ---
+
+    async def result_image(self, request):
+        error = await self._simulate('results')
+        if error is not None:
+            return error
+        return web.Response(body=self.result_png, content_type='image/png')
+
+    # --- GitHub ---
+
+    async def github_token(self, request):
+        error = await self._simulate('github')
+        if error is not None:
+            return error
+        form = await request.post()
+        return web.json_response({'access_token': f"gho_{form.get('code', '')}", 'token_type': 'bearer'})
+
+    async def github_user(self, request):
+        error = await self._simulate('github')
+        if error is not None:
+            return error
+        match = re.match(r'token gho_(.*)', request.headers.get('Authorization', ''))
+        if not match:
+            return web.json_response({'message': 'Bad credentials'}, status=401)
+        code = match.group(1)
+        user_id = int(hashlib.sha256(code.encode('utf-8')).hexdigest()[:8], 16)
+        return web.json_response({'id': user_id, 'login': f"bench-{code}"})
+
+    async def health(self, request):
+        return web.json_response({
+            'uptime': time.time() - self.started_at,
+            'profiles': {name: profile.to_dict() for name, profile in self.profiles.items()},
+            'stats': self.stats,
+        })
+
+    def create_app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_get('/health', self.health)
+        app.router.add_post('/siliconflow/v1/chat/completions', self.chat_completions)
+        app.router.add_post('/backup/v1/chat/completions', self.backup_chat_completions)
+        app.router.add_get('/dashscope/api/v1/uploads', self.upload_policy)
+        app.router.add_post('/dashscope/oss', self.oss_upload)
+        app.router.add_post('/dashscope/api/v1/services/aigc/image2image/image-synthesis', self.submit_task)
+        app.router.add_get('/dashscope/api/v1/tasks/{task_id}', self.fetch_task)
+        app.router.add_get('/results/{name}', self.result_image)
+        app.router.add_post('/github/login/oauth/access_token', self.github_token)
+        app.router.add_get('/github/user', self.github_user)
+        return app
+
+
+def app_environment(base_url, backup_llm=False):
+    """
+    返回将被测服务指向模拟上游所需的环境变量。
+    :param backup_llm: 是否将 /backup 注册为追加的 LLM 后端
+    """
+    env = {
+        'CHAMELEON_APP_SILICON_FLOW_LLM_URL': f"{base_url}/siliconflow/v1/chat/completions",
+        'CHAMELEON_APP_BAILIAN_BASE_URL': f"{base_url}/dashscope/api/v1",
+        'CHAMELEON_APP_GITHUB_AUTHORIZATION_URL': f"{base_url}/github/login/oauth/authorize",
+        'CHAMELEON_APP_GITHUB_TOKEN_URL': f"{base_url}/github/login/oauth/access_token",
+        'CHAMELEON_APP_GITHUB_USER_INFO_URL': f"{base_url}/github/user",
+    }
+    if backup_llm:
+        env['CHAMELEON_APP_LLM_BACKENDS'] = json.dumps([{
+            'name': 'backup', 'provider': 'backup', 'model': 'backup-model', 'api_key': 'bench',
+            'url': f"{base_url}/backup/v1/chat/completions",
+        }])
+    return env
+
+
+def add_arguments(parser):
+    """添加模拟上游的命令行参数 (load_test 复用)"""
+    parser.add_argument('--profile', action='append', default=[],
+                        help='上游特征，例如 siliconflow:latency=300,jitter=50,errors=0.01 (可重复)')
+    parser.add_argument('--task-seconds', type=float, default=2.0, help='百炼任务从提交到完成的时间 (秒)')
+    parser.add_argument('--result-size', default='1024x1024', help='结果图片尺寸，例如 1024x1024')
+    parser.add_argument('--backup-llm', action='store_true', help='将 /backup 注册为被测服务的备用 LLM 后端')
+
+
+def parse_size(value):
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='压测用的本地模拟上游')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18080)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(parse_profiles(args.profile), args.task_seconds, parse_size(args.result_size))
+    for key, value in app_environment(f"http://{args.host}:{args.port}", args.backup_llm).items():
+        print(f"export {key}={shlex.quote(value)}", flush=True)
+    web.run_app(upstreams.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,510 @@
+"""
+离线压测：启动本地模拟上游 (见 fake_upstreams.py) 与被测服务，以目标并发驱动 /api/translate 与 /api/process，
+统计吞吐量、p50/p95/p99 延迟与被测服务 (含子进程) 的峰值 RSS，结果以 JSON 写入文件，便于比较不同改动。
+
+用法 (在 chameleon-api 目录下)：
+python -m benchmarks.load_test [--mode flask|async] [--scenario translate --scenario process]
+                               [--concurrency 16] [--requests 200] [--users 4] [--encryption sm4|sm2]
+                               [--profile siliconflow:latency=300,errors=0.01] [--app-env CHAMELEON_APP_XXX=1]
+                               [--output result.json] [--baseline previous.json]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import secrets
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import aiohttp
+from gmssl import sm2
+from PIL import Image
+
+from benchmarks import fake_upstreams
+from utils import sm2_fast, sm4
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRYPOINTS = {'flask': 'app.py', 'async': 'async_app.py'}
+SCENARIOS = ('translate', 'process')
+JOB_FINISHED_STATES = ('succeeded', 'failed')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples, q):
+    """线性插值的百分位数 (q 取 0-100)"""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def process_tree(pid):
+    """返回进程及其全部子孙进程的 PID (依赖 /proc)"""
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            for tid in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{tid}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def read_status_kb(pid, field):
+    """读取 /proc/<pid>/status 中以 kB 为单位的字段，进程不存在时返回 0"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class RssSampler:
+    """
+    后台线程周期性采样被测服务进程树的 RSS 之和，记录峰值。
+    主进程的 VmHWM (内核记录的峰值) 在结束时单独读取。
+    """
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.supported = os.path.exists(f"/proc/{pid}/status")
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def sample(self):
+        total = sum(read_status_kb(pid, 'VmRSS') for pid in process_tree(self.pid))
+        self.peak_kb = max(self.peak_kb, total)
+        return total
+
+    def reset(self):
+        self.peak_kb = 0
+
+    def start(self):
+        if self.supported:
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def summarize(latencies, statuses, errors, duration):
+    """
+    汇总一个场景的结果。
+    :param latencies: 成功请求的延迟列表 (秒)
+    :param statuses: {状态码: 次数}
+    :param errors: {错误描述: 次数}
+    :param duration: 场景总耗时 (秒)
+    """
+    ok = len(latencies)
+    total = sum(statuses.values()) + sum(errors.values())
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        'requests': total,
+        'succeeded': ok,
+        'failed': total - ok,
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(ok / duration, 3) if duration > 0 else None,
+        'latency_ms': {
+            'mean': ms(statistics.mean(latencies)) if latencies else None,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(max(latencies)) if latencies else None,
+        },
+        'status_counts': {str(status): count for status, count in sorted(statuses.items())},
+        'errors': errors,
+    }
+
+
+class LoadTest:
+    """一次压测运行：管理模拟上游与被测服务进程，驱动各场景并汇总结果"""
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix='chameleon-bench-')
+        self.upstream_port = free_port()
+        self.app_port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.app_port}"
+        self.private_key, self.public_key = self._generate_keypair()
+        self.encryptor = sm2.CryptSM2(public_key=self.public_key, private_key=self.private_key, mode=1)
+        self.upstreams = None
+        self.app = None
+        self.users = []
+        self.image = self._build_upload_image()
+
+    @staticmethod
+    def _generate_keypair():
+        while True:
+            private_key = f"{secrets.randbelow(sm2_fast.N - 2) + 1:064x}"
+            public_key = sm2_fast.FastSM2(private_key).public_key()
+            # gmssl 将以 04 开头的公钥视为带有未压缩点前缀，加密时出错，跳过这类密钥
+            if not public_key.startswith('04'):
+                return private_key, public_key
+
+    # --- 进程管理 ---
+
+    def _spawn(self, args, env, log_name):
+        log = open(os.path.join(self.workdir, log_name), 'wb')
+        # 独立的进程组，停止时连同进程池子进程、forkserver 等一并结束
+        return subprocess.Popen(args, cwd=API_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+                                start_new_session=True)
+
+    @staticmethod
+    def _signal_group(process, sig):
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, sig)
+            else:
+                process.send_signal(sig)
+        except ProcessLookupError:
+            pass
+
+    def app_environment(self):
+        env = dict(os.environ)
+        env.update(fake_upstreams.app_environment(f"http://127.0.0.1:{self.upstream_port}", self.args.backup_llm))
+        env.update({
+            'CHAMELEON_APP_PORT': str(self.app_port),
+            'CHAMELEON_APP_SECRET_KEY': secrets.token_hex(32),
+            'CHAMELEON_APP_SM2_PRIVATE_KEY': self.private_key,
+            'CHAMELEON_APP_SM2_PUBLIC_KEY': self.public_key,
+            'CHAMELEON_APP_SILICON_FLOW_API_KEY': 'bench',
+            'CHAMELEON_APP_BAILIAN_API_KEY': 'bench',
+            'CHAMELEON_APP_REDIS_URL': 'memory://',
+            'CHAMELEON_APP_RATELIMIT': '1' if self.args.rate_limit else '0',
+            'CHAMELEON_APP_QUOTA': '1' if self.args.rate_limit else '0',
+            'CHAMELEON_APP_DATABASE': os.path.join(self.workdir, 'chameleon.db'),
+            'CHAMELEON_APP_UPLOAD_FOLDER': os.path.join(self.workdir, 'uploads'),
+            'CHAMELEON_APP_RESULT_CACHE_FOLDER': os.path.join(self.workdir, 'result_cache'),
+        })
+        for item in self.args.app_env:
+            key, _, value = item.partition('=')
+            env[key] = value
+        return env
+
+    async def _wait_ready(self, session, url, process, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"进程已退出 (返回码 {process.returncode})，日志目录: {self.workdir}")
+            try:
+                async with session.get(url) as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+        raise RuntimeError(f"等待 {url} 就绪超时，日志目录: {self.workdir}")
+
+    async def start(self, session):
+        upstream_args = [sys.executable, '-m', 'benchmarks.fake_upstreams', '--port', str(self.upstream_port),
+                         '--task-seconds', str(self.args.task_seconds), '--result-size', self.args.result_size]
+        for spec in self.args.profile:
+            upstream_args += ['--profile', spec]
+        self.upstreams = self._spawn(upstream_args, dict(os.environ), 'upstreams.log')
+        await self._wait_ready(session, f"http://127.0.0.1:{self.upstream_port}/health", self.upstreams)
+
+        entrypoint = ENTRYPOINTS[self.args.mode]
+        self.app = self._spawn([sys.executable, entrypoint], self.app_environment(), 'app.log')
+        await self._wait_ready(session, f"{self.base_url}/", self.app)
+
+    def stop(self):
+        for process in (self.app, self.upstreams):
+            if process is None:
+                continue
+            if process.poll() is None:
+                self._signal_group(process, signal.SIGTERM)
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    pass
+            # 主进程退出后仍未结束的子进程 (如卡住的进程池子进程) 强制结束
+            self._signal_group(process, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            process.wait()
+        # 只保留日志，删除上传文件、结果缓存与数据库
+        for name in ('uploads', 'result_cache'):
+            shutil.rmtree(os.path.join(self.workdir, name), ignore_errors=True)
+        for name in os.listdir(self.workdir):
+            if name.startswith('chameleon.db'):
+                os.remove(os.path.join(self.workdir, name))
+
+    # --- 客户端准备 ---
+
+    def _build_upload_image(self):
+        width, height = fake_upstreams.parse_size(self.args.image_size)
+        image = Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=90)
+        return buffer.getvalue()
+
+    def sm2_encrypt(self, text):
+        return self.encryptor.encrypt(text.encode('utf-8')).hex()
+
+    def sm4_encrypt(self, user, text):
+        key = user['crypto_key']
+        iv = os.urandom(sm4.BLOCK_SIZE)
+        data = sm4.encrypt_cbc(key[:16], iv, text.encode('utf-8'))
+        mac = sm4.hmac_sm3(key[16:], iv + data)
+        return f"sm4:{user['crypto_session']}:{iv.hex()}:{data.hex()}:{mac.hex()}"
+
+    def encrypt_prompt(self, user, text):
+        if self.args.encryption == 'sm4':
+            return self.sm4_encrypt(user, text)
+        return self.sm2_encrypt(text)
+
+    async def login_users(self, session):
+        """经模拟的 GitHub OAuth 登录 --users 个用户，按需建立加密会话"""
+        for i in range(self.args.users):
+            async with session.post(f"{self.base_url}/api/auth/github/callback",
+                                    json={'code': f"user{i}"}) as response:
+                data = await response.json()
+                if response.status != 200:
+                    raise RuntimeError(f"登录失败: {response.status} {data}")
+            user = {'token': data['token'], 'headers': {'Authorization': f"Bearer {data['token']}"}}
+            if self.args.encryption == 'sm4':
+                key = os.urandom(32)
+                async with session.post(f"{self.base_url}/api/crypto/session", headers=user['headers'],
+                                        json={'key': self.sm2_encrypt(key.hex())}) as response:
+                    data = await response.json()
+                    if response.status != 200:
+                        raise RuntimeError(f"建立加密会话失败: {response.status} {data}")
+                user.update(crypto_key=key, crypto_session=data['session_id'])
+            self.users.append(user)
+
+    def prompt_text(self, scenario, i):
+        """
+        第 i 个请求的提示词：--prompt-pool 为 0 时每个请求不同 (不命中任何缓存)，否则在池内循环。
+        """
+        n = i % self.args.prompt_pool if self.args.prompt_pool else i
+        if scenario == 'translate':
+            return f"把图片中的天空换成紫色的晚霞，编号 {n}"
+        return f"replace the sky with a purple sunset, variant {n}"
+
+    # --- 场景 ---
+
+    async def translate_request(self, session, i):
+        user = self.users[i % len(self.users)]
+        headers = dict(user['headers'])
+        if self.args.stream:
+            headers['Accept'] = 'text/event-stream'
+        body = {'prompt': self.encrypt_prompt(user, self.prompt_text('translate', i))}
+        async with session.post(f"{self.base_url}/api/translate", json=body, headers=headers) as response:
+            text = await response.text()
+            ok = response.status == 200 and (not self.args.stream or 'event: done' in text)
+            return response.status, ok
+
+    async def process_request(self, session, i):
+        user = self.users[i % len(self.users)]
+        form = aiohttp.FormData()
+        form.add_field('image', self.image, filename='bench.jpg', content_type='image/jpeg')
+        form.add_field('prompt', self.encrypt_prompt(user, self.prompt_text('process', i)))
+        async with session.post(f"{self.base_url}/api/process", data=form, headers=user['headers']) as response:
+            data = await response.json(content_type=None)
+            status = response.status
+        if status != 202:
+            return status, status == 200
+        # 异步任务：轮询到结束，延迟按端到端计算
+        while True:
+            await asyncio.sleep(self.args.job_poll_interval)
+            async with session.get(f"{self.base_url}{data['status_url']}", headers=user['headers']) as response:
+                job = await response.json(content_type=None)
+                if response.status != 200:
+                    return response.status, False
+            if job.get('status') in JOB_FINISHED_STATES:
+                return status, job['status'] == 'succeeded'
+
+    async def run_scenario(self, session, name, sampler):
+        request = self.translate_request if name == 'translate' else self.process_request
+        latencies, statuses, errors = [], {}, {}
+
+        # 预热请求串行执行，不计入结果
+        for i in range(self.args.warmup):
+            try:
+                await request(session, i)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                pass
+
+        counter = iter(range(self.args.warmup, self.args.warmup + self.args.requests))
+
+        async def worker():
+            for i in counter:
+                start = time.perf_counter()
+                try:
+                    status, ok = await request(session, i)
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    key = type(e).__name__
+                    errors[key] = errors.get(key, 0) + 1
+                    continue
+                statuses[status] = statuses.get(status, 0) + 1
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+
+        sampler.reset()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        result = summarize(latencies, statuses, errors, time.perf_counter() - started)
+        result['concurrency'] = self.args.concurrency
+        result['peak_rss_mb'] = round(sampler.peak_kb / 1024, 1) if sampler.supported else None
+        return result
+
+    async def run(self):
+        timeout = aiohttp.ClientTimeout(total=self.args.timeout)
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            try:
+                await self.start(session)
+                sampler = RssSampler(self.app.pid)
+                sampler.start()
+                try:
+                    await self.login_users(session)
+                    scenarios = {}
+                    for name in self.args.scenario or SCENARIOS:
+                        scenarios[name] = await self.run_scenario(session, name, sampler)
+                        print_scenario(name, scenarios[name])
+                    async with session.get(f"http://127.0.0.1:{self.upstream_port}/health") as response:
+                        upstream_stats = (await response.json())['stats']
+                finally:
+                    sampler.stop()
+                app_peak_kb = read_status_kb(self.app.pid, 'VmHWM')
+            finally:
+                self.stop()
+        return {
+            'meta': run_metadata(self.args),
+            'scenarios': scenarios,
+            'peak_rss_mb': {
+                'app_process': round(app_peak_kb / 1024, 1) if app_peak_kb else None,
+                'process_tree': round(sampler.peak_kb / 1024, 1) if sampler.supported else None,
+            },
+            'upstreams': upstream_stats,
+            'logs': self.workdir,
+        }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=API_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(args):
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'mode': args.mode,
+        'encryption': args.encryption,
+        'stream': args.stream,
+        'concurrency': args.concurrency,
+        'requests': args.requests,
+        'warmup': args.warmup,
+        'users': args.users,
+        'prompt_pool': args.prompt_pool,
+        'image_size': args.image_size,
+        'profiles': {name: profile.to_dict()
+                     for name, profile in fake_upstreams.parse_profiles(args.profile).items()},
+        'task_seconds': args.task_seconds,
+        'backup_llm': args.backup_llm,
+        'app_env': args.app_env,
+    }
+
+
+def print_scenario(name, result):
+    latency = result['latency_ms']
+    print(f"{name:>9}: {result['succeeded']}/{result['requests']} 成功, {result['throughput_rps']} req/s, "
+          f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms, "
+          f"峰值 RSS {result['peak_rss_mb']} MB, 状态码 {result['status_counts']}", flush=True)
+
+
+def print_comparison(baseline, current):
+    """输出与基线结果的对比 (吞吐量与延迟的相对变化)"""
+    print(f"与基线 {baseline['meta'].get('git_commit')} 对比:")
+    for name, result in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        changes = []
+        for label, old, new in [
+            ('吞吐量', base['throughput_rps'], result['throughput_rps']),
+            ('p50', base['latency_ms']['p50'], result['latency_ms']['p50']),
+            ('p95', base['latency_ms']['p95'], result['latency_ms']['p95']),
+            ('p99', base['latency_ms']['p99'], result['latency_ms']['p99']),
+            ('峰值 RSS', base['peak_rss_mb'], result['peak_rss_mb']),
+        ]:
+            if old and new is not None:
+                changes.append(f"{label} {(new - old) / old * 100:+.1f}%")
+        print(f"{name:>9}: {', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线压测 /api/translate 与 /api/process')
+    parser.add_argument('--mode', choices=sorted(ENTRYPOINTS), default='flask', help='被测服务模式')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='压测场景 (可重复，默认全部)')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发请求数')
+    parser.add_argument('--requests', type=int, default=200, help='每个场景计入结果的请求数')
+    parser.add_argument('--warmup', type=int, default=5, help='每个场景的预热请求数 (不计入结果)')
+    parser.add_argument('--users', type=int, default=4, help='登录的用户数，请求在用户间轮流分配')
+    parser.add_argument('--encryption', choices=('sm4', 'sm2'), default='sm4', help='提示词加密方式')
+    parser.add_argument('--stream', action='store_true', help='以 SSE 流式调用 /api/translate')
+    parser.add_argument('--prompt-pool', type=int, default=0, help='提示词池大小 (0 表示每个请求不同)')
+    parser.add_argument('--image-size', default='1280x960', help='上传图片尺寸')
+    parser.add_argument('--job-poll-interval', type=float, default=0.2, help='异步任务的轮询间隔 (秒)')
+    parser.add_argument('--timeout', type=float, default=300, help='单个请求的超时时间 (秒)')
+    parser.add_argument('--rate-limit', action='store_true', help='保留被测服务的限流与用户配额 (默认关闭)')
+    parser.add_argument('--app-env', action='append', default=[], help='传给被测服务的环境变量 KEY=VALUE (可重复)')
+    parser.add_argument('--output', help='结果 JSON 文件路径 (默认 load-test-<模式>-<时间>.json)')
+    parser.add_argument('--baseline', help='用于对比的历史结果 JSON 文件')
+    fake_upstreams.add_arguments(parser)
+    args = parser.parse_args()
+    fake_upstreams.parse_profiles(args.profile)  # 提前校验上游特征参数
+
+    result = asyncio.run(LoadTest(args).run())
+    output = args.output or f"load-test-{args.mode}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            print_comparison(json.load(f), result)
+
+
+if __name__ == '__main__':
+    main()
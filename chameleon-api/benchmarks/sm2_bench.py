@@ -0,0 +1,57 @@
+"""
+SM2 解密微基准：比较 gmssl 与快速实现的单次解密耗时，并校验两者结果一致。
+
+用法 (在 chameleon-api 目录下)：python -m benchmarks.sm2_bench [--rounds 200] [--size 200]
+"""
+
+import argparse
+import secrets
+import statistics
+import time
+
+from gmssl import sm2
+
+from utils import sm2_fast
+from utils.sm2 import build_decryptor
+
+
+def _time_backend(decrypt, ciphertexts, rounds):
+    samples = []
+    for i in range(rounds):
+        ciphertext = ciphertexts[i % len(ciphertexts)]
+        start = time.perf_counter()
+        decrypt(ciphertext)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SM2 解密微基准')
+    parser.add_argument('--rounds', type=int, default=200, help='每种实现的解密次数')
+    parser.add_argument('--size', type=int, default=200, help='明文长度 (汉字数，模拟提示词)')
+    args = parser.parse_args()
+
+    # 生成临时密钥对与一组密文 (C1C3C2)
+    private_key = f"{secrets.randbelow(sm2_fast.N - 2) + 1:064x}"
+    public_key = sm2_fast.FastSM2(private_key).public_key()
+    encryptor = sm2.CryptSM2(public_key=public_key, private_key=private_key, mode=1)
+    plaintexts = [('提示词' * args.size)[:args.size].encode('utf-8') + str(i).encode() for i in range(16)]
+    ciphertexts = [encryptor.encrypt(p) for p in plaintexts]
+
+    backends = {name: build_decryptor(name, private_key, public_key) for name in ('gmssl', 'fast')}
+    for name, decrypt in backends.items():
+        for plaintext, ciphertext in zip(plaintexts, ciphertexts):
+            assert decrypt(ciphertext) == plaintext, f"{name} 解密结果不一致"
+
+    print(f"明文 {len(plaintexts[0])} 字节, 每种实现 {args.rounds} 次, gmpy2: {'是' if sm2_fast.NATIVE else '否'}")
+    baseline = None
+    for name, decrypt in backends.items():
+        samples = _time_backend(decrypt, ciphertexts, args.rounds)
+        mean = statistics.mean(samples)
+        baseline = baseline or mean
+        p95 = statistics.quantiles(samples, n=20)[-1]
+        print(f"{name:>6}: 平均 {mean:.3f} ms, p95 {p95:.3f} ms, 加速 {baseline / mean:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
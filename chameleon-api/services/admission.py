@@ -0,0 +1,279 @@
+"""
+准入控制模块：为每个模型服务商 (硅基流动、百炼及追加的 LLM 后端) 维护独立的自适应并发上限与有界等待队列。
+- 进行中的调用数达到上限时排队等待，队列已满或预计等待超过截止时间时立即拒绝 (OverloadedError，接口返回 503 与 Retry-After)；
+- 并发上限按耗时梯度调整：比较调用耗时的短窗口均值 (近期) 与长窗口均值 (基线)，
+  短窗口均值超过基线的 ADMISSION_LATENCY_TOLERANCE 倍时按超出比例减小 (每轮最多减到 ADMISSION_BACKOFF 倍)，
+  超时直接按 ADMISSION_BACKOFF 减小，否则缓慢增加。单次调用耗时的随机波动 (与负载无关) 被均值平滑，
+  不会使上限收缩；上游持续变慢时上限自动收缩，避免请求线程全部阻塞在上游调用上。
+同步 (线程) 与异步 (asyncio) 调用方共用同一个限制器：slot() 用于线程，async_slot() 用于协程。
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from services import metrics
+from services.config import Config
+
+ENABLED = Config.ADMISSION_ENABLED
+
+
+class OverloadedError(Exception):
+    """
+    上游服务过载，请求未被准入。
+    :param retry_after: 建议的重试等待时间 (秒)
+    """
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """排队中的调用方，被放行时由 wake 通知 (线程事件或事件循环中的 Future)"""
+
+    __slots__ = ('deadline', 'granted', 'wake')
+
+    def __init__(self, deadline, wake):
+        self.deadline = deadline
+        self.granted = False
+        self.wake = wake
+
+
+class AdaptiveLimiter:
+    """
+    单个服务商的自适应并发限制器。
+    :param name: 服务商名称
+    :param initial_limit: 初始并发上限
+    :param min_limit: 并发上限的下限
+    :param max_limit: 并发上限的上限
+    :param max_queue: 等待队列长度上限
+    :param queue_timeout: 单个调用方在队列中的最长等待时间 (秒)
+    """
+
+    def __init__(self, name, initial_limit, min_limit, max_limit, max_queue, queue_timeout):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        self.baseline = None  # 调用耗时的长窗口指数移动平均 (秒)
+        self.smoothed = None  # 调用耗时的短窗口指数移动平均 (秒)
+        self._samples = 0
+        self._last_decrease = 0.0
+        self._queue = deque()
+        self._lock = threading.Lock()
+
+    # --- 准入 ---
+
+    def _retry_after(self):
+        """按当前排队长度与平均耗时估算的重试等待时间 (秒)"""
+        expected = (self.smoothed or 1.0) * (len(self._queue) + 1) / max(1.0, self.limit)
+        return max(1, math.ceil(expected))
+
+    def _try_acquire(self, wake):
+        """
+        在锁内尝试立即获取名额，否则登记为等待者。
+        :return: None 表示已获取名额，否则返回 _Waiter
+        :raises OverloadedError: 如果队列已满或预计等待时间超过截止时间
+        """
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._queue:
+                self.in_flight += 1
+                return None
+            if len(self._queue) >= self.max_queue:
+                self._shed('queue_full')
+            # 预计轮到本次调用时已超过截止时间，直接拒绝而不是等到超时
+            if self.smoothed is not None:
+                expected = self.smoothed * (len(self._queue) + 1) / max(1.0, self.limit)
+                if expected > self.queue_timeout:
+                    self._shed('deadline')
+            waiter = _Waiter(time.monotonic() + self.queue_timeout, wake)
+            self._queue.append(waiter)
+            return waiter
+
+    def _shed(self, reason):
+        metrics.ADMISSION_SHED.inc(provider=self.name, reason=reason)
+        raise OverloadedError(f"上游服务 {self.name} 繁忙，请稍后重试", self._retry_after())
+
+    def _abandon(self, waiter):
+        """
+        等待者超时或被取消时退出队列。
+        :return: 是否已在退出前被放行 (此时调用方持有名额)
+        """
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._queue.remove(waiter)
+            return False
+
+    def acquire(self):
+        """
+        获取一个调用名额 (阻塞当前线程，最长 queue_timeout 秒)。
+        :return: 获取名额的时间 (time.monotonic)，传给 release
+        :raises OverloadedError: 如果未能在截止时间前获取名额
+        """
+        event = threading.Event()
+        waiter = self._try_acquire(event.set)
+        if waiter is not None and not event.wait(waiter.deadline - time.monotonic()):
+            if not self._abandon(waiter):
+                self._shed('timeout')
+        return time.monotonic()
+
+    async def acquire_async(self):
+        """
+        获取一个调用名额 (协程中等待，不阻塞事件循环)，语义同 acquire。
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._try_acquire(wake)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(future), waiter.deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    self._shed('timeout')
+            except asyncio.CancelledError:
+                if self._abandon(waiter):
+                    self.release(None)
+                raise
+        return time.monotonic()
+
+    def release(self, started_at, outcome='ok'):
+        """
+        归还名额并根据本次调用调整并发上限，随后按顺序放行等待者。
+        :param started_at: acquire 返回的时间；None 表示调用未执行，不参与调整
+        :param outcome: 'ok' (正常完成)、'timeout' (超时，视为过载信号) 或 'error' (其他失败，不参与调整)
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if started_at is not None and outcome != 'error':
+                self._adjust(started_at, outcome)
+            while self._queue and self.in_flight < int(self.limit):
+                waiter = self._queue.popleft()
+                waiter.granted = True
+                self.in_flight += 1
+                waiter.wake()
+
+    # --- 梯度调整 ---
+
+    def _gradient(self, latency):
+        """
+        记录一次调用耗时，返回 基线 × 容忍倍数 与近期耗时之比 (0.5 ~ 1.0)，小于 1 表示上游在当前并发下变慢。
+        """
+        self._samples += 1
+        if self.smoothed is None:
+            self.smoothed = self.baseline = latency
+            return 1.0
+        # 样本不足时取算术平均，之后短窗口约 10 次调用
+        self.smoothed += (latency - self.smoothed) * max(0.1, 1 / self._samples)
+        gradient = max(0.5, min(1.0, self.baseline * Config.ADMISSION_LATENCY_TOLERANCE / self.smoothed))
+        # 基线跟随短窗口均值，慢升快降：近期变慢时约 1000 次调用才跟上 (负载导致的变慢由收缩上限消除，
+        # 不会很快被基线吸收；上游整体变慢时基线逐渐适应，上限随后恢复)，变快时约 100 次调用跟上
+        rate = 0.01 if self.smoothed <= self.baseline else 0.001
+        self.baseline += (self.smoothed - self.baseline) * max(rate, 1 / self._samples)
+        return gradient
+
+    def _adjust(self, started_at, outcome):
+        now = time.monotonic()
+        gradient = Config.ADMISSION_BACKOFF if outcome == 'timeout' else self._gradient(now - started_at)
+        if gradient < 1.0:
+            # 在上次收缩之前开始的调用反映的是旧的并发水平，不再重复收缩
+            if started_at >= self._last_decrease:
+                self.limit = max(self.min_limit, self.limit * max(gradient, Config.ADMISSION_BACKOFF))
+                self._last_decrease = now
+        elif self.in_flight + 1 >= self.limit / 2:
+            # 仅在并发接近上限时增加，避免空闲时上限无限增长
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def snapshot(self):
+        with self._lock:
+            return {'limit': int(self.limit), 'in_flight': self.in_flight, 'queued': len(self._queue)}
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider):
+    """
+    获取服务商对应的限制器 (懒加载)。
+    """
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(provider)
+            if limiter is None:
+                limiter = _limiters[provider] = AdaptiveLimiter(
+                    provider, **Config.ADMISSION_PROVIDERS.get(provider, Config.ADMISSION_DEFAULT_PROVIDER)
+                )
+    return limiter
+
+
+def call_outcome(exc):
+    """将调用中抛出的异常归类为 release 的 outcome"""
+    return 'timeout' if metrics.upstream_outcome(exc=exc) == 'timeout' else 'error'
+
+
+@contextmanager
+def slot(provider):
+    """
+    在线程中占用服务商的一个调用名额，代码块结束时归还。准入控制关闭时不做限制。
+    :raises OverloadedError: 如果未被准入
+    """
+    if not ENABLED:
+        yield
+        return
+    limiter = get_limiter(provider)
+    started_at = limiter.acquire()
+    outcome = 'ok'
+    try:
+        yield
+    except BaseException as e:
+        outcome = call_outcome(e)
+        raise
+    finally:
+        limiter.release(started_at, outcome)
+
+
+@asynccontextmanager
+async def async_slot(provider):
+    """
+    在协程中占用服务商的一个调用名额，语义同 slot。
+    """
+    if not ENABLED:
+        yield
+        return
+    limiter = get_limiter(provider)
+    started_at = await limiter.acquire_async()
+    outcome = 'ok'
+    try:
+        yield
+    except BaseException as e:
+        outcome = call_outcome(e)
+        raise
+    finally:
+        limiter.release(started_at, outcome)
+
+
+@metrics.register_collector
+def _collect_limiters():
+    snapshots = [(name, limiter.snapshot()) for name, limiter in list(_limiters.items())]
+    return [
+        (f'chameleon_admission_{field}', 'gauge', description,
+         [({'provider': name}, snapshot[field]) for name, snapshot in snapshots])
+        for field, description in (
+            ('limit', '自适应并发上限'),
+            ('in_flight', '已准入的进行中调用数'),
+            ('queued', '等待准入的调用数'),
+        )
+    ]
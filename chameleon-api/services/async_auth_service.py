@@ -0,0 +1,43 @@
+"""
+异步认证服务模块 (异步服务模式使用)，以异步 HTTP 客户端完成 GitHub OAuth2 登录流程，
+请求参数与令牌生成复用 auth_service。
+"""
+
+from services import async_http_client
+from services.auth_service import issue_session_token, parse_access_token, token_request_payload, user_info_headers
+from services.config import Config
+
+
+async def exchange_code_for_token(code: str):
+    """
+    使用授权码从 GitHub 获取访问令牌。
+    """
+    response = await async_http_client.post(
+        Config.GITHUB_TOKEN_URL, data=token_request_payload(code),
+        headers={"Accept": "application/json"}, upstream='github'
+    )
+    response.raise_for_status()
+    return parse_access_token(response.json())
+
+
+async def get_github_user_info(access_token: str):
+    """
+    使用访问令牌获取 GitHub 用户信息。
+    """
+    response = await async_http_client.get(
+        Config.GITHUB_USER_INFO_URL, headers=user_info_headers(access_token), upstream='github'
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def verify_github_login(code: str):
+    """
+    完成 GitHub OAuth2 登录流程，返回 (JWT 令牌, GitHub 用户名)。
+    """
+    try:
+        access_token = await exchange_code_for_token(code)
+        user_info = await get_github_user_info(access_token)
+        return issue_session_token(user_info)
+    except Exception as e:
+        raise Exception(f"GitHub 登录失败: {e}")
@@ -0,0 +1,153 @@
+"""
+异步出站 HTTP 客户端模块 (异步服务模式使用)，基于 aiohttp 为外部调用提供按事件循环共享的连接池、
+超时、重试与熔断，熔断状态与同步客户端 (http_client) 共用。
+"""
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from services import metrics
+from services.config import Config
+from services.http_client import CircuitOpenError, get_breaker
+
+# 与同步客户端的重试策略保持一致
+_RETRY_STATUSES = (429, 502, 503, 504)
+_IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+_sessions = {}  # 事件循环 -> aiohttp.ClientSession
+
+
+class AsyncResponse:
+    """已读取完整响应体的响应对象，接口与 requests.Response 的常用部分一致"""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"HTTP 请求失败: 状态码={self.status_code}, 响应={self.text[:200]}")
+
+
+def get_session():
+    """
+    获取当前事件循环的共享会话 (懒加载)。
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=Config.ASYNC_HTTP_POOL_SIZE, limit_per_host=Config.HTTP_POOL_SIZE)
+        session = _sessions[loop] = aiohttp.ClientSession(connector=connector)
+    return session
+
+
+async def close():
+    """
+    关闭当前事件循环的共享会话 (服务退出时调用)。
+    """
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+def _timeout(timeout):
+    if timeout is None:
+        timeout = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+    connect, read = timeout
+    return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+
+async def _send(method, url, timeout, kwargs):
+    """发送请求并按重试策略重试，返回未读取响应体的 aiohttp 响应"""
+    attempt = 0
+    while True:
+        try:
+            response = await get_session().request(method, url, timeout=_timeout(timeout), **kwargs)
+        except aiohttp.ClientConnectorError:
+            # 连接失败时请求未发出，所有方法都可安全重试
+            if attempt >= Config.HTTP_MAX_RETRIES:
+                raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if method not in _IDEMPOTENT_METHODS or attempt >= Config.HTTP_MAX_RETRIES:
+                raise
+        else:
+            if (response.status not in _RETRY_STATUSES or method not in _IDEMPOTENT_METHODS
+                    or attempt >= Config.HTTP_MAX_RETRIES):
+                return response
+            response.release()
+        attempt += 1
+        await asyncio.sleep(Config.HTTP_BACKOFF_FACTOR * (2 ** (attempt - 1)))
+
+
+@asynccontextmanager
+async def stream(method, url, upstream=None, timeout=None, **kwargs):
+    """
+    发送出站 HTTP 请求并以流的方式读取响应体。
+    用法：async with stream('GET', url) as response: async for chunk in response.content.iter_chunked(n): ...
+    :param upstream: 上游服务名称，用于熔断统计 (默认使用主机名)
+    :param timeout: (连接超时, 读取超时)，默认使用配置值
+    :raises CircuitOpenError: 如果上游处于熔断状态
+    :raises aiohttp.ClientError: 如果重试后仍然网络失败
+    """
+    upstream = upstream or urlsplit(url).netloc
+    breaker = get_breaker(upstream)
+    try:
+        trial = breaker.before_call()
+    except CircuitOpenError as e:
+        metrics.record_upstream(upstream, 0.0, exc=e)
+        raise
+    start = time.perf_counter()
+    try:
+        with metrics.UPSTREAM_IN_FLIGHT.track_inprogress(upstream=upstream):
+            response = await _send(method, url, timeout, kwargs)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        metrics.record_upstream(upstream, time.perf_counter() - start, exc=e)
+        breaker.record_failure()
+        raise
+    except BaseException:
+        # 被取消 (如对冲中落选) 或本地出错时释放试探名额，否则熔断器停留在半开且拒绝所有请求
+        if trial:
+            breaker.release_trial()
+        raise
+    metrics.record_upstream(upstream, time.perf_counter() - start, status_code=response.status)
+    if response.status >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    try:
+        yield response
+    finally:
+        response.release()
+
+
+async def request(method, url, upstream=None, timeout=None, **kwargs):
+    """
+    发送出站 HTTP 请求并读取完整响应体，参数同 stream。
+    :return: AsyncResponse
+    """
+    async with stream(method, url, upstream=upstream, timeout=timeout, **kwargs) as response:
+        content = await response.read()
+        return AsyncResponse(response.status, response.headers, content)
+
+
+async def get(url, **kwargs):
+    """发送 GET 请求，参数同 request"""
+    return await request('GET', url, **kwargs)
+
+
+async def post(url, **kwargs):
+    """发送 POST 请求，参数同 request"""
+    return await request('POST', url, **kwargs)
@@ -0,0 +1,309 @@
+"""
+异步模型服务模块 (异步服务模式使用)：以异步 HTTP 客户端调用 LLM 后端并下载结果图片，
+百炼任务提交 (SDK 包含本地文件上传)、SQLite 与 PIL 等阻塞操作交给线程池，任务结果由共享轮询器等待，
+不占用线程。请求参数、响应解析与各级缓存均复用 model_service。
+"""
+
+import asyncio
+import functools
+import mimetypes
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services import admission, async_http_client, image_service, metrics, model_router, model_service, result_cache
+from services.config import Config
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    获取执行阻塞操作的线程池 (懒加载)。
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.ASYNC_BLOCKING_WORKERS, thread_name_prefix='async-blocking'
+                )
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    在线程池中执行阻塞或 CPU 密集的函数 (SM2 解密、图片处理、SQLite 读写等)，不阻塞事件循环。
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def _call_llm_backend(backend, payload):
+    """向指定 LLM 后端发送非流式请求，行为同 model_service.call_llm_backend"""
+    with backend.track() as call:
+        async with admission.async_slot(backend.provider):
+            response = await async_http_client.post(
+                backend.url,
+                json=backend.payload(payload),
+                headers=backend.headers(),
+                upstream=backend.provider
+            )
+        call.status_code = response.status_code
+    return response
+
+
+async def _post_chat_completion(payload):
+    """
+    发送非流式 LLM 请求，路由、对冲与故障转移同 model_service.post_chat_completion，落选的调用被取消。
+    """
+    primary, fallback, delay = model_router.plan_llm_call()
+    if fallback is None:
+        return await _call_llm_backend(primary, payload)
+
+    first = asyncio.ensure_future(_call_llm_backend(primary, payload))
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            if model_router.succeeded(first):
+                return first.result()
+            metrics.LLM_HEDGES.inc(outcome='failover')
+            return await _call_llm_backend(fallback, payload)
+        if not model_router.try_hedge():
+            return await first
+
+        second = asyncio.ensure_future(_call_llm_backend(fallback, payload))
+        tasks.append(second)
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((task for task in done if model_router.succeeded(task)), None)
+            if winner is not None:
+                if winner is second:
+                    metrics.LLM_HEDGES.inc(outcome='won')
+                return winner.result()
+        # 均失败时返回首选后端的结果 (或抛出其异常)
+        return first.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def compliance_check(prompt: str):
+    """
+    合规性检查，行为同 model_service.compliance_check。
+    :raises PermissionError: 如果内容不合规
+    :raises Exception: 如果调用模型失败
+    """
+    cache_key = await run_blocking(model_service.cached_compliance, prompt)
+    if cache_key is None:
+        return
+    compliance_response = await _post_chat_completion(model_service.compliance_payload(prompt))
+    if compliance_response.status_code != 200:
+        raise Exception(f"硅基流动合规检查失败: {compliance_response.text}")
+    await run_blocking(model_service.apply_compliance_response, cache_key, compliance_response.json())
+
+
+async def call_silicon_flow_qwen3(prompt: str):
+    """
+    翻译提示词 (包含合规检查)，行为同 model_service.call_silicon_flow_qwen3。
+    :return: 翻译后的英文提示词
+    :raises ValueError: 如果翻译失败或响应格式错误
+    :raises Exception: 如果调用模型失败
+    """
+    cache_key, cached = await run_blocking(model_service.cached_translation, prompt)
+    if cached:
+        return cached
+
+    if await run_blocking(model_service.use_combined_mode, prompt, cache_key):
+        try:
+            return await call_combined_translate(prompt, cache_key)
+        except ValueError:
+            pass
+
+    await compliance_check(prompt)
+    translate_response = await _post_chat_completion(model_service.translate_payload(prompt))
+    if translate_response.status_code != 200:
+        raise Exception(f"硅基流动翻译失败: {translate_response.text}")
+    en_prompt = model_service.parse_translate_response(translate_response.json())
+    await run_blocking(model_service.remember_translation, cache_key, en_prompt)
+    return en_prompt
+
+
+async def call_combined_translate(prompt: str, cache_key: str):
+    """
+    单次调用同时完成合规检查与翻译，行为同 model_service.call_combined_translate。
+    """
+    combined_response = await _post_chat_completion(model_service.combined_payload(prompt))
+    if combined_response.status_code != 200:
+        raise Exception(f"硅基流动翻译失败: {combined_response.text}")
+    return await run_blocking(model_service.apply_combined_response, cache_key, combined_response.json())
+
+
+async def stream_translation(prompt: str):
+    """
+    流式翻译：先完成缓存查询与合规检查，再返回逐段产出英文译文的异步生成器。
+    :raises PermissionError: 如果内容不合规
+    :raises Exception: 如果合规检查调用失败
+    """
+    cache_key, cached = await run_blocking(model_service.cached_translation, prompt)
+    if cached:
+        return _single(cached)
+    await compliance_check(prompt)
+    return _stream_translate(prompt, cache_key)
+
+
+async def _single(text):
+    yield text
+
+
+async def _stream_translate(prompt: str, cache_key: str):
+    """以流式请求调用翻译模型，实时产出解析出的译文片段，完成后写入翻译缓存"""
+    parser = model_service.TranslationStream(cache_key)
+    backend = model_router.llm.choose()
+    async with admission.async_slot(backend.provider), async_http_client.stream(
+        'POST',
+        backend.url,
+        json=backend.payload(model_service.translate_payload(prompt, stream=True)),
+        headers=backend.headers(),
+        upstream=backend.provider
+    ) as translate_response:
+        if translate_response.status != 200:
+            raise Exception(f"硅基流动翻译失败: {await translate_response.text()}")
+        async for line in translate_response.content:
+            text = parser.feed_line(line)
+            if text:
+                yield text
+            if parser.finished:
+                break
+    remaining = await run_blocking(parser.finish)
+    if remaining:
+        yield remaining
+
+
+async def synthesize_image(file_path: str, prompt_text: str, backend=None) -> str:
+    """
+    以异步任务方式调用百炼平台进行图片编辑，由共享轮询器等待结果。
+    :param backend: 图片编辑后端 (model_router.Backend)，缺省时按路由选择
+    :return: 模型生成的结果图片地址
+    :raises Exception: 如果提交失败、任务失败或等待超时
+    """
+    backend = backend or model_router.image.choose()
+    with backend.track() as call:
+        async with admission.async_slot(backend.provider):
+            task_id, future = await run_blocking(
+                model_service.start_bailian_task, f'file://{file_path}', prompt_text, backend.model
+            )
+            try:
+                result = await asyncio.wrap_future(future)
+            except BaseException:
+                await run_blocking(model_service.finish_bailian_task, task_id, None)
+                raise
+        call.status_code = result.status_code
+    await run_blocking(model_service.finish_bailian_task, task_id, result)
+    return model_service.result_image_url(result)
+
+
+def _remove_if_exists(file_path):
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
+async def write_stream(image_response, file_path):
+    """
+    将 aiohttp 响应体分块写入文件，文件操作在线程池中执行，不阻塞事件循环；写入失败或被取消时删除残缺文件。
+    """
+    f = await run_blocking(open, file_path, 'wb')
+    try:
+        try:
+            async for chunk in image_response.content.iter_chunked(Config.RESULT_CHUNK_SIZE):
+                await run_blocking(f.write, chunk)
+        finally:
+            await run_blocking(f.close)
+    except BaseException:
+        await run_blocking(_remove_if_exists, file_path)
+        raise
+
+
+async def deliver_result(image_url: str):
+    """
+    下载模型生成的图片，并按 RESULT_DELIVERY 配置返回结果 (结果缓存关闭时使用)。
+    'url' 模式分块流式写入上传目录，不在内存中保留整张图片。
+    """
+    async with async_http_client.stream('GET', image_url, upstream='bailian-result') as image_response:
+        if image_response.status != 200:
+            raise Exception(f"从 URL 下载处理后的图片失败: {image_url}, 状态码: {image_response.status}")
+        mime_type = model_service.result_mime_type(image_response, image_url)
+        if Config.RESULT_DELIVERY == 'url':
+            _, file_path, file_url_path = image_service.new_result_file(mimetypes.guess_extension(mime_type) or '.png')
+            await write_stream(image_response, file_path)
+            return {'result_url': file_url_path}
+        content = await image_response.read()
+    return await run_blocking(model_service.encode_result, content, mime_type)
+
+
+async def download_to_cache(image_url: str):
+    """
+    将模型生成的图片分块流式写入结果缓存目录。
+    :return: (file_path, mime_type) 元组
+    """
+    async with async_http_client.stream('GET', image_url, upstream='bailian-result') as image_response:
+        if image_response.status != 200:
+            raise Exception(f"从 URL 下载处理后的图片失败: {image_url}, 状态码: {image_response.status}")
+        mime_type = model_service.result_mime_type(image_response, image_url)
+        file_path = result_cache.new_file_path(mimetypes.guess_extension(mime_type) or '.png')
+        tmp_path = f"{file_path}.tmp"
+        await write_stream(image_response, tmp_path)
+    try:
+        await run_blocking(os.replace, tmp_path, file_path)
+    except BaseException:
+        await run_blocking(_remove_if_exists, tmp_path)
+        raise
+    return file_path, mime_type
+
+
+async def call_bailian(file_path: str, prompt_text: str, content_hash: str = None):
+    """
+    图片编辑，行为与返回结构同 model_service.call_bailian。
+    """
+    await compliance_check(prompt_text)
+
+    if not Config.RESULT_CACHE_ENABLED:
+        return await deliver_result(await synthesize_image(file_path, prompt_text))
+
+    if content_hash is None:
+        content_hash = await run_blocking(image_service.hash_file, file_path)
+    # 先选择后端，缓存键使用实际生成结果的模型 ID
+    backend = model_router.image.choose()
+    cache_key = result_cache.make_key(content_hash, backend.model, prompt_text)
+    cached = await run_blocking(result_cache.lookup, cache_key)
+    if cached is not None:
+        try:
+            return await run_blocking(model_service.format_cached_result, *cached)
+        except FileNotFoundError:
+            # 文件在查询与读取之间被淘汰，按未命中处理
+            pass
+    # 并发的相同请求只调用一次模型
+    cached = await result_cache.coalesce_async(
+        cache_key, lambda: generate_and_cache(cache_key, file_path, prompt_text, backend)
+    )
+    return await run_blocking(model_service.format_cached_result, *cached)
+
+
+async def generate_and_cache(cache_key: str, file_path: str, prompt_text: str, backend=None):
+    """
+    调用模型生成结果并写入结果缓存 (合并请求的执行者调用)。
+    :param backend: 生成结果的图片编辑后端，须与缓存键中的模型一致
+    :return: (file_path, mime_type) 元组
+    """
+    # 其他请求可能在本请求查询缓存之后、成为执行者之前写入了结果，调用模型前再查询一次
+    cached = await run_blocking(result_cache.lookup, cache_key, record=False)
+    if cached is not None:
+        return cached
+    image_url = await synthesize_image(file_path, prompt_text, backend)
+    result_path, mime_type = await download_to_cache(image_url)
+    result_path, mime_type = await run_blocking(model_service.prepare_cached_result, result_path, mime_type)
+    await run_blocking(result_cache.store, cache_key, result_path, mime_type)
+    return result_path, mime_type
@@ -6,21 +6,19 @@
 import datetime
 import hashlib
 import secrets
-import sqlite3
 
 import jwt
 import requests
 
+from services import db, http_client
 from services.config import Config
 
 
 def get_db_connection():
     """
-    获取数据库连接，并设置行工厂以便通过列名访问数据。
+    获取当前线程复用的数据库连接 (已设置行工厂，可通过列名访问数据，调用方不要关闭)。
     """
-    conn = sqlite3.connect(Config.DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return db.get_connection()
 
 
 def hash_identifier(identifier: str) -> str:
@@ -51,37 +49,58 @@ def get_github_authorize_url():
     return authorize_url
 
 
-def exchange_code_for_token(code: str):
+def token_request_payload(code: str):
     """
-    使用授权码从 GitHub 获取访问令牌。
+    构造用授权码换取访问令牌的请求体。
     """
-    payload = {
+    return {
         "code": code,
         "client_id": Config.GITHUB_CLIENT_ID,
         "client_secret": Config.GITHUB_CLIENT_SECRET,
         "redirect_uri": Config.GITHUB_REDIRECT_URI,
     }
-    headers = {
-        "Accept": "application/json"
-    }
-    response = requests.post(Config.GITHUB_TOKEN_URL, data=payload, headers=headers)
-    response.raise_for_status()  # 如果状态码不是 2xx，会抛出异常
-    token_data = response.json()
+
+
+def parse_access_token(token_data):
+    """
+    从 GitHub 令牌响应中取出访问令牌。
+    :raises Exception: 如果响应中没有访问令牌
+    """
     access_token = token_data.get("access_token")
     if not access_token:
         raise Exception(f"从 GitHub 获取访问令牌失败: {token_data}")
     return access_token
 
 
-def get_github_user_info(access_token: str):
+def user_info_headers(access_token: str):
     """
-    使用访问令牌获取 GitHub 用户信息。
+    获取用户信息的请求头。
     """
-    headers = {
+    return {
         "Authorization": f"token {access_token}",
         "Accept": "application/json"
     }
-    response = requests.get(Config.GITHUB_USER_INFO_URL, headers=headers)
+
+
+def exchange_code_for_token(code: str):
+    """
+    使用授权码从 GitHub 获取访问令牌。
+    """
+    headers = {
+        "Accept": "application/json"
+    }
+    response = http_client.post(
+        Config.GITHUB_TOKEN_URL, data=token_request_payload(code), headers=headers, upstream='github'
+    )
+    response.raise_for_status()  # 如果状态码不是 2xx，会抛出异常
+    return parse_access_token(response.json())
+
+
+def get_github_user_info(access_token: str):
+    """
+    使用访问令牌获取 GitHub 用户信息。
+    """
+    response = http_client.get(Config.GITHUB_USER_INFO_URL, headers=user_info_headers(access_token), upstream='github')
     response.raise_for_status()
     user_info = response.json()
     return user_info
@@ -99,25 +118,37 @@ def verify_github_login(code: str):
         access_token = exchange_code_for_token(code)
         # 2. 获取用户信息
         user_info = get_github_user_info(access_token)
-        github_id = user_info.get('id')
-        github_login = user_info.get('login')  # 获取 GitHub 用户名
-        if not github_id:
-            raise Exception("获取 GitHub 用户 ID 失败")
-        # 使用 GitHub ID 作为唯一标识符
-        identifier = str(github_id)
-        # 3. (可选) 记录用户登录 (如果需要限制登录次数，可以基于 github_id)
-        # 此处简化，不实现登录次数限制
-        # 4. 生成JWT会话令牌
-        hashed_identifier = hash_identifier(identifier)  # 复用哈希函数
-        payload = {
-            'identifier': hashed_identifier,  # 存储哈希后的标识符
-            'github_login': github_login,
-            'exp': datetime.datetime.utcnow() + datetime.timedelta(days=7)  # 7天过期
-        }
-        token = jwt.encode(payload, Config.SECRET_KEY, algorithm='HS256')
-        # 返回 token 和 github_login
-        return token, github_login  # <-- 修改：返回用户名
+        # 3. 生成JWT会话令牌
+        return issue_session_token(user_info)
     except requests.exceptions.RequestException as e:
         raise Exception(f"GitHub OAuth 过程中网络错误: {e}")
     except Exception as e:
         raise Exception(f"GitHub 登录失败: {e}")
+
+
+def issue_session_token(user_info):
+    """
+    根据 GitHub 用户信息生成 JWT 会话令牌。
+    :return: (JWT 令牌, GitHub 用户名)
+    :raises Exception: 如果用户信息中没有 ID
+    """
+    github_id = user_info.get('id')
+    github_login = user_info.get('login')  # 获取 GitHub 用户名
+    if not github_id:
+        raise Exception("获取 GitHub 用户 ID 失败")
+    # 使用 GitHub ID 作为唯一标识符
+    identifier = str(github_id)
+    # (可选) 记录用户登录 (如果需要限制登录次数，可以基于 github_id)
+    # 此处简化，不实现登录次数限制
+    hashed_identifier = hash_identifier(identifier)  # 复用哈希函数
+    now = datetime.datetime.utcnow()
+    payload = {
+        'identifier': hashed_identifier,  # 存储哈希后的标识符
+        'github_login': github_login,
+        'jti': secrets.token_hex(16),  # 令牌 ID，用于吊销单个令牌
+        'iat': now,
+        'exp': now + datetime.timedelta(seconds=Config.SESSION_TOKEN_TTL)  # 默认7天过期
+    }
+    token = jwt.encode(payload, Config.SECRET_KEY, algorithm='HS256')
+    # 返回 token 和 github_login
+    return token, github_login
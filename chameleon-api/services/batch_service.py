@@ -0,0 +1,93 @@
+"""
+批量图片编辑服务模块：对同一批次的 (图片, 提示词) 条目去重，批量完成合规检查后，
+以有界并发调用模型，并按完成顺序逐条返回结果。
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from services import admission, http_client, model_service
+from services.cache import prompt_key
+from services.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def error_view(e):
+    """
+    将处理条目时的异常转换为 (错误信息, 错误码)，与同步接口的状态码保持一致。
+    """
+    if isinstance(e, PermissionError):
+        return str(e), 403
+    if isinstance(e, ValueError):
+        return str(e), 400
+    if isinstance(e, (http_client.CircuitOpenError, admission.OverloadedError)):
+        return str(e), 503
+    return '图片处理失败', 500
+
+
+def _failed(index, e):
+    error, error_code = error_view(e)
+    return {'index': index, 'status': 'failed', 'error': error, 'error_code': error_code}
+
+
+def run_batch(items):
+    """
+    执行一批图片编辑。
+    :param items: 条目列表，每项为 (file_path, prompt, content_hash)，条目序号即列表下标
+    :return: 生成器，按完成顺序产出每个条目的结果字典：
+             成功为 {'index', 'status': 'succeeded', ...与 /api/process 相同的结果字段}，
+             失败为 {'index', 'status': 'failed', 'error', 'error_code'}
+    """
+    # 相同 (图片内容, 提示词) 的条目只处理一次，结果分发给所有重复条目
+    groups = {}
+    for index, (file_path, prompt, content_hash) in enumerate(items):
+        key = (content_hash, prompt_key(prompt))
+        group = groups.setdefault(key, {
+            'file_path': file_path, 'prompt': prompt, 'content_hash': content_hash, 'indices': []
+        })
+        group['indices'].append(index)
+
+    workers = max(1, min(Config.BATCH_MAX_CONCURRENCY, len(groups)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch')
+    try:
+        # 1. 对去重后的提示词批量进行合规检查
+        prompts = {}
+        for group in groups.values():
+            prompts.setdefault(prompt_key(group['prompt']), group['prompt'])
+        verdicts = model_service.compliance_check_batch(list(prompts.values()))
+        rejected = {}
+        for key, verdict in zip(prompts, verdicts):
+            if verdict == 'DISALLOWED':
+                rejected[key] = PermissionError("提示词包含不允许的内容")
+            elif verdict is None:
+                rejected[key] = Exception("合规检查失败")
+
+        # 2. 通过检查的条目以有界并发调用模型，先返回未通过的条目
+        pending = {}
+        for group in groups.values():
+            error = rejected.get(prompt_key(group['prompt']))
+            if error is not None:
+                for index in group['indices']:
+                    yield _failed(index, error)
+                continue
+            future = executor.submit(
+                model_service.call_bailian, group['file_path'], group['prompt'], group['content_hash']
+            )
+            pending[future] = group
+
+        for future in as_completed(pending):
+            group = pending[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                if error_view(e)[1] == 500:
+                    logger.error(f"批量处理条目 {group['indices']} 时出错: {e}")
+                for index in group['indices']:
+                    yield _failed(index, e)
+                continue
+            for index in group['indices']:
+                yield {'index': index, 'status': 'succeeded', **result}
+    finally:
+        # 客户端中途断开时取消尚未开始的条目
+        executor.shutdown(wait=False, cancel_futures=True)
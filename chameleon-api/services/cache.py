@@ -0,0 +1,247 @@
+"""
+缓存模块，提供进程内 LRU 缓存以及可选的共享缓存层 (SQLite 表或 Redis)。
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from services import db, metrics
+from services.redis_client import get_redis
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    规范化提示词：全角转半角、去除首尾空白、合并连续空白、统一小写。
+    """
+    text = unicodedata.normalize('NFKC', prompt)
+    return _WHITESPACE_RE.sub(' ', text).strip().lower()
+
+
+def prompt_key(prompt: str) -> str:
+    """
+    计算规范化提示词的 SHA256 哈希，作为缓存键。
+    """
+    return hashlib.sha256(normalize_prompt(prompt).encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """线程安全的进程内 LRU 缓存，支持 TTL 和容量上限"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class SQLiteCacheTier:
+    """基于 SQLite 表的共享缓存层，值以 JSON 存储 (表结构见 schema.sql)"""
+
+    def __init__(self, table, ttl, max_size):
+        self.table = table
+        self.ttl = ttl
+        self.max_size = max_size
+        self._writes = 0
+
+    def get(self, key):
+        row = db.get_connection().execute(
+            f"SELECT value FROM {self.table} WHERE key = ? AND expires_at >= ?",
+            (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        with db.transaction() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            self._writes += 1
+            # 每写入一定次数后清理过期记录并裁剪到容量上限，避免每次写入都扫表
+            if self._writes % 100 == 0:
+                self._evict(conn)
+
+    def delete(self, key):
+        with db.transaction() as conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def items(self):
+        """返回所有未过期的 (key, value, expires_at)，按过期时间从新到旧排序，用于预热"""
+        rows = db.get_connection().execute(
+            f"SELECT key, value, expires_at FROM {self.table} WHERE expires_at >= ?"
+            f" ORDER BY expires_at DESC LIMIT ?",
+            (time.time(), self.max_size)
+        ).fetchall()
+        return [(key, json.loads(value), expires_at) for key, value, expires_at in rows]
+
+    def _evict(self, conn):
+        conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (time.time(),))
+        conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f" SELECT key FROM {self.table} ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,)
+        )
+
+
+class RedisCacheTier:
+    """基于 Redis 的共享缓存层，过期由 Redis TTL 负责"""
+
+    def __init__(self, client, prefix, ttl):
+        self.client = client
+        self.prefix = f"chameleon:cache:{prefix}:"
+        self.ttl = ttl
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl if ttl is not None else self.ttl))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+def build_shared_tier(kind, name, ttl, max_size):
+    """
+    根据配置创建共享缓存层。
+    :param kind: 'sqlite'、'redis' 或空字符串 (不使用共享层)
+    :param name: 缓存名称，用作表名或键前缀
+    :return: 共享缓存层对象；未启用时返回 None
+    """
+    if kind == 'sqlite':
+        return SQLiteCacheTier(f"cache_{name}", ttl, max_size)
+    if kind == 'redis':
+        client = get_redis()
+        if client is None:
+            raise ValueError("共享缓存配置为 Redis，但 RATELIMIT_STORAGE_URL 未指向 Redis")
+        return RedisCacheTier(client, name, ttl)
+    return None
+
+
+_tiered_caches = []
+
+
+@metrics.register_collector
+def _collect_tiered_caches():
+    snapshots = [(cache.name, cache.stats()) for cache in _tiered_caches]
+    return [
+        ('chameleon_cache_events_total', 'counter', '两级缓存的命中/未命中/共享层错误次数',
+         [({'cache': name, 'event': event}, stats[event])
+          for name, stats in snapshots for event in ('local_hits', 'shared_hits', 'misses', 'errors')]),
+        ('chameleon_cache_hit_ratio', 'gauge', '两级缓存命中率',
+         [({'cache': name}, stats['hit_ratio']) for name, stats in snapshots]),
+        ('chameleon_cache_entries', 'gauge', '进程内缓存条目数',
+         [({'cache': name}, stats['size']) for name, stats in snapshots]),
+    ]
+
+
+class TieredCache:
+    """两级缓存：进程内 LRU + 可选共享层，并统计命中/未命中次数"""
+
+    def __init__(self, name, local, shared=None):
+        _tiered_caches.append(self)
+        self.name = name
+        self.local = local
+        self.shared = shared
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'errors': 0}
+
+    def _count(self, *names):
+        with self._stats_lock:
+            for name in names:
+                self._stats[name] += 1
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            self._count('hits', 'local_hits')
+            return value
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception:
+                # 共享层故障时降级为仅使用本地缓存
+                self._count('errors')
+                value = None
+            if value is not None:
+                self.local.set(key, value)
+                self._count('hits', 'shared_hits')
+                return value
+        self._count('misses')
+        return None
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value)
+            except Exception:
+                self._count('errors')
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except Exception:
+                self._count('errors')
+
+    def warm(self):
+        """
+        从共享层加载未过期条目到进程内缓存 (仅 SQLite 共享层支持)。
+        :return: 加载的条目数
+        """
+        if not hasattr(self.shared, 'items'):
+            return 0
+        now = time.time()
+        entries = self.shared.items()
+        # 先加载最早过期的条目，使最新的条目在 LRU 中最后被淘汰
+        for key, value, expires_at in reversed(entries):
+            self.local.set(key, value, ttl=expires_at - now)
+        return len(entries)
+
+    def stats(self):
+        """返回命中统计的快照"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / total if total else 0.0
+        stats['size'] = len(self.local)
+        return stats
@@ -2,6 +2,7 @@
 """
 应用配置模块，集中管理所有配置项。
 """
+import json
 import os
 
 
@@ -11,10 +12,11 @@ class Config:
     SECRET_KEY = os.environ.get('CHAMELEON_APP_SECRET_KEY') or 'secret_key'
 
     # 数据库文件路径
-    DATABASE = os.path.join(os.path.dirname(__file__), 'chameleon.db')
+    DATABASE = os.environ.get('CHAMELEON_APP_DATABASE') or os.path.join(os.path.dirname(__file__), 'chameleon.db')
 
     # 上传文件夹路径
-    UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'static', 'uploads')
+    UPLOAD_FOLDER = os.environ.get('CHAMELEON_APP_UPLOAD_FOLDER') or os.path.join(
+        os.path.dirname(__file__), 'static', 'uploads')
 
     # 最大上传文件大小 (6MB)
     MAX_CONTENT_LENGTH = 6 * 1024 * 1024
@@ -31,7 +33,8 @@ class Config:
     # 硅基流动 API 配置 (用于 Qwen3)
     SILICON_FLOW_API_KEY = os.environ.get(
         'CHAMELEON_APP_SILICON_FLOW_API_KEY') or 'silicon_flow_api_key'
-    SILICON_FLOW_LLM_URL = "https://api.siliconflow.cn/v1/chat/completions"
+    SILICON_FLOW_LLM_URL = os.environ.get(
+        'CHAMELEON_APP_SILICON_FLOW_LLM_URL') or "https://api.siliconflow.cn/v1/chat/completions"
 
     # 百炼平台 API 配置
     BAILIAN_API_KEY = os.environ.get('CHAMELEON_APP_BAILIAN_API_KEY') or 'bailian_api_key'
@@ -42,10 +45,251 @@ class Config:
     GITHUB_CLIENT_ID = os.environ.get('CHAMELEON_APP_GITHUB_CLIENT_ID') or 'github_client_id'
     GITHUB_CLIENT_SECRET = os.environ.get('CHAMELEON_APP_GITHUB_CLIENT_SECRET') or 'github_client_secret'
     GITHUB_REDIRECT_URI = os.environ.get('CHAMELEON_APP_GITHUB_REDIRECT_URI') or 'github_redirect_url'
-    GITHUB_AUTHORIZATION_URL = 'https://github.com/login/oauth/authorize'
-    GITHUB_TOKEN_URL = 'https://github.com/login/oauth/access_token'
-    GITHUB_USER_INFO_URL = 'https://api.github.com/user'
+    # GitHub 接口地址 (可指向本地模拟服务)
+    GITHUB_AUTHORIZATION_URL = os.environ.get(
+        'CHAMELEON_APP_GITHUB_AUTHORIZATION_URL') or 'https://github.com/login/oauth/authorize'
+    GITHUB_TOKEN_URL = os.environ.get('CHAMELEON_APP_GITHUB_TOKEN_URL') or 'https://github.com/login/oauth/access_token'
+    GITHUB_USER_INFO_URL = os.environ.get('CHAMELEON_APP_GITHUB_USER_INFO_URL') or 'https://api.github.com/user'
 
     # --- Flask-Limiter 配置 ---
     # 使用 Redis 作为存储后端，用于限流
     RATELIMIT_STORAGE_URL = os.environ.get('CHAMELEON_APP_REDIS_URL') or "xxxxxx"  # 根据你的 Redis 配置修改
+    # 是否启用限流 (仅用于压测等受控环境时关闭)
+    RATELIMIT_ENABLED = os.environ.get('CHAMELEON_APP_RATELIMIT', '1').lower() in ('1', 'true', 'yes')
+
+    # --- 异步任务队列配置 ---
+    # 执行图片处理任务的工作线程数
+    JOB_WORKERS = int(os.environ.get('CHAMELEON_APP_JOB_WORKERS') or 4)
+    # 排队中与执行中任务的总上限，超出时直接拒绝
+    JOB_MAX_PENDING = int(os.environ.get('CHAMELEON_APP_JOB_MAX_PENDING') or 200)
+    # 任务记录保留时长 (秒)
+    JOB_TTL_SECONDS = 60 * 60
+    # 跨进程查询任务状态时的轮询间隔 (秒)
+    JOB_POLL_INTERVAL = 0.5
+    # SSE 事件流最长保持时间 (秒)
+    JOB_EVENTS_TIMEOUT = 5 * 60
+    # /api/process 是否默认以异步任务方式处理 (也可通过 ?async=1 单独指定)
+    PROCESS_ASYNC_DEFAULT = os.environ.get('CHAMELEON_APP_PROCESS_ASYNC', '').lower() in ('1', 'true', 'yes')
+
+    # --- 百炼异步任务配置 ---
+    # 是否使用异步任务接口提交图片编辑 (由单个轮询线程统一等待结果)
+    BAILIAN_ASYNC_TASKS = os.environ.get('CHAMELEON_APP_BAILIAN_ASYNC', '').lower() in ('1', 'true', 'yes')
+    # 百炼 API 地址，留空使用 SDK 默认值 (可指向本地模拟服务)
+    BAILIAN_BASE_URL = os.environ.get('CHAMELEON_APP_BAILIAN_BASE_URL') or ''
+    # 轮询间隔 (秒)
+    BAILIAN_POLL_INTERVAL = 1.0
+    # 单个任务最长等待时间 (秒)
+    BAILIAN_TASK_TIMEOUT = 5 * 60
+
+    # --- 合规检查结论缓存配置 ---
+    # 进程内缓存条目上限
+    COMPLIANCE_CACHE_SIZE = 10000
+    # 缓存有效期 (秒)
+    COMPLIANCE_CACHE_TTL = 24 * 60 * 60
+    # 共享缓存层：'sqlite'、'redis' 或留空 (仅进程内缓存)
+    COMPLIANCE_CACHE_SHARED = os.environ.get('CHAMELEON_APP_COMPLIANCE_CACHE_SHARED') or ''
+
+    # --- 翻译结果缓存配置 ---
+    # 缓存条目上限 (进程内与 SQLite 共享层)
+    TRANSLATION_CACHE_SIZE = 50000
+    # 缓存有效期 (秒)
+    TRANSLATION_CACHE_TTL = 30 * 24 * 60 * 60
+    # 共享缓存层：默认写穿到 SQLite，可改为 'redis' 或留空
+    TRANSLATION_CACHE_SHARED = os.environ.get('CHAMELEON_APP_TRANSLATION_CACHE_SHARED', 'sqlite')
+    # 启动时预置的常用提示词文件 (可选)
+    TRANSLATION_CACHE_SEED_FILE = os.environ.get('CHAMELEON_APP_TRANSLATION_SEED_FILE') or ''
+
+    # --- 合规检查 + 翻译单次调用配置 ---
+    # 是否在一次模型请求中同时完成合规检查与翻译 (解析失败时自动回退到两次调用)
+    SILICON_FLOW_COMBINED_MODE = os.environ.get('CHAMELEON_APP_COMBINED_TRANSLATE', '').lower() in ('1', 'true', 'yes')
+
+    # --- 出站 HTTP 配置 ---
+    # 每个上游主机的连接池大小
+    HTTP_POOL_SIZE = int(os.environ.get('CHAMELEON_APP_HTTP_POOL_SIZE') or 20)
+    # 连接超时与读取超时 (秒)
+    HTTP_CONNECT_TIMEOUT = 5
+    HTTP_READ_TIMEOUT = 60
+    # 重试次数与指数退避系数 (仅幂等请求或连接失败时重试)
+    HTTP_MAX_RETRIES = 2
+    HTTP_BACKOFF_FACTOR = 0.5
+    # 熔断：连续失败次数阈值与冷却时间 (秒)
+    HTTP_BREAKER_THRESHOLD = 5
+    HTTP_BREAKER_RESET_SECONDS = 30
+
+    # --- 结果图片返回方式 ---
+    # 'base64': 重新编码为 PNG 后 Base64 返回 (兼容旧前端)
+    # 'passthrough': 保持模型输出的原始编码 Base64 返回，附带 mime_type
+    # 'url': 流式保存到上传目录，返回 /uploads/ 下的访问地址
+    RESULT_DELIVERY = os.environ.get('CHAMELEON_APP_RESULT_DELIVERY') or 'base64'
+    # 流式下载的分块大小 (字节)
+    RESULT_CHUNK_SIZE = 64 * 1024
+
+    # --- 过期清理配置 ---
+    # 上传文件与结果文件的保留时长 (秒)
+    UPLOAD_RETENTION_SECONDS = 60 * 60
+    # 清理任务的运行间隔 (秒)
+    EXPIRY_INTERVAL_SECONDS = 60
+    # 每批删除的记录数与单次运行的最大批数
+    EXPIRY_BATCH_SIZE = 200
+    EXPIRY_MAX_BATCHES = 10
+    # 删除文件的后台线程数
+    EXPIRY_FILE_WORKERS = 2
+
+    # --- SQLite 连接配置 ---
+    # 等待写锁的最长时间 (毫秒)
+    DB_BUSY_TIMEOUT_MS = 5000
+    # 每个连接缓存的预编译语句数
+    DB_CACHED_STATEMENTS = 256
+
+    # --- 上传去重配置 ---
+    # 计算内容哈希时的分块大小 (字节)
+    UPLOAD_HASH_CHUNK_SIZE = 64 * 1024
+
+    # --- 图片编辑结果缓存配置 ---
+    # 是否缓存 (图片内容, 提示词, 模型) 对应的编辑结果
+    RESULT_CACHE_ENABLED = os.environ.get('CHAMELEON_APP_RESULT_CACHE', '1').lower() in ('1', 'true', 'yes')
+    # 结果缓存目录与总大小上限 (字节)
+    RESULT_CACHE_FOLDER = os.environ.get('CHAMELEON_APP_RESULT_CACHE_FOLDER') or os.path.join(
+        os.path.dirname(__file__), 'static', 'result_cache')
+    RESULT_CACHE_MAX_BYTES = int(os.environ.get('CHAMELEON_APP_RESULT_CACHE_MAX_BYTES') or 1024 * 1024 * 1024)
+
+    # --- 上传图片预处理配置 ---
+    # 是否在保存前校验、去除 EXIF 并按画质档位缩放重编码
+    IMAGE_PREPROCESS_ENABLED = os.environ.get('CHAMELEON_APP_IMAGE_PREPROCESS', '1').lower() in ('1', 'true', 'yes')
+    # 画质档位：最长边像素上限与 JPEG 编码质量
+    IMAGE_QUALITY_PROFILES = {
+        'fast': {'max_side': 1280, 'jpeg_quality': 80},
+        'balanced': {'max_side': 2048, 'jpeg_quality': 88},
+        'high': {'max_side': 4096, 'jpeg_quality': 95},
+    }
+    IMAGE_QUALITY_PROFILE = os.environ.get('CHAMELEON_APP_IMAGE_QUALITY_PROFILE') or 'balanced'
+    # 预处理进程数 (0 表示在请求线程中执行) 与单张图片的处理超时 (秒)
+    IMAGE_PREPROCESS_WORKERS = int(os.environ.get('CHAMELEON_APP_IMAGE_PREPROCESS_WORKERS') or 2)
+    IMAGE_PREPROCESS_TIMEOUT = 30
+
+    # --- 批量图片编辑配置 ---
+    # 单次批量请求的条目数上限
+    BATCH_MAX_ITEMS = int(os.environ.get('CHAMELEON_APP_BATCH_MAX_ITEMS') or 8)
+    # 单次批量请求内合规检查与模型调用的最大并发数
+    BATCH_MAX_CONCURRENCY = int(os.environ.get('CHAMELEON_APP_BATCH_MAX_CONCURRENCY') or 4)
+
+    # --- 批量合规检查配置 ---
+    # 每次打包请求中的提示词条数
+    COMPLIANCE_BATCH_SIZE = int(os.environ.get('CHAMELEON_APP_COMPLIANCE_BATCH_SIZE') or 20)
+    # 并发的打包请求数 (回退为单条检查时同样适用)
+    COMPLIANCE_BATCH_CONCURRENCY = int(os.environ.get('CHAMELEON_APP_COMPLIANCE_BATCH_CONCURRENCY') or 4)
+    # 批量合规检查接口单次请求的条目数上限
+    COMPLIANCE_BATCH_MAX_ITEMS = int(os.environ.get('CHAMELEON_APP_COMPLIANCE_BATCH_MAX_ITEMS') or 100)
+
+    # --- 合规检查本地预过滤配置 ---
+    PREFILTER_ENABLED = os.environ.get('CHAMELEON_APP_PREFILTER', '1').lower() in ('1', 'true', 'yes')
+    # 违规词表 (命中即不合规) 与合规提示词白名单，每行一条，# 开头为注释；未配置时不启用对应词表
+    PREFILTER_BLOCKLIST_FILE = os.environ.get('CHAMELEON_APP_PREFILTER_BLOCKLIST_FILE')
+    PREFILTER_ALLOWLIST_FILE = os.environ.get('CHAMELEON_APP_PREFILTER_ALLOWLIST_FILE')
+    # 检查词表文件是否更新的间隔 (秒)
+    PREFILTER_RELOAD_INTERVAL = int(os.environ.get('CHAMELEON_APP_PREFILTER_RELOAD_INTERVAL') or 10)
+
+    # --- 服务监听配置 (直接运行 app.py 或 async_app.py 时) ---
+    SERVER_PORT = int(os.environ.get('CHAMELEON_APP_PORT') or 5001)
+
+    # --- 异步服务模式配置 (async_app.py) ---
+    # 执行阻塞操作 (SM2 解密、图片处理、SQLite 读写、百炼任务提交) 的线程数
+    ASYNC_BLOCKING_WORKERS = int(os.environ.get('CHAMELEON_APP_ASYNC_BLOCKING_WORKERS') or 32)
+    # 异步 HTTP 客户端的总连接数上限 (单个主机的上限沿用 HTTP_POOL_SIZE)
+    ASYNC_HTTP_POOL_SIZE = int(os.environ.get('CHAMELEON_APP_ASYNC_HTTP_POOL_SIZE') or 1000)
+
+    # --- SM2 解密配置 ---
+    # 解密实现：auto (优先使用快速实现，不可用时回退)、fast (整数运算 + 预计算私钥，安装 gmpy2 时使用原生大整数)、gmssl
+    SM2_BACKEND = (os.environ.get('CHAMELEON_APP_SM2_BACKEND') or 'auto').lower()
+    # 解密进程数 (0 表示始终在请求线程中解密) 与转交进程池前允许的并发解密数
+    SM2_PROCESS_WORKERS = int(os.environ.get('CHAMELEON_APP_SM2_PROCESS_WORKERS') or 2)
+    SM2_OFFLOAD_THRESHOLD = int(os.environ.get('CHAMELEON_APP_SM2_OFFLOAD_THRESHOLD') or 4)
+
+    # --- 加密会话配置 (SM2 密钥交换 + SM4 加密提示词) ---
+    # 会话密钥有效期 (秒)，过期后客户端重新进行密钥交换
+    CRYPTO_SESSION_TTL = int(os.environ.get('CHAMELEON_APP_CRYPTO_SESSION_TTL') or 2 * 60 * 60)
+    CRYPTO_SESSION_CACHE_SIZE = 100000
+    # 共享缓存层：'sqlite'、'redis' 或留空 (仅进程内缓存；多进程部署时需配置共享层)
+    CRYPTO_SESSION_SHARED = os.environ.get('CHAMELEON_APP_CRYPTO_SESSION_SHARED') or ''
+
+    # --- 会话令牌配置 ---
+    # 会话令牌有效期 (秒)，同时决定吊销记录的保留时长
+    SESSION_TOKEN_TTL = 7 * 24 * 60 * 60
+    # 已校验令牌的进程内缓存条目上限与有效期 (秒，不超过令牌自身的过期时间)
+    SESSION_CACHE_SIZE = 10000
+    SESSION_CACHE_TTL = int(os.environ.get('CHAMELEON_APP_SESSION_CACHE_TTL') or 300)
+    # 吊销记录布隆过滤器的初始容量与误报率 (误报时回查存储确认)
+    SESSION_BLOOM_CAPACITY = 100000
+    SESSION_BLOOM_ERROR_RATE = 0.001
+    # 从存储同步其他进程吊销记录的间隔 (秒)，即吊销在多进程间生效的最大延迟
+    SESSION_REVOCATION_SYNC_INTERVAL = int(os.environ.get('CHAMELEON_APP_SESSION_REVOCATION_SYNC_INTERVAL') or 5)
+
+    # --- 指标配置 ---
+    # 是否记录指标并开放 /metrics (Prometheus 文本格式，默认关闭)；关闭时埋点几乎不产生开销
+    METRICS_ENABLED = os.environ.get('CHAMELEON_APP_METRICS', '0').lower() in ('1', 'true', 'yes')
+
+    # --- 用户配额配置 (按用户标识计费的令牌桶 + 每日预算，未登录时按客户端 IP) ---
+    # 是否启用配额 (启用后 /api/translate、/api/process 等接口不再使用按 IP 的固定次数限制)
+    QUOTA_ENABLED = os.environ.get('CHAMELEON_APP_QUOTA', '1').lower() in ('1', 'true', 'yes')
+    # 各操作消耗的令牌数 (批量操作按条目计费)
+    QUOTA_COSTS = {
+        'translate': 1,
+        'compliance': 0.2,
+        'process': 10,
+    }
+    # 令牌桶容量 (允许的突发量) 与每秒补充的令牌数；默认约合每分钟 10 次图片编辑或 100 次翻译
+    QUOTA_BUCKET_CAPACITY = float(os.environ.get('CHAMELEON_APP_QUOTA_BUCKET_CAPACITY') or 100)
+    QUOTA_REFILL_RATE = float(os.environ.get('CHAMELEON_APP_QUOTA_REFILL_RATE') or 100 / 60)
+    # 每个用户每日 (UTC) 可消耗的令牌数，0 表示不限
+    QUOTA_DAILY_BUDGET = float(os.environ.get('CHAMELEON_APP_QUOTA_DAILY_BUDGET') or 2000)
+    # 进程内存储 (未配置 Redis 时) 的配额键数量上限
+    QUOTA_MEMORY_MAX_KEYS = 100000
+
+    # --- 模型调用准入控制配置 (按服务商的自适应并发上限 + 有界等待队列) ---
+    # 是否启用准入控制 (关闭时不限制模型调用的并发数)
+    ADMISSION_ENABLED = os.environ.get('CHAMELEON_APP_ADMISSION', '1').lower() in ('1', 'true', 'yes')
+    # 各服务商的初始/最小/最大并发上限、等待队列长度上限与最长排队时间 (秒)
+    ADMISSION_PROVIDERS = {
+        'siliconflow': {'initial_limit': 32, 'min_limit': 4, 'max_limit': 128, 'max_queue': 64, 'queue_timeout': 5},
+        'bailian': {'initial_limit': 8, 'min_limit': 2, 'max_limit': 32, 'max_queue': 32, 'queue_timeout': 15},
+    }
+    # 未在上面列出的服务商 (如追加的 LLM 后端) 使用的默认参数
+    ADMISSION_DEFAULT_PROVIDER = {
+        'initial_limit': 16, 'min_limit': 2, 'max_limit': 64, 'max_queue': 32, 'queue_timeout': 5
+    }
+    # 近期 (短窗口) 平均耗时超过基线 (长窗口) 平均耗时的倍数时视为上游变慢，并发上限按超出比例收缩
+    ADMISSION_LATENCY_TOLERANCE = float(os.environ.get('CHAMELEON_APP_ADMISSION_LATENCY_TOLERANCE') or 1.5)
+    # 每轮收缩的最小系数 (单轮最多减小 10%)，调用超时时直接按此系数收缩
+    ADMISSION_BACKOFF = 0.9
+
+    # --- 模型路由配置 (多后端按 p95 耗时选择 + LLM 对冲请求) ---
+    # 翻译/合规检查使用的 LLM 后端 (OpenAI 兼容的 chat/completions 接口)，按优先级 (通常即成本从低到高) 排列。
+    # CHAMELEON_APP_LLM_BACKENDS 为追加的后端 (JSON 数组)，每项包含 name、provider (准入控制与熔断使用的服务商名称)、
+    # url、api_key、model，例如百炼的 OpenAI 兼容接口：
+    # [{"name": "bailian-qwen-turbo", "provider": "bailian-llm", "model": "qwen-turbo", "api_key": "...",
+    #   "url": "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions"}]
+    LLM_BACKENDS = [
+        {'name': 'siliconflow-qwen3-8b', 'provider': 'siliconflow', 'model': 'Qwen/Qwen3-8B',
+         'url': SILICON_FLOW_LLM_URL, 'api_key': SILICON_FLOW_API_KEY},
+    ] + json.loads(os.environ.get('CHAMELEON_APP_LLM_BACKENDS') or '[]')
+    # 图片编辑后端 (百炼 description_edit)，CHAMELEON_APP_IMAGE_BACKENDS 为追加的后端 (JSON 数组)，每项包含 name、model
+    IMAGE_BACKENDS = [
+        {'name': 'bailian-wanx2.1', 'model': BAILIAN_MODEL_ID},
+    ] + json.loads(os.environ.get('CHAMELEON_APP_IMAGE_BACKENDS') or '[]')
+    # 统计 p95 的滑动窗口：最近的调用次数与时间 (秒)，窗口内样本数少于下限时视为未知
+    ROUTING_WINDOW = 200
+    ROUTING_WINDOW_SECONDS = 60
+    ROUTING_MIN_SAMPLES = 20
+    # 优先级较高的后端 p95 不超过最快后端的倍数时仍使用该后端，避免为微小的耗时差异切换到更贵的后端
+    ROUTING_TOLERANCE = 1.2
+    # 随机分配给其他后端的调用比例，保持各后端的耗时统计不过期
+    ROUTING_EXPLORE_RATE = 0.02
+    # 是否对非流式 LLM 调用发出对冲请求 (配置了两个以上 LLM 后端时生效)
+    HEDGE_ENABLED = os.environ.get('CHAMELEON_APP_HEDGE', '1').lower() in ('1', 'true', 'yes')
+    # 首选后端超过其 p95 (不低于 HEDGE_MIN_DELAY，统计不足时为 HEDGE_DEFAULT_DELAY) 仍未返回时向次选后端发出对冲请求
+    HEDGE_MIN_DELAY = 0.1
+    HEDGE_DEFAULT_DELAY = 1.0
+    # 对冲请求数占 LLM 调用数的比例上限，限制额外成本
+    HEDGE_MAX_RATIO = float(os.environ.get('CHAMELEON_APP_HEDGE_MAX_RATIO') or 0.1)
+    # 同步服务模式下执行 LLM 调用 (首选与对冲) 的线程数
+    HEDGE_WORKERS = int(os.environ.get('CHAMELEON_APP_HEDGE_WORKERS') or 256)
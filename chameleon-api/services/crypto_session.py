@@ -0,0 +1,77 @@
+"""
+加密会话模块：客户端每个会话只进行一次 SM2 密钥交换，协商出 SM4 加密密钥与 HMAC-SM3 认证密钥，
+之后的提示词以 SM4 加密传输，每次请求的解密开销从椭圆曲线运算降为分组密码运算。
+未使用加密会话的旧客户端仍以 SM2 直接加密提示词，两种格式可同时使用。
+
+会话密文格式：sm4:<会话 ID>:<IV hex>:<密文 hex>:<HMAC hex>，HMAC 覆盖 IV 与密文 (先加密后认证)。
+"""
+
+import secrets
+
+from services import metrics
+from services.cache import LRUCache, TieredCache, build_shared_tier
+from services.config import Config
+from utils import sm4
+from utils.sm2 import decrypt_data
+
+SESSION_PREFIX = 'sm4:'
+KEY_SIZE = 32  # 前 16 字节为 SM4 密钥，后 16 字节为 HMAC 密钥
+
+session_cache = TieredCache(
+    'crypto_session',
+    LRUCache(Config.CRYPTO_SESSION_CACHE_SIZE, Config.CRYPTO_SESSION_TTL),
+    build_shared_tier(Config.CRYPTO_SESSION_SHARED, 'crypto_session',
+                      Config.CRYPTO_SESSION_TTL, Config.CRYPTO_SESSION_CACHE_SIZE)
+)
+
+
+def create_session(encrypted_key: str, owner: str = None):
+    """
+    完成密钥交换：SM2 解密客户端生成的会话密钥并缓存。
+    :param encrypted_key: SM2 加密的会话密钥 (明文为 64 位十六进制字符串)
+    :param owner: 会话所属用户标识 (可选，仅用于记录)
+    :return: (会话 ID, 有效期秒数)
+    :raises ValueError: 如果密文或密钥格式无效
+    """
+    try:
+        key = bytes.fromhex(decrypt_data(encrypted_key))
+    except ValueError as e:
+        raise ValueError("无效的会话密钥") from e
+    if len(key) != KEY_SIZE:
+        raise ValueError("无效的会话密钥")
+    session_id = secrets.token_urlsafe(24)
+    session_cache.set(session_id, {'key': key.hex(), 'owner': owner})
+    return session_id, Config.CRYPTO_SESSION_TTL
+
+
+@metrics.timed('decrypt_sm4')
+def decrypt_session_data(ciphertext: str) -> str:
+    """
+    解密会话密文。
+    :raises ValueError: 如果格式无效、会话不存在或已过期、认证失败
+    """
+    try:
+        session_id, iv_hex, data_hex, mac_hex = ciphertext[len(SESSION_PREFIX):].split(':')
+        iv, data, mac = bytes.fromhex(iv_hex), bytes.fromhex(data_hex), bytes.fromhex(mac_hex)
+    except ValueError as e:
+        raise ValueError("无效的密文格式") from e
+    session = session_cache.get(session_id)
+    if session is None:
+        raise ValueError("加密会话不存在或已过期")
+    key = bytes.fromhex(session['key'])
+    if not sm4.verify_hmac_sm3(key[16:], iv + data, mac):
+        raise ValueError("解密失败: 密文认证失败")
+    try:
+        return sm4.decrypt_cbc(key[:16], iv, data).decode('utf-8')
+    except ValueError as e:
+        raise ValueError(f"解密失败: {e}") from e
+
+
+def decrypt_prompt(ciphertext: str) -> str:
+    """
+    解密客户端提交的提示词：会话密文使用 SM4，其他视为 SM2 密文 (十六进制)。
+    :raises ValueError: 如果密文格式无效或解密失败
+    """
+    if ciphertext.startswith(SESSION_PREFIX):
+        return decrypt_session_data(ciphertext)
+    return decrypt_data(ciphertext)
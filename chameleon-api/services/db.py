@@ -0,0 +1,100 @@
+"""
+数据库模块，提供按线程复用的 SQLite 连接 (WAL 模式) 与事务、批量写入辅助函数。
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from services.config import Config
+
+_local = threading.local()
+
+
+def _enable_wal(conn):
+    """
+    切换到 WAL 模式。多个进程同时打开新数据库时，切换可能不经过 busy_timeout 直接返回 database is locked，
+    在 DB_BUSY_TIMEOUT_MS 内退避重试。
+    """
+    deadline = time.monotonic() + Config.DB_BUSY_TIMEOUT_MS / 1000
+    delay = 0.01
+    while True:
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            return
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) or time.monotonic() >= deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+
+def _open_connection(database):
+    conn = sqlite3.connect(
+        database,
+        timeout=Config.DB_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=Config.DB_CACHED_STATEMENTS
+    )
+    conn.row_factory = sqlite3.Row
+    # WAL 模式下读写互不阻塞，清理任务写入时请求线程仍可读取
+    _enable_wal(conn)
+    # WAL 模式下 NORMAL 已能保证数据库一致性，避免每次提交都 fsync
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(Config.DB_BUSY_TIMEOUT_MS)}")
+    return conn
+
+
+def get_connection():
+    """
+    获取当前线程的数据库连接 (懒加载并复用，调用方不要关闭)。
+    连接会缓存预编译语句，同一线程重复执行相同 SQL 时无需重新解析。
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.database != Config.DATABASE:
+        if conn is not None:
+            conn.close()
+        conn = _open_connection(Config.DATABASE)
+        _local.conn = conn
+        _local.database = Config.DATABASE
+    return conn
+
+
+def close_connection():
+    """
+    关闭当前线程的数据库连接。
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+@contextmanager
+def transaction(immediate=False):
+    """
+    在当前线程的连接上执行一个事务，正常结束时提交，出现异常时回滚。
+    :param immediate: 为 True 时以 BEGIN IMMEDIATE 开始，立即取得写锁 (跨进程互斥)，
+                      事务内先读后写的检查不会与其他写入交错
+    """
+    conn = get_connection()
+    if immediate:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def execute_batch(sql, rows):
+    """
+    在单个事务中批量执行同一条写入语句。
+    :param sql: 带占位符的 SQL 语句
+    :param rows: 参数元组列表
+    :return: 受影响的行数
+    """
+    with transaction() as conn:
+        cursor = conn.executemany(sql, rows)
+        return cursor.rowcount
@@ -0,0 +1,163 @@
+"""
+过期清理服务模块，以小批量、高频率的方式清理过期上传记录与文件，并回收无记录的孤儿文件。
+"""
+
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services import db
+from services.config import Config
+
+logger = logging.getLogger(__name__)
+
+_file_pool = ThreadPoolExecutor(max_workers=Config.EXPIRY_FILE_WORKERS, thread_name_prefix='expiry-file')
+_stats_lock = threading.Lock()
+_stats = {
+    'runs': 0,
+    'rows_deleted': 0,
+    'files_removed': 0,
+    'bytes_reclaimed': 0,
+    'orphans_removed': 0,
+    'remove_errors': 0,
+    'last_run_at': None,
+}
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for name, delta in deltas.items():
+            _stats[name] += delta
+
+
+def get_stats():
+    """
+    返回清理统计的快照 (累计删除的记录数、文件数、回收字节数等)。
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _cutoff():
+    """
+    过期时间点，格式与 SQLite CURRENT_TIMESTAMP (UTC) 保持一致，保证字符串比较正确。
+    """
+    cutoff_time = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        seconds=Config.UPLOAD_RETENTION_SECONDS)
+    return cutoff_time.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _referenced(conn, file_path):
+    """文件是否仍被上传记录或内容表引用"""
+    return conn.execute(
+        "SELECT 1 FROM upload_contents WHERE path = ? UNION ALL SELECT 1 FROM image_uploads WHERE path = ? LIMIT 1",
+        (file_path, file_path)
+    ).fetchone() is not None
+
+
+def _remove_file(file_path, orphan=False):
+    """在线程池中删除单个文件，并记录回收的字节数"""
+    try:
+        # 持有数据库写锁检查引用并删除：同一内容的并发上传 (save_temp_image) 登记引用时须等待删除完成，
+        # 之后发现文件不存在会重新写入；先完成登记的上传则使这里的检查失败而保留文件
+        with db.transaction(immediate=True) as conn:
+            if _referenced(conn, file_path):
+                return
+            size = os.path.getsize(file_path)
+            os.remove(file_path)
+    except FileNotFoundError:
+        return
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"删除文件 {file_path} 失败: {e}")
+        _count(remove_errors=1)
+        return
+    if orphan:
+        _count(files_removed=1, bytes_reclaimed=size, orphans_removed=1)
+    else:
+        _count(files_removed=1, bytes_reclaimed=size)
+
+
+def _expire_batch(cutoff):
+    """
+    在一个写事务中删除一批过期的上传记录，并将其内容的引用计数减一，引用计数降为 0 的内容随之删除。
+    :return: (删除的记录数, 需要删除的文件路径列表)
+    """
+    with db.transaction(immediate=True) as tx:
+        rows = tx.execute(
+            "SELECT id, path, content_hash FROM image_uploads WHERE created_at < ? ORDER BY created_at LIMIT ?",
+            (cutoff, Config.EXPIRY_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return 0, []
+        ids = [row[0] for row in rows]
+        tx.execute(f"DELETE FROM image_uploads WHERE id IN ({', '.join('?' * len(ids))})", ids)
+        hashes = [row[2] for row in rows if row[2]]
+        tx.executemany("UPDATE upload_contents SET ref_count = ref_count - 1 WHERE content_hash = ?",
+                       [(content_hash,) for content_hash in hashes])
+        released = []
+        if hashes:
+            unique_hashes = sorted(set(hashes))
+            released = tx.execute(
+                f"SELECT content_hash, path FROM upload_contents"
+                f" WHERE content_hash IN ({', '.join('?' * len(unique_hashes))}) AND ref_count <= 0",
+                unique_hashes
+            ).fetchall()
+            tx.executemany("DELETE FROM upload_contents WHERE content_hash = ?",
+                           [(row[0],) for row in released])
+    # 没有内容哈希的旧记录按路径删除 (_remove_file 会确认没有其他记录引用)
+    paths = [row[1] for row in released] + [row[1] for row in rows if not row[2]]
+    return len(ids), paths
+
+
+def expire_uploads():
+    """
+    清理过期的上传记录：每批最多 EXPIRY_BATCH_SIZE 条，每批一个短事务，
+    引用计数降为 0 的文件交给后台线程池删除，单次运行最多处理 EXPIRY_MAX_BATCHES 批。
+    :return: 本次删除的记录数
+    """
+    cutoff = _cutoff()
+    deleted = 0
+    try:
+        for _ in range(Config.EXPIRY_MAX_BATCHES):
+            count, paths = _expire_batch(cutoff)
+            deleted += count
+            # 先删记录再删文件：文件删除失败时由孤儿文件回收兜底
+            for file_path in paths:
+                _file_pool.submit(_remove_file, file_path)
+            if count < Config.EXPIRY_BATCH_SIZE:
+                break
+    except Exception as e:
+        logger.error(f"清理过期上传记录时出错: {e}")
+    _count(runs=1, rows_deleted=deleted)
+    with _stats_lock:
+        _stats['last_run_at'] = time.time()
+    return deleted
+
+
+def reconcile_orphans():
+    """
+    回收上传目录中超过保留时长且没有数据库记录的文件 (包括模型结果文件和处理失败遗留的上传文件)。
+    :return: 提交删除的文件数
+    """
+    cutoff_ts = time.time() - Config.UPLOAD_RETENTION_SECONDS
+    try:
+        rows = db.get_connection().execute(
+            "SELECT path FROM image_uploads UNION SELECT path FROM upload_contents").fetchall()
+        known_paths = {os.path.normpath(row[0]) for row in rows}
+    except Exception as e:
+        logger.error(f"读取上传记录时出错: {e}")
+        return 0
+
+    submitted = 0
+    with os.scandir(Config.UPLOAD_FOLDER) as entries:
+        for entry in entries:
+            if not entry.is_file() or os.path.normpath(entry.path) in known_paths:
+                continue
+            if entry.stat().st_mtime < cutoff_ts:
+                _file_pool.submit(_remove_file, entry.path, True)
+                submitted += 1
+    return submitted
@@ -0,0 +1,200 @@
+"""
+出站 HTTP 客户端模块，为所有外部调用提供按主机复用的连接池、超时、重试与熔断。
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services import metrics
+from services.config import Config
+
+
+class CircuitOpenError(Exception):
+    """上游熔断中，请求被直接拒绝"""
+
+
+class CircuitBreaker:
+    """
+    简单的熔断器：连续失败达到阈值后打开，冷却时间过后放行一次试探请求 (半开)，
+    试探成功则关闭，失败则重新打开；试探请求未得到上游结果 (被取消或本地出错) 时释放试探名额。
+    """
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def before_call(self):
+        """
+        请求前检查熔断状态。
+        :return: 本次请求是否为半开状态下的试探请求 (须以 record_success、record_failure 或 release_trial 结束)
+        :raises CircuitOpenError: 如果熔断器处于打开状态
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            cooled_down = time.monotonic() - self._opened_at >= self.reset_timeout
+            if cooled_down and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        raise CircuitOpenError(f"上游服务 {self.name} 暂时不可用，请稍后重试")
+
+    def release_trial(self):
+        """试探请求未得到上游结果 (被取消或本地出错)，不计成功或失败，下一个请求重新试探"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+_sessions = {}
+_breakers = {}
+_registry_lock = threading.Lock()
+
+_BREAKER_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+
+@metrics.register_collector
+def _collect_breaker_states():
+    samples = [({'upstream': name}, _BREAKER_STATES[breaker.state]) for name, breaker in list(_breakers.items())]
+    return [('chameleon_circuit_breaker_state', 'gauge', '上游熔断器状态 (0=关闭, 1=半开, 2=打开)', samples)]
+
+
+def _build_session():
+    """创建带连接池与重试策略的会话"""
+    retry = Retry(
+        total=Config.HTTP_MAX_RETRIES,
+        connect=Config.HTTP_MAX_RETRIES,
+        read=Config.HTTP_MAX_RETRIES,
+        status=Config.HTTP_MAX_RETRIES,
+        backoff_factor=Config.HTTP_BACKOFF_FACTOR,
+        status_forcelist=(429, 502, 503, 504),
+        # 仅幂等方法在读超时或错误状态码时重试；连接失败时请求未发出，所有方法都可安全重试
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(url):
+    """
+    获取目标主机对应的共享会话 (每个主机独立的 keep-alive 连接池)。
+    """
+    host = urlsplit(url).netloc
+    session = _sessions.get(host)
+    if session is None:
+        with _registry_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = _build_session()
+    return session
+
+
+def get_breaker(upstream):
+    """
+    获取上游服务对应的熔断器。
+    """
+    breaker = _breakers.get(upstream)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.get(upstream)
+            if breaker is None:
+                breaker = _breakers[upstream] = CircuitBreaker(
+                    upstream, Config.HTTP_BREAKER_THRESHOLD, Config.HTTP_BREAKER_RESET_SECONDS
+                )
+    return breaker
+
+
+def breaker_state(upstream):
+    """
+    查询上游服务的熔断状态，未发生过调用的上游视为 'closed'。
+    :return: 'closed'、'half_open' 或 'open'
+    """
+    breaker = _breakers.get(upstream)
+    return breaker.state if breaker is not None else 'closed'
+
+
+def request(method, url, upstream=None, timeout=None, **kwargs):
+    """
+    发送出站 HTTP 请求。
+    :param method: HTTP 方法
+    :param url: 请求地址
+    :param upstream: 上游服务名称，用于熔断统计 (默认使用主机名)
+    :param timeout: (连接超时, 读取超时)，默认使用配置值
+    :return: requests.Response
+    :raises CircuitOpenError: 如果上游处于熔断状态
+    :raises requests.exceptions.RequestException: 如果重试后仍然网络失败
+    """
+    upstream = upstream or urlsplit(url).netloc
+    breaker = get_breaker(upstream)
+    try:
+        trial = breaker.before_call()
+    except CircuitOpenError as e:
+        metrics.record_upstream(upstream, 0.0, exc=e)
+        raise
+    if timeout is None:
+        timeout = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+    start = time.perf_counter()
+    try:
+        with metrics.UPSTREAM_IN_FLIGHT.track_inprogress(upstream=upstream):
+            response = get_session(url).request(method, url, timeout=timeout, **kwargs)
+    except requests.exceptions.RequestException as e:
+        metrics.record_upstream(upstream, time.perf_counter() - start, exc=e)
+        breaker.record_failure()
+        raise
+    except BaseException:
+        # 非网络错误不反映上游状态，但须释放试探名额，否则熔断器停留在半开且拒绝所有请求
+        if trial:
+            breaker.release_trial()
+        raise
+    # 流式响应只统计到收到响应头
+    metrics.record_upstream(upstream, time.perf_counter() - start, status_code=response.status_code)
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def get(url, **kwargs):
+    """发送 GET 请求，参数同 request"""
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    """发送 POST 请求，参数同 request"""
+    return request('POST', url, **kwargs)
@@ -3,14 +3,24 @@
 图片服务模块，负责处理图片上传、保存、清理等操作。
 """
 
-import datetime
+import hashlib
 import os
-import sqlite3
+import shutil
 import uuid
+from io import BytesIO
 
+from PIL import Image, ImageOps
 from werkzeug.utils import secure_filename
 
+from services import db, metrics
 from services.config import Config
+from utils.process_pool import ProcessPool
+
+# 模型结果文件名前缀，用于与用户上传的文件区分
+RESULT_PREFIX = 'result_'
+
+# 图片预处理进程池，CPU 密集的解码与编码不占用请求线程的 GIL
+preprocess_pool = ProcessPool('图片预处理', Config.IMAGE_PREPROCESS_WORKERS, preload=[__name__])
 
 
 def allowed_file(filename):
@@ -21,61 +31,200 @@ def allowed_file(filename):
         filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
 
-def save_temp_image(file):
+def preprocess_image(data, max_side, jpeg_quality):
+    """
+    图片预处理 (在子进程中执行，须为模块级函数以便序列化)：
+    用 Pillow 校验真实格式，按 EXIF 方向旋转后丢弃元数据，缩放到最长边不超过 max_side 并重新编码。
+    :param data: 原始图片字节
+    :param max_side: 最长边像素上限 (只缩小不放大)
+    :param jpeg_quality: JPEG 编码质量
+    :return: (处理后的字节, 扩展名)
+    :raises ValueError: 如果内容不是受支持的图片
+    """
+    try:
+        with Image.open(BytesIO(data)) as probe:
+            probe.verify()
+        image = Image.open(BytesIO(data))
+        image.load()
+    except (Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ValueError(f"无法识别的图片内容: {e}") from e
+    if image.format not in ('PNG', 'JPEG'):
+        raise ValueError("文件类型或大小无效")
+
+    # 应用方向后重新编码时不写入 EXIF，拍摄位置等隐私信息随之去除
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    output = BytesIO()
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if has_alpha:
+        image.save(output, format='PNG', optimize=True)
+        return output.getvalue(), 'png'
+    image.convert('RGB').save(output, format='JPEG', quality=jpeg_quality, optimize=True)
+    return output.getvalue(), 'jpg'
+
+
+@metrics.timed('image_preprocess')
+def run_preprocess(data):
+    """
+    按配置的画质档位预处理图片；IMAGE_PREPROCESS_WORKERS 为 0 时在当前线程执行。
+    :return: (处理后的字节, 扩展名)
+    :raises ValueError: 如果内容不是受支持的图片或档位配置无效
+    """
+    profile = Config.IMAGE_QUALITY_PROFILES.get(Config.IMAGE_QUALITY_PROFILE)
+    if profile is None:
+        raise ValueError(f"未知的画质档位: {Config.IMAGE_QUALITY_PROFILE}")
+    args = (data, profile['max_side'], profile['jpeg_quality'])
+    if Config.IMAGE_PREPROCESS_WORKERS <= 0:
+        return preprocess_image(*args)
+    return preprocess_pool.run(preprocess_image, *args, timeout=Config.IMAGE_PREPROCESS_TIMEOUT)
+
+
+def hash_stream(stream):
+    """
+    分块读取流并计算 SHA256，读取完毕后将流指针复位。
+    :return: 十六进制摘要
     """
-    保存上传的临时图片文件。
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(Config.UPLOAD_HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def hash_file(file_path):
+    """
+    计算磁盘文件的 SHA256。
+    """
+    with open(file_path, 'rb') as f:
+        return hash_stream(f)
+
+
+def sniff_extension(stream):
+    """
+    按文件头识别图片的真实格式 (只读取头部，不解码像素)，读取完毕后将流指针复位。
+    :return: 扩展名 'png' 或 'jpg'
+    :raises ValueError: 如果内容不是 PNG 或 JPEG 图片
+    """
+    try:
+        with Image.open(stream) as image:
+            image_format = image.format
+    except (Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ValueError(f"无法识别的图片内容: {e}") from e
+    finally:
+        stream.seek(0)
+    if image_format == 'PNG':
+        return 'png'
+    if image_format == 'JPEG':
+        return 'jpg'
+    raise ValueError("文件类型或大小无效")
+
+
+@metrics.timed('image_save')
+def save_temp_image(file, identifier, github_login='unknown_user'):
+    """
+    按内容寻址保存上传的临时图片：相同内容只在磁盘上保存一份，每次上传在 image_uploads 中记录一行，
+    并在 upload_contents 中增加该内容的引用计数。
     :param file: Flask request.files 对象
-    :return: (unique_filename, file_path, file_url_path) 元组
+    :param identifier: 哈希后的用户标识符
+    :param github_login: GitHub 用户名，用于记录的文件名
+    :return: (unique_filename, file_path, file_url_path, content_hash) 元组
     :raises ValueError: 如果文件类型或大小无效
     """
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # 使用UUID生成唯一文件名，避免冲突和路径猜测
-        unique_filename = f"{uuid.uuid4().hex}_{filename}"
+        stream = file.stream
+        if Config.IMAGE_PREPROCESS_ENABLED:
+            # 校验真实格式、去除 EXIF、按画质档位缩放并重新编码
+            data, extension = run_preprocess(stream.read())
+            stream = BytesIO(data)
+        else:
+            # 扩展名取自真实格式而不是客户端文件名，相同内容总是对应同一个文件
+            extension = sniff_extension(stream)
+        # 使用内容哈希作为文件名，既避免冲突和路径猜测，又能识别重复上传
+        content_hash = hash_stream(stream)
+        unique_filename = f"{content_hash}.{extension}"
         file_path = os.path.join(Config.UPLOAD_FOLDER, unique_filename)
-        file.save(file_path)
+        # 先登记引用，再检查文件：清理任务只在引用计数为 0 时、持有数据库写锁删除文件，
+        # 登记之后文件不会再被删除 (见 expiry_service._remove_file)
+        record_upload(identifier, f"{github_login}_{unique_filename}", file_path, content_hash)
+        if not os.path.exists(file_path):
+            # 先写临时文件再原子重命名，并发上传同一图片时不会读到半个文件
+            tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(stream, f, Config.UPLOAD_HASH_CHUNK_SIZE)
+            os.replace(tmp_path, file_path)
         file_url_path = f"/chameleon-api/uploads/{unique_filename}"
-        return unique_filename, file_path, file_url_path
+        return unique_filename, file_path, file_url_path, content_hash
     else:
         raise ValueError("文件类型或大小无效")
 
 
-def get_temp_image_path(filename):
+def new_result_file(extension):
     """
-    根据文件名获取临时图片的完整路径。
+    为模型生成的图片分配上传目录中的文件名。
+    :param extension: 文件扩展名，如 '.png'
+    :return: (unique_filename, file_path, file_url_path) 元组
     """
-    return os.path.join(Config.UPLOAD_FOLDER, filename)
+    unique_filename = f"{RESULT_PREFIX}{uuid.uuid4().hex}{extension}"
+    file_path = os.path.join(Config.UPLOAD_FOLDER, unique_filename)
+    file_url_path = f"/chameleon-api/uploads/{unique_filename}"
+    return unique_filename, file_path, file_url_path
 
 
-def cleanup_expired_files():
+def save_result_stream(chunks, extension):
     """
-    清理过期的临时文件和数据库记录 (超过1小时)。
+    将模型生成的图片分块流式写入上传目录。
+    :param chunks: 字节块迭代器 (如 response.iter_content())
+    :param extension: 文件扩展名，如 '.png'
+    :return: (unique_filename, file_path, file_url_path) 元组
     """
-    # print("Running cleanup task...") # 调试用，生产环境可移除
-    cutoff_time = datetime.datetime.now() - datetime.timedelta(hours=1)
-    conn = None
+    unique_filename, file_path, file_url_path = new_result_file(extension)
     try:
-        conn = sqlite3.connect(Config.DATABASE)
-        cursor = conn.cursor()
-        # 查询过期记录
-        cursor.execute(
-            "SELECT id, path FROM image_uploads WHERE created_at < ?",
-            (cutoff_time.isoformat(),)
+        with open(file_path, 'wb') as f:
+            for chunk in chunks:
+                if chunk:
+                    f.write(chunk)
+    except Exception:
+        # 写入失败时不留下残缺文件
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return unique_filename, file_path, file_url_path
+
+
+def record_upload(identifier, filename, file_path, content_hash=None):
+    """
+    保存上传记录到数据库，供定时任务清理过期文件。
+    :param identifier: 哈希后的用户标识符
+    :param filename: 记录的文件名
+    :param file_path: 文件在磁盘上的完整路径
+    :param content_hash: 文件内容的 SHA256，相同内容共用一个文件并累加引用计数
+    """
+    record_uploads([(identifier, filename, file_path, content_hash)])
+
+
+@metrics.timed('upload_record')
+def record_uploads(records):
+    """
+    在单个事务中批量保存上传记录：每次上传插入一行 image_uploads (保留各自的上传者与过期时间)，
+    带内容哈希的记录同时将 upload_contents 中该内容的引用计数加一。
+    :param records: (identifier, filename, file_path, content_hash) 元组列表
+    """
+    with db.transaction(immediate=True) as conn:
+        conn.executemany(
+            "INSERT INTO upload_contents (content_hash, path, ref_count) VALUES (?, ?, 1)"
+            " ON CONFLICT(content_hash) DO UPDATE SET ref_count = ref_count + 1",
+            [(content_hash, file_path) for _, _, file_path, content_hash in records if content_hash]
         )
-        expired_records = cursor.fetchall()
-        deleted_count = 0
-        for record in expired_records:
-            file_id, file_path = record
-            # 删除文件
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                deleted_count += 1
-            # 删除数据库记录
-            cursor.execute("DELETE FROM image_uploads WHERE id = ?", (file_id,))
-        conn.commit()
-    except Exception as e:
-        if conn:
-            conn.rollback()
-    finally:
-        if conn:
-            conn.close()
+        conn.executemany(
+            "INSERT INTO image_uploads (phone, filename, path, content_hash) VALUES (?, ?, ?, ?)",
+            records
+        )
+
+
+def get_temp_image_path(filename):
+    """
+    根据文件名获取临时图片的完整路径。
+    """
+    return os.path.join(Config.UPLOAD_FOLDER, filename)
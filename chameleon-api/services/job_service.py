@@ -0,0 +1,221 @@
+"""
+任务服务模块，负责图片处理任务的排队、执行与状态查询。
+任务记录存储在 SQLite 或 Redis 中 (与 RATELIMIT_STORAGE_URL 保持一致)，由有界线程池执行。
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from services import admission, db
+from services.config import Config
+from services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class JobQueueFullError(Exception):
+    """排队中的任务数已达上限"""
+
+
+class SQLiteJobStore:
+    """基于 SQLite 的任务存储 (表结构见 schema.sql)"""
+
+    def create(self, job):
+        with db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, owner, status, result, error, error_code, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job['id'], job['owner'], job['status'], None, None, None,
+                 job['created_at'], job['updated_at'])
+            )
+
+    def update(self, job_id, fields):
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        values = [json.dumps(v) if name == 'result' and v is not None else v
+                  for name, v in fields.items()]
+        with db.transaction() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*values, job_id))
+
+    def get(self, job_id):
+        row = db.get_connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job['result']:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def purge(self, cutoff):
+        with db.transaction() as conn:
+            return conn.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,)).rowcount
+
+
+class RedisJobStore:
+    """基于 Redis 的任务存储，任务记录以 JSON 形式保存并设置过期时间"""
+
+    KEY_PREFIX = 'chameleon:job:'
+
+    def __init__(self, client, ttl):
+        self.client = client
+        self.ttl = ttl
+
+    def create(self, job):
+        self.client.set(self.KEY_PREFIX + job['id'], json.dumps(job), ex=self.ttl)
+
+    def update(self, job_id, fields):
+        job = self.get(job_id)
+        if job is None:
+            return
+        job.update(fields)
+        self.client.set(self.KEY_PREFIX + job_id, json.dumps(job), ex=self.ttl)
+
+    def get(self, job_id):
+        raw = self.client.get(self.KEY_PREFIX + job_id)
+        return json.loads(raw) if raw else None
+
+    def purge(self, cutoff):
+        # Redis 中的任务记录依赖 TTL 自动过期
+        return 0
+
+
+_store = None
+_store_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=Config.JOB_WORKERS, thread_name_prefix='job-worker')
+_slots = threading.BoundedSemaphore(Config.JOB_MAX_PENDING)
+# 任务状态变化时通知本进程内的等待者 (SSE 推送)，跨进程时退化为轮询
+_changed = threading.Condition()
+
+
+def get_store():
+    """
+    获取任务存储 (懒加载)。配置了 Redis 时使用 Redis，否则使用 SQLite。
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                client = get_redis()
+                if client is not None:
+                    _store = RedisJobStore(client, Config.JOB_TTL_SECONDS)
+                else:
+                    _store = SQLiteJobStore()
+    return _store
+
+
+def _update_job(job_id, **fields):
+    fields['updated_at'] = time.time()
+    get_store().update(job_id, fields)
+    with _changed:
+        _changed.notify_all()
+
+
+def _run_job(job_id, func, args, kwargs):
+    """在工作线程中执行任务，并记录结果或错误"""
+    try:
+        _update_job(job_id, status=JOB_RUNNING)
+        result = func(*args, **kwargs)
+        _update_job(job_id, status=JOB_SUCCEEDED, result=result)
+    except PermissionError as e:
+        _update_job(job_id, status=JOB_FAILED, error=str(e), error_code=403)
+    except ValueError as e:
+        _update_job(job_id, status=JOB_FAILED, error=str(e), error_code=400)
+    except admission.OverloadedError as e:
+        _update_job(job_id, status=JOB_FAILED, error=str(e), error_code=503)
+    except Exception as e:
+        logger.error(f"执行任务 {job_id} 时出错: {e}")
+        _update_job(job_id, status=JOB_FAILED, error='图片处理失败', error_code=500)
+    finally:
+        _slots.release()
+
+
+def submit_job(owner, func, *args, **kwargs):
+    """
+    提交一个任务到工作线程池。
+    :param owner: 任务所属用户标识 (哈希后的 identifier)
+    :param func: 任务函数，返回值需可 JSON 序列化
+    :return: 任务 ID
+    :raises JobQueueFullError: 如果排队中的任务数已达上限
+    """
+    if not _slots.acquire(blocking=False):
+        raise JobQueueFullError("任务队列已满，请稍后重试")
+    try:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        get_store().create({
+            'id': job_id,
+            'owner': owner,
+            'status': JOB_PENDING,
+            'result': None,
+            'error': None,
+            'error_code': None,
+            'created_at': now,
+            'updated_at': now,
+        })
+        _executor.submit(_run_job, job_id, func, args, kwargs)
+        return job_id
+    except Exception:
+        _slots.release()
+        raise
+
+
+def get_job(job_id):
+    """
+    查询任务记录。
+    :return: 任务字典；不存在或已过期时返回 None
+    """
+    return get_store().get(job_id)
+
+
+def wait_for_update(job_id, since, timeout):
+    """
+    等待任务状态在 since 之后发生变化。
+    :param since: 上次看到的 updated_at
+    :param timeout: 最长等待秒数
+    :return: 最新的任务字典 (可能未变化)；不存在时返回 None
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get_job(job_id)
+        if job is None or job['updated_at'] > since or job['status'] in FINISHED_STATES:
+            return job
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return job
+        with _changed:
+            _changed.wait(min(remaining, Config.JOB_POLL_INTERVAL))
+
+
+def purge_expired_jobs():
+    """
+    清理超过保留时长的任务记录。
+    """
+    return get_store().purge(time.time() - Config.JOB_TTL_SECONDS)
+
+
+def public_view(job):
+    """
+    将任务记录转换为返回给前端的结构。
+    """
+    view = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+    }
+    if job['status'] == JOB_SUCCEEDED:
+        view.update(job['result'] or {})
+    elif job['status'] == JOB_FAILED:
+        view['error'] = job['error']
+        view['error_code'] = job['error_code']
+    return view
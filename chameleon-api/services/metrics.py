@@ -0,0 +1,272 @@
+"""
+指标模块：进程内的计数器、仪表与直方图，以 Prometheus 文本格式 (0.0.4) 输出。
+METRICS_ENABLED 关闭时记录操作直接返回，@timed 装饰器不包装函数，几乎没有开销。
+指标按进程统计，多进程部署时由 Prometheus 分别抓取各进程或在查询时聚合。
+"""
+
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from services.config import Config
+
+ENABLED = Config.METRICS_ENABLED
+
+# 默认直方图桶 (秒)：覆盖从毫秒级的本地操作到分钟级的图片生成
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.label_names)
+
+    def samples(self):
+        """返回 (指标名后缀, 标签字符串, 值) 列表"""
+        with self._lock:
+            return [('', _format_labels(self.label_names, key), value) for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """可增可减的仪表，例如进行中的请求数"""
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """累积分桶直方图，同时记录总和与次数"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = entry[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        result = []
+        with self._lock:
+            items = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                result.append(('_bucket', labels, cumulative))
+            labels = _format_labels(self.label_names, key)
+            result.append(('_sum', labels, total))
+            result.append(('_count', labels, count))
+        return result
+
+
+def register_collector(func):
+    """
+    注册抓取时调用的采集函数，返回 (指标名, 类型, 说明, [(标签字典, 值), ...]) 列表。
+    适合已有统计 (缓存命中数、熔断状态等) 的导出，请求路径上没有额外开销。
+    """
+    _collectors.append(func)
+    return func
+
+
+# --- 指标定义 ---
+
+STAGE_SECONDS = Histogram(
+    'chameleon_stage_duration_seconds', '请求处理各阶段耗时', labels=('stage',)
+)
+STAGE_ERRORS = Counter(
+    'chameleon_stage_errors_total', '请求处理各阶段抛出异常的次数', labels=('stage',)
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'chameleon_http_request_duration_seconds', '接口请求耗时 (流式响应只统计到开始推送)',
+    labels=('endpoint', 'method', 'status')
+)
+HTTP_IN_FLIGHT = Gauge('chameleon_http_requests_in_flight', '正在处理的接口请求数', labels=('endpoint',))
+UPSTREAM_REQUESTS = Counter(
+    'chameleon_upstream_requests_total', '上游调用次数，按结果分类 (ok/http_4xx/http_5xx/timeout/error/circuit_open)',
+    labels=('upstream', 'outcome')
+)
+UPSTREAM_SECONDS = Histogram('chameleon_upstream_duration_seconds', '上游调用耗时', labels=('upstream',))
+UPSTREAM_IN_FLIGHT = Gauge('chameleon_upstream_requests_in_flight', '进行中的上游调用数', labels=('upstream',))
+ADMISSION_SHED = Counter(
+    'chameleon_admission_shed_total', '未被准入的模型调用数，按原因分类 (queue_full/deadline/timeout)',
+    labels=('provider', 'reason')
+)
+MODEL_ROUTED = Counter('chameleon_model_routed_total', '按首选后端统计的模型调用数', labels=('kind', 'backend'))
+LLM_HEDGES = Counter(
+    'chameleon_llm_hedges_total', 'LLM 对冲与故障转移次数 (fired/won/skipped/failover)', labels=('outcome',)
+)
+QUOTA_REJECTIONS = Counter(
+    'chameleon_quota_rejections_total', '超出配额被拒绝的请求数，按操作与原因 (rate/daily) 分类',
+    labels=('operation', 'scope')
+)
+
+
+def timed(stage):
+    """
+    函数装饰器：记录函数耗时到 chameleon_stage_duration_seconds，异常时累加 chameleon_stage_errors_total。
+    指标关闭时直接返回原函数。
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                STAGE_ERRORS.inc(stage=stage)
+                raise
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def stage(name):
+    """记录代码块耗时的上下文管理器，语义同 timed"""
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+
+def upstream_outcome(status_code=None, exc=None):
+    """
+    将上游调用结果归类为 UPSTREAM_REQUESTS 的 outcome 标签。
+    """
+    if exc is not None:
+        name = type(exc).__name__
+        if name == 'CircuitOpenError':
+            return 'circuit_open'
+        return 'timeout' if 'Timeout' in name or isinstance(exc, TimeoutError) else 'error'
+    if status_code >= 500:
+        return 'http_5xx'
+    if status_code >= 400:
+        return 'http_4xx'
+    return 'ok'
+
+
+def record_upstream(upstream, seconds, status_code=None, exc=None):
+    """记录一次上游调用的结果与耗时"""
+    if not ENABLED:
+        return
+    UPSTREAM_REQUESTS.inc(upstream=upstream, outcome=upstream_outcome(status_code, exc))
+    UPSTREAM_SECONDS.observe(seconds, upstream=upstream)
+
+
+def render():
+    """
+    以 Prometheus 文本格式输出全部指标。
+    """
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for suffix, labels, value in metric.samples():
+            lines.append(f"{metric.name}{suffix}{labels} {_format_value(value)}")
+    for collector in _collectors:
+        for name, kind, documentation, samples in collector():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                names = tuple(labels)
+                lines.append(f"{name}{_format_labels(names, [labels[n] for n in names])} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
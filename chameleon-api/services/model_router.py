@@ -0,0 +1,237 @@
+"""
+模型路由模块：维护翻译/合规检查 (LLM) 与图片编辑的后端注册表，按各后端最近调用耗时的 p95 选择后端。
+- 后端按配置顺序排列 (通常即成本从低到高)，优先使用排在前面且 p95 不超过最快后端 ROUTING_TOLERANCE 倍的后端，
+  熔断中的后端不参与选择，少量调用随机分配给其他后端以保持统计不过期；
+- 非流式 LLM 调用可发出对冲请求：首选后端超过其 p95 仍未返回时向次选后端再发一次，取先成功的结果，
+  对冲次数受 HEDGE_MAX_RATIO 预算限制，额外成本有上限；首选后端快速失败时直接转移到次选后端。
+本模块只负责统计与决策，调用的执行 (线程或协程) 由 model_service / async_model_service 完成。
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import aiohttp
+import requests
+
+from services import http_client, metrics
+from services.config import Config
+
+# 反映后端状态的异常 (网络错误与超时)；未准入、熔断与本地错误不反映后端耗时
+_UPSTREAM_ERRORS = (requests.exceptions.RequestException, aiohttp.ClientError, asyncio.TimeoutError, TimeoutError)
+
+
+class LatencyTracker:
+    """
+    滑动窗口内的调用耗时统计，窗口为最近 window 次且不超过 window_seconds 秒内的调用。
+    """
+
+    def __init__(self, window, window_seconds):
+        self.window_seconds = window_seconds
+        self._samples = deque(maxlen=window)  # (完成时间, 耗时)
+        self._p95 = None
+        self._computed_at = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append((time.monotonic(), seconds))
+
+    def p95(self):
+        """
+        :return: 窗口内耗时的 p95 (秒)，样本数不足 ROUTING_MIN_SAMPLES 时返回 None
+        """
+        now = time.monotonic()
+        with self._lock:
+            # 每次路由都会查询，结果缓存 100 毫秒
+            if now - self._computed_at >= 0.1:
+                while self._samples and now - self._samples[0][0] > self.window_seconds:
+                    self._samples.popleft()
+                self._computed_at = now
+                self._p95 = None
+                if len(self._samples) >= Config.ROUTING_MIN_SAMPLES:
+                    ordered = sorted(seconds for _, seconds in self._samples)
+                    self._p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            return self._p95
+
+
+class Backend:
+    """
+    模型后端。
+    :param name: 后端名称 (指标使用)
+    :param model: 模型 ID
+    :param provider: 服务商名称，用于准入控制与熔断统计
+    :param url: 接口地址 (LLM 后端)
+    :param api_key: API 密钥 (LLM 后端)
+    """
+
+    def __init__(self, name, model, provider, url=None, api_key=None):
+        self.name = name
+        self.model = model
+        self.provider = provider
+        self.url = url
+        self.api_key = api_key
+        self.latency = LatencyTracker(Config.ROUTING_WINDOW, Config.ROUTING_WINDOW_SECONDS)
+
+    def headers(self):
+        """OpenAI 兼容接口的请求头"""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def payload(self, payload):
+        """将请求体中的模型替换为本后端的模型"""
+        return dict(payload, model=self.model)
+
+    def available(self):
+        return http_client.breaker_state(self.provider) != 'open'
+
+    def record(self, seconds, ok=True):
+        """
+        记录一次调用的耗时。失败按读取超时时间记录，使频繁失败的后端 p95 升高而被绕开。
+        """
+        self.latency.record(seconds if ok else max(seconds, Config.HTTP_READ_TIMEOUT))
+
+    @contextmanager
+    def track(self):
+        """
+        记录代码块的耗时，代码块将 call.status_code 置为上游响应的状态码。
+        上游超时、网络错误与 5xx 按失败记录；4xx (含 429)、未准入、熔断与本地错误不反映后端耗时，
+        对冲中被取消的调用没有完整耗时，均不记录。
+        """
+        call = SimpleNamespace(status_code=None)
+        start = time.perf_counter()
+        try:
+            yield call
+        except _UPSTREAM_ERRORS:
+            self.record(time.perf_counter() - start, ok=False)
+            raise
+        if call.status_code is None or call.status_code < 400:
+            self.record(time.perf_counter() - start)
+        elif call.status_code >= 500:
+            self.record(time.perf_counter() - start, ok=False)
+
+
+class Router:
+    """
+    在一组后端中按优先级与 p95 耗时选择。
+    :param kind: 后端类别 ('llm' 或 'image')
+    :param backends: 按优先级排列的后端列表
+    """
+
+    def __init__(self, kind, backends):
+        self.kind = kind
+        self.backends = backends
+
+    def ranked(self):
+        """
+        :return: 本次调用的后端顺序：第一个为首选，其余按 p95 从低到高 (统计不足的按优先级排在最后) 作为备选
+        """
+        candidates = [backend for backend in self.backends if backend.available()] or list(self.backends)
+        if len(candidates) > 1:
+            latencies = {backend.name: backend.latency.p95() for backend in candidates}
+            known = [p95 for p95 in latencies.values() if p95 is not None]
+            if random.random() < Config.ROUTING_EXPLORE_RATE:
+                preferred = random.choice(candidates)
+            else:
+                # 统计不足的后端视为可用，使其积累样本 (冷启动时即按优先级选择)
+                threshold = min(known) * Config.ROUTING_TOLERANCE if known else None
+                preferred = next(
+                    backend for backend in candidates
+                    if threshold is None or latencies[backend.name] is None or latencies[backend.name] <= threshold
+                )
+            others = sorted(
+                (backend for backend in candidates if backend is not preferred),
+                key=lambda backend: (latencies[backend.name] is None, latencies[backend.name] or 0.0)
+            )
+            candidates = [preferred] + others
+        metrics.MODEL_ROUTED.inc(kind=self.kind, backend=candidates[0].name)
+        return candidates
+
+    def choose(self):
+        """:return: 首选后端"""
+        return self.ranked()[0]
+
+
+class HedgeBudget:
+    """
+    对冲预算 (令牌桶)：每次调用积累 ratio 个令牌，每次对冲消耗 1 个，长期的对冲比例不超过 ratio。
+    :param burst: 令牌上限，即允许连续发出的对冲次数
+    """
+
+    def __init__(self, ratio, burst=10):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+llm = Router('llm', [Backend(**spec) for spec in Config.LLM_BACKENDS])
+image = Router('image', [Backend(**{'provider': 'bailian', **spec}) for spec in Config.IMAGE_BACKENDS])
+hedge_budget = HedgeBudget(Config.HEDGE_MAX_RATIO)
+
+
+def plan_llm_call():
+    """
+    规划一次非流式 LLM 调用。
+    :return: (首选后端, 备选后端, 发出对冲请求前的等待时间)；只有一个可用后端时备选为 None，
+             未启用对冲时等待时间为 None (仅在首选后端失败时转移到备选后端)
+    """
+    backends = llm.ranked()
+    if len(backends) == 1:
+        return backends[0], None, None
+    hedge_budget.deposit()
+    if not Config.HEDGE_ENABLED:
+        return backends[0], backends[1], None
+    p95 = backends[0].latency.p95()
+    delay = Config.HEDGE_DEFAULT_DELAY if p95 is None else max(Config.HEDGE_MIN_DELAY, p95)
+    return backends[0], backends[1], delay
+
+
+def response_ok(status_code):
+    """上游响应是否可作为结果 (5xx 与 429 视为失败，可转移到其他后端)"""
+    return status_code < 500 and status_code != 429
+
+
+def succeeded(future):
+    """
+    已完成的调用 (concurrent.futures.Future 或 asyncio.Task) 是否成功。
+    """
+    if future.cancelled() or future.exception() is not None:
+        return False
+    return response_ok(future.result().status_code)
+
+
+def try_hedge():
+    """
+    首选后端超过等待时间仍未返回时调用，判断是否发出对冲请求。
+    """
+    if hedge_budget.try_spend():
+        metrics.LLM_HEDGES.inc(outcome='fired')
+        return True
+    metrics.LLM_HEDGES.inc(outcome='skipped')
+    return False
+
+
+@metrics.register_collector
+def _collect_latencies():
+    samples = [({'kind': router.kind, 'backend': backend.name}, backend.latency.p95())
+               for router in (llm, image) for backend in router.backends]
+    return [('chameleon_model_backend_p95_seconds', 'gauge', '各模型后端滑动窗口内的调用耗时 p95',
+             [(labels, value) for labels, value in samples if value is not None])]
@@ -5,33 +5,165 @@
 
 import base64
 import json
+import logging
 import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from http import HTTPStatus
 from io import BytesIO
+from urllib.parse import urlsplit
 
-import requests
+import dashscope
 from PIL import Image
 from dashscope import ImageSynthesis
 
+from services import admission, db, http_client, image_service, metrics, model_router, prefilter, result_cache
+from services.cache import LRUCache, TieredCache, build_shared_tier, prompt_key
 from services.config import Config
+from services.task_poller import TaskPoller
+from utils.llm_json import JsonFieldStream, parse_json_object
 
+logger = logging.getLogger(__name__)
 
-def compliance_check(prompt: str):
+# 允许将百炼 API 指向本地模拟服务 (测试/压测使用)
+if Config.BAILIAN_BASE_URL:
+    dashscope.base_http_api_url = Config.BAILIAN_BASE_URL
+
+_task_poller = None
+_task_poller_lock = threading.Lock()
+_llm_executor = None
+_llm_executor_lock = threading.Lock()
+
+# 合规检查结论缓存：规范化提示词哈希 -> 'ALLOWED' / 'DISALLOWED'
+compliance_cache = TieredCache(
+    'compliance',
+    LRUCache(Config.COMPLIANCE_CACHE_SIZE, Config.COMPLIANCE_CACHE_TTL),
+    build_shared_tier(Config.COMPLIANCE_CACHE_SHARED, 'compliance',
+                      Config.COMPLIANCE_CACHE_TTL, Config.COMPLIANCE_CACHE_SIZE)
+)
+
+# 翻译结果缓存：规范化提示词哈希 -> en_prompt，默认写穿到 SQLite
+translation_cache = TieredCache(
+    'translation',
+    LRUCache(Config.TRANSLATION_CACHE_SIZE, Config.TRANSLATION_CACHE_TTL),
+    build_shared_tier(Config.TRANSLATION_CACHE_SHARED, 'translation',
+                      Config.TRANSLATION_CACHE_TTL, Config.TRANSLATION_CACHE_SIZE)
+)
+
+
+@metrics.register_collector
+def _collect_poller_stats():
+    pending = _task_poller.pending_count() if _task_poller is not None else 0
+    return [('chameleon_bailian_tasks_pending', 'gauge', '等待轮询结果的百炼异步任务数', [({}, pending)])]
+
+
+def get_llm_executor():
     """
-    调用硅基流动 Qwen3 模型进行合规性检查。
+    获取执行 LLM 调用的线程池 (懒加载)，首选调用与对冲调用在其中并行，由调用线程等待先成功的结果。
+    """
+    global _llm_executor
+    if _llm_executor is None:
+        with _llm_executor_lock:
+            if _llm_executor is None:
+                _llm_executor = ThreadPoolExecutor(max_workers=Config.HEDGE_WORKERS, thread_name_prefix='llm-call')
+    return _llm_executor
+
+
+def call_llm_backend(backend, payload):
+    """
+    向指定 LLM 后端发送非流式请求，调用期间占用该服务商的准入名额，并记录调用耗时用于路由。
+    :raises admission.OverloadedError: 如果服务商繁忙，未被准入
+    """
+    with backend.track() as call, admission.slot(backend.provider):
+        response = http_client.post(
+            backend.url,
+            json=backend.payload(payload),
+            headers=backend.headers(),
+            upstream=backend.provider
+        )
+        call.status_code = response.status_code
+    return response
+
+
+def _discard_response(future):
+    """对冲中落选的调用完成后释放连接"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def post_chat_completion(payload):
+    """
+    发送非流式 LLM 请求 (合规检查、翻译)：按路由选择后端，首选后端超过对冲等待时间仍未返回时
+    向备选后端发出对冲请求并返回先成功的响应；首选后端快速失败时直接转移到备选后端。
+    请求体中的 model 由所选后端替换。
+    :return: requests.Response
+    :raises admission.OverloadedError: 如果服务商繁忙，未被准入
+    """
+    primary, fallback, delay = model_router.plan_llm_call()
+    if fallback is None:
+        return call_llm_backend(primary, payload)
+
+    first = get_llm_executor().submit(call_llm_backend, primary, payload)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        if model_router.succeeded(first):
+            return first.result()
+        metrics.LLM_HEDGES.inc(outcome='failover')
+        return call_llm_backend(fallback, payload)
+    if not model_router.try_hedge():
+        return first.result()
+
+    # 同步调用无法中断进行中的请求：落选的调用完成后释放连接，名额随之归还
+    second = get_llm_executor().submit(call_llm_backend, fallback, payload)
+    pending = {first, second}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        winner = next((future for future in done if model_router.succeeded(future)), None)
+        if winner is not None:
+            if winner is second:
+                metrics.LLM_HEDGES.inc(outcome='won')
+            for future in {first, second} - {winner}:
+                future.cancel()
+                future.add_done_callback(_discard_response)
+            return winner.result()
+    # 均失败时返回首选后端的结果 (或抛出其异常)
+    second.add_done_callback(_discard_response)
+    return first.result()
+
+
+def cached_compliance(prompt: str):
+    """
+    在本地词表与合规结论缓存中查询提示词。
     :param prompt: 待检查的文本提示词
-    :raises PermissionError: 如果内容不合规
-    :raises Exception: 如果调用模型失败
+    :return: 需要调用模型检查时返回缓存键，已确认合规时返回 None
+    :raises PermissionError: 如果已确认不合规
+    :raises Exception: 如果提示词为空
     """
     if not prompt.strip():
         raise Exception("提示词不能为空")
 
+    # 命中本地词表或缓存时直接返回结论，避免调用模型
+    cache_key = prompt_key(prompt)
+    verdict = prefilter.classify(prompt) or compliance_cache.get(cache_key)
+    if verdict == 'DISALLOWED':
+        raise PermissionError("提示词包含不允许的内容")
+    if verdict == 'ALLOWED':
+        return None
+    return cache_key
+
+
+def compliance_payload(prompt: str):
+    """
+    构造单条合规检查的模型请求体。
+    """
     compliance_prompt = (
         f"不要推理，直接返回。请检查以下文本是否包含任何违法不良信息、敏感内容或成人内容。"
         f"如果包含，请仅返回大写的 'DISALLOWED'；如果不包含，请仅返回大写的 'ALLOWED'。"
         f"文本内容：{prompt}"
     )
-    compliance_payload = {
+    return {
         "model": "Qwen/Qwen3-8B",
         "messages": [
             {"role": "user", "content": compliance_prompt}
@@ -39,29 +171,226 @@ def compliance_check(prompt: str):
         "max_tokens": 10,  # 合规检查不需要长输出
         "stream": False
     }
-    headers = {
-        "Authorization": f"Bearer {Config.SILICON_FLOW_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    compliance_response = requests.post(
-        Config.SILICON_FLOW_LLM_URL,
-        json=compliance_payload,
-        headers=headers
-    )
-    if compliance_response.status_code == 200:
-        compliance_data = compliance_response.json()
-        # 安全访问响应内容
-        try:
-            compliance_text = compliance_data['choices'][0]['message']['content'].strip().upper()
-        except (KeyError, IndexError):
-            raise Exception(f"合规检查模型返回格式错误: {compliance_data}")
 
-        if compliance_text == 'DISALLOWED':
-            raise PermissionError("提示词包含不允许的内容")
+
+def apply_compliance_response(cache_key: str, compliance_data):
+    """
+    解析合规检查的模型响应并缓存结论。
+    :raises PermissionError: 如果内容不合规
+    :raises Exception: 如果响应格式错误
+    """
+    # 安全访问响应内容
+    try:
+        compliance_text = compliance_data['choices'][0]['message']['content'].strip().upper()
+    except (KeyError, IndexError):
+        raise Exception(f"合规检查模型返回格式错误: {compliance_data}")
+
+    # 仅缓存明确的结论，其他输出下次仍交给模型判断
+    if compliance_text in ('ALLOWED', 'DISALLOWED'):
+        compliance_cache.set(cache_key, compliance_text)
+    if compliance_text == 'DISALLOWED':
+        raise PermissionError("提示词包含不允许的内容")
+
+
+@metrics.timed('compliance')
+def compliance_check(prompt: str):
+    """
+    调用硅基流动 Qwen3 模型进行合规性检查。
+    :param prompt: 待检查的文本提示词
+    :raises PermissionError: 如果内容不合规
+    :raises Exception: 如果调用模型失败
+    """
+    cache_key = cached_compliance(prompt)
+    if cache_key is None:
+        return
+
+    compliance_response = post_chat_completion(compliance_payload(prompt))
+    if compliance_response.status_code == 200:
+        apply_compliance_response(cache_key, compliance_response.json())
     else:
         raise Exception(f"硅基流动合规检查失败: {compliance_response.text}")
 
 
+def compliance_check_batch(prompts):
+    """
+    批量合规检查：命中本地词表或缓存的提示词直接返回结论，其余按 COMPLIANCE_BATCH_SIZE 分组，
+    每组打包为一次模型请求并要求逐条返回结论；分组响应无法解析时回退为并发的单条检查。
+    :param prompts: 待检查的提示词列表
+    :return: 与 prompts 一一对应的结论列表，元素为 'ALLOWED'、'DISALLOWED'，检查失败时为 None
+    """
+    verdicts = {}
+    pending = []
+    for prompt in prompts:
+        if not prompt.strip():
+            continue
+        key = prompt_key(prompt)
+        if key in verdicts:
+            continue
+        verdicts[key] = prefilter.classify(prompt) or compliance_cache.get(key)
+        if verdicts[key] is None:
+            pending.append((key, prompt))
+
+    if pending:
+        size = max(1, Config.COMPLIANCE_BATCH_SIZE)
+        chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+        workers = max(1, min(Config.COMPLIANCE_BATCH_CONCURRENCY, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='compliance') as executor:
+            for chunk_verdicts in executor.map(_check_chunk, chunks):
+                verdicts.update(chunk_verdicts)
+
+    return [verdicts.get(prompt_key(prompt)) if prompt.strip() else None for prompt in prompts]
+
+
+def _check_chunk(chunk):
+    """
+    检查一组提示词，打包请求失败时回退为并发的单条检查。
+    :param chunk: [(缓存键, 提示词)] 列表
+    :return: {缓存键: 结论} 字典
+    """
+    if len(chunk) == 1:
+        key, prompt = chunk[0]
+        return {key: _single_verdict(prompt)}
+    try:
+        labels = call_packed_compliance([prompt for _, prompt in chunk])
+    except (http_client.CircuitOpenError, admission.OverloadedError):
+        return {}
+    except Exception as e:
+        logger.warning(f"打包合规检查失败，回退为单条检查: {e}")
+        workers = max(1, min(Config.COMPLIANCE_BATCH_CONCURRENCY, len(chunk)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='compliance-single') as executor:
+            return dict(zip([key for key, _ in chunk], executor.map(_single_verdict, [p for _, p in chunk])))
+
+    results = {}
+    for (key, _), label in zip(chunk, labels):
+        compliance_cache.set(key, label)
+        results[key] = label
+    return results
+
+
+def _single_verdict(prompt):
+    """单条合规检查，返回结论而不是抛出 PermissionError；检查失败时返回 None"""
+    try:
+        compliance_check(prompt)
+        return 'ALLOWED'
+    except PermissionError:
+        return 'DISALLOWED'
+    except Exception as e:
+        logger.warning(f"合规检查失败: {e}")
+        return None
+
+
+@metrics.timed('compliance_batch')
+def call_packed_compliance(prompts):
+    """
+    在一次模型请求中检查多条提示词，要求模型按顺序返回 {"verdicts": ["ALLOWED" | "DISALLOWED", ...]}。
+    :param prompts: 提示词列表
+    :return: 与 prompts 一一对应的结论列表
+    :raises ValueError: 如果响应无法解析或结论数量、取值不符合要求
+    :raises Exception: 如果调用模型失败
+    """
+    # 以 JSON 数组传入文本，避免提示词内容打乱条目边界
+    packed_prompt = (
+        f"不要推理，直接返回。下面的 JSON 数组中共有 {len(prompts)} 条文本，"
+        f"请逐条检查是否包含任何违法不良信息、敏感内容或成人内容。"
+        f"请严格按以下JSON格式输出，不要包含其他内容："
+        f"{{\"verdicts\": [<与文本顺序一一对应，包含时为 \"DISALLOWED\"，不包含时为 \"ALLOWED\">]}}"
+        f"文本列表：{json.dumps(prompts, ensure_ascii=False)}"
+    )
+    packed_payload = {
+        "model": "Qwen/Qwen3-8B",
+        "messages": [
+            {"role": "user", "content": packed_prompt}
+        ],
+        "max_tokens": 16 + 8 * len(prompts),
+        "response_format": {"type": "json_object"},
+        "stream": False
+    }
+    packed_response = post_chat_completion(packed_payload)
+    if packed_response.status_code != 200:
+        raise Exception(f"硅基流动合规检查失败: {packed_response.text}")
+
+    packed_data = packed_response.json()
+    try:
+        content = packed_data['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError) as e:
+        raise ValueError(f"解析批量合规响应失败: {e}")
+    verdicts = parse_json_object(content).get('verdicts')
+    if not isinstance(verdicts, list) or len(verdicts) != len(prompts):
+        raise ValueError(f"批量合规响应的结论数量不符: {verdicts}")
+    verdicts = [str(v).strip().upper() for v in verdicts]
+    if any(v not in ('ALLOWED', 'DISALLOWED') for v in verdicts):
+        raise ValueError(f"批量合规响应包含无效结论: {verdicts}")
+    return verdicts
+
+
+def cached_translation(prompt: str):
+    """
+    查询翻译缓存 (缓存的条目在写入时已通过合规检查)。
+    本地违规词表优先于翻译缓存：词表更新后命中的提示词不再返回此前缓存的译文，并清除该译文。
+    :return: (缓存键, 缓存的译文)；提示词为空时缓存键为 None，未命中时译文为 None
+    :raises PermissionError: 如果提示词命中违规词表
+    """
+    if not prompt.strip():
+        return None, None
+    cache_key = prompt_key(prompt)
+    cached = translation_cache.get(cache_key)
+    if prefilter.classify(prompt) == 'DISALLOWED':
+        if cached:
+            translation_cache.delete(cache_key)
+            compliance_cache.delete(prompt_key(cached))
+        raise PermissionError("提示词包含不允许的内容")
+    if cached and prefilter.classify(cached) == 'DISALLOWED':
+        # 译文命中违规词表时视为未命中，重新经过合规检查与翻译
+        translation_cache.delete(cache_key)
+        cached = None
+    if cached:
+        compliance_cache.set(prompt_key(cached), 'ALLOWED')
+    return cache_key, cached
+
+
+def use_combined_mode(prompt: str, cache_key: str) -> bool:
+    """
+    判断是否以单次调用同时完成合规检查与翻译。
+    合规结论已缓存或可由本地词表判定时，两次调用路径也只需一次翻译请求，无需合并。
+    """
+    return bool(Config.SILICON_FLOW_COMBINED_MODE and cache_key
+                and prefilter.classify(prompt) is None and compliance_cache.get(cache_key) is None)
+
+
+def translate_payload(prompt: str, stream: bool = False):
+    """
+    构造翻译的模型请求体。
+    """
+    return {
+        "model": "Qwen/Qwen3-8B",
+        "messages": [
+            {"role": "user", "content": build_translate_prompt(prompt)}
+        ],
+        "max_tokens": 512,
+        "stream": stream
+    }
+
+
+def parse_translate_response(translate_data) -> str:
+    """
+    从翻译的模型响应中解析英文提示词。
+    :raises ValueError: 如果响应格式错误或译文为空
+    """
+    try:
+        content = translate_data['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError) as e:
+        raise ValueError(f"解析翻译响应失败: {e}。响应内容: {translate_data}")
+    try:
+        en_prompt_json = parse_json_object(content)
+    except ValueError as e:
+        raise ValueError(f"解析翻译响应失败: {e}")
+    en_prompt = en_prompt_json.get('en_prompt', '')
+    if not en_prompt:
+        raise ValueError("翻译未能生成 'en_prompt'")
+    return en_prompt
+
+
+@metrics.timed('translate')
 def call_silicon_flow_qwen3(prompt: str):
     """
     调用硅基流动 Qwen3 模型进行翻译和合规检测。
@@ -70,49 +399,262 @@ def call_silicon_flow_qwen3(prompt: str):
     :raises ValueError: 如果翻译失败或响应格式错误
     :raises Exception: 如果调用模型失败
     """
+    # 0. 命中翻译缓存时直接返回
+    cache_key, cached = cached_translation(prompt)
+    if cached:
+        return cached
+
+    # 单次调用模式：合规检查与翻译合并为一个请求，解析失败时回退到两次调用
+    if use_combined_mode(prompt, cache_key):
+        try:
+            return call_combined_translate(prompt, cache_key)
+        except ValueError:
+            pass
+
     # 1. 合规检测 (已在 compliance_check 中实现)
     compliance_check(prompt)
 
     # 2. 翻译
-    translate_prompt = (
+    translate_response = post_chat_completion(translate_payload(prompt))
+    if translate_response.status_code == 200:
+        en_prompt = parse_translate_response(translate_response.json())
+        remember_translation(cache_key, en_prompt)
+        return en_prompt
+    else:
+        raise Exception(f"硅基流动翻译失败: {translate_response.text}")
+
+
+def build_translate_prompt(prompt: str) -> str:
+    """
+    构造翻译指令，要求模型以 {"en_prompt": ...} 格式输出。
+    """
+    return (
         f"不要推理，直接返回。请将以下中文文本翻译成英文。"
         f"请严格按以下JSON格式输出，不要包含其他内容：{{\"en_prompt\": \"<英文翻译>\"}}"
         f"文本内容：{prompt}"
     )
-    headers = {
-        "Authorization": f"Bearer {Config.SILICON_FLOW_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    translate_payload = {
+
+
+def stream_translation(prompt: str):
+    """
+    流式翻译：先同步完成缓存查询与合规检查，再返回逐段产出英文译文的生成器。
+    :param prompt: 原始中文提示词
+    :return: 生成器，产出译文片段；命中缓存时一次产出完整译文
+    :raises PermissionError: 如果内容不合规
+    :raises Exception: 如果合规检查调用失败
+    """
+    cache_key, cached = cached_translation(prompt)
+    if cached:
+        return iter([cached])
+
+    # 合规检查在开始推送前完成，不合规时调用方仍可返回 403
+    compliance_check(prompt)
+    return _stream_translate(prompt, cache_key)
+
+
+class TranslationStream:
+    """
+    翻译模型 SSE 响应的解析器：逐行输入，从增量内容中实时解析 en_prompt 字段，
+    结束后校验译文并写入翻译缓存 (同步与异步模式共用)。
+    """
+
+    def __init__(self, cache_key: str):
+        self.cache_key = cache_key
+        self.finished = False
+        self._field = JsonFieldStream('en_prompt')
+        self._content = []
+
+    def feed_line(self, line: bytes) -> str:
+        """
+        输入响应中的一行。
+        :return: 本行新解析出的译文片段，没有新内容时返回空字符串
+        """
+        # 按字节切分行，再以 UTF-8 解码 (SSE 响应通常不声明字符集)
+        line = line.decode('utf-8').strip()
+        if not line.startswith('data:'):
+            return ''
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            self.finished = True
+            return ''
+        try:
+            delta = json.loads(data)['choices'][0]['delta'].get('content') or ''
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            return ''
+        self._content.append(delta)
+        return self._field.feed(delta)
+
+    def finish(self) -> str:
+        """
+        响应结束后校验译文并写入缓存。
+        :return: 尚未产出的译文 (未能增量解析时为按完整输出解析得到的译文)
+        :raises ValueError: 如果译文为空或输出无法解析
+        """
+        remaining = ''
+        if self._field.done:
+            en_prompt = self._field.value
+        elif self._field.value:
+            raise ValueError("翻译输出不完整")
+        else:
+            # 未能增量解析 (如模型输出格式不符)，按完整输出解析后一次产出
+            en_prompt = remaining = parse_json_object(''.join(self._content)).get('en_prompt', '')
+        if not en_prompt:
+            raise ValueError("翻译未能生成 'en_prompt'")
+        remember_translation(self.cache_key, en_prompt)
+        return remaining
+
+
+def _stream_translate(prompt: str, cache_key: str):
+    """
+    以流式请求调用翻译模型，实时产出解析出的译文片段，完成后写入翻译缓存。
+    :raises ValueError: 如果译文为空或输出无法解析
+    :raises Exception: 如果调用模型失败
+    """
+    parser = TranslationStream(cache_key)
+    # 流式调用不对冲，只按路由选择后端；推送期间上游仍在生成，名额保持到响应读取完毕
+    backend = model_router.llm.choose()
+    with admission.slot(backend.provider):
+        translate_response = http_client.post(
+            backend.url,
+            json=backend.payload(translate_payload(prompt, stream=True)),
+            headers=backend.headers(),
+            upstream=backend.provider,
+            stream=True
+        )
+        with translate_response:
+            if translate_response.status_code != 200:
+                raise Exception(f"硅基流动翻译失败: {translate_response.text}")
+            for line in translate_response.iter_lines():
+                text = parser.feed_line(line)
+                if text:
+                    yield text
+                if parser.finished:
+                    break
+    remaining = parser.finish()
+    if remaining:
+        yield remaining
+
+
+def remember_translation(cache_key: str, en_prompt: str):
+    """
+    缓存翻译结果，并将译文标记为已通过合规检查。
+    """
+    # 原文已通过合规检查，其译文随后提交到 /api/process 时可直接命中缓存
+    compliance_cache.set(prompt_key(en_prompt), 'ALLOWED')
+    translation_cache.set(cache_key, en_prompt)
+
+
+def combined_payload(prompt: str):
+    """
+    构造合规检查与翻译合并请求的模型请求体，要求模型返回 {"allowed": bool, "en_prompt": str}。
+    """
+    combined_prompt = (
+        f"不要推理，直接返回。请先检查以下文本是否包含任何违法不良信息、敏感内容或成人内容，"
+        f"再将其翻译成英文。"
+        f"请严格按以下JSON格式输出，不要包含其他内容："
+        f"{{\"allowed\": <不包含不良内容时为 true，否则为 false>, \"en_prompt\": \"<英文翻译，不合规时为空字符串>\"}}"
+        f"文本内容：{prompt}"
+    )
+    return {
         "model": "Qwen/Qwen3-8B",
         "messages": [
-            {"role": "user", "content": translate_prompt}
+            {"role": "user", "content": combined_prompt}
         ],
         "max_tokens": 512,
+        "response_format": {"type": "json_object"},
         "stream": False
     }
-    translate_response = requests.post(
-        Config.SILICON_FLOW_LLM_URL,
-        json=translate_payload,
-        headers=headers
-    )
-    if translate_response.status_code == 200:
-        translate_data = translate_response.json()
-        try:
-            content = translate_data['choices'][0]['message']['content']
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.endswith("```"):
-                content = content[:-3]
-            en_prompt_json = json.loads(content)
-            en_prompt = en_prompt_json.get('en_prompt', '')
-            if not en_prompt:
-                raise ValueError("翻译未能生成 'en_prompt'")
-            return en_prompt
-        except (json.JSONDecodeError, KeyError, IndexError) as e:
-            raise ValueError(f"解析翻译响应失败: {e}。响应内容: {content}")
-    else:
-        raise Exception(f"硅基流动翻译失败: {translate_response.text}")
+
+
+def apply_combined_response(cache_key: str, combined_data):
+    """
+    解析合并请求的模型响应，缓存合规结论与译文。
+    :return: 翻译后的英文提示词
+    :raises PermissionError: 如果内容不合规
+    :raises ValueError: 如果响应无法解析或字段不符合要求
+    """
+    try:
+        content = combined_data['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError) as e:
+        raise ValueError(f"解析合规翻译响应失败: {e}")
+    result = parse_json_object(content)
+    allowed = result.get('allowed')
+    en_prompt = result.get('en_prompt')
+    # 严格校验字段类型，任何不符都视为无法解析
+    if not isinstance(allowed, bool):
+        raise ValueError(f"合规翻译响应缺少布尔字段 'allowed': {result}")
+    if not allowed:
+        compliance_cache.set(cache_key, 'DISALLOWED')
+        raise PermissionError("提示词包含不允许的内容")
+    if not isinstance(en_prompt, str) or not en_prompt.strip():
+        raise ValueError(f"合规翻译响应缺少 'en_prompt': {result}")
+    compliance_cache.set(cache_key, 'ALLOWED')
+    remember_translation(cache_key, en_prompt)
+    return en_prompt
+
+
+def call_combined_translate(prompt: str, cache_key: str):
+    """
+    单次调用同时完成合规检查与翻译。
+    :param prompt: 原始中文提示词
+    :param cache_key: 规范化提示词的缓存键
+    :return: 翻译后的英文提示词
+    :raises PermissionError: 如果内容不合规
+    :raises ValueError: 如果响应无法解析或字段不符合要求 (调用方据此回退到两次调用)
+    :raises Exception: 如果调用模型失败
+    """
+    combined_response = post_chat_completion(combined_payload(prompt))
+    if combined_response.status_code != 200:
+        raise Exception(f"硅基流动翻译失败: {combined_response.text}")
+    return apply_combined_response(cache_key, combined_response.json())
+
+
+def warm_translation_cache():
+    """
+    启动时从共享层 (SQLite) 预热翻译缓存。
+    :return: 加载的条目数
+    """
+    return translation_cache.warm()
+
+
+def seed_translation_cache(seed_path: str):
+    """
+    从文件预置常用提示词的翻译。
+    文件每行一条：JSON 对象 {"prompt": "...", "en_prompt": "..."} 的提示词与译文批量通过合规检查后写入缓存
+    (命中缓存的译文会被视为合规，未通过或检查失败的条目计为失败)；
+    纯文本行或缺少 en_prompt 的行视为待翻译的提示词，调用模型翻译 (含合规检查) 后写入缓存。
+    :param seed_path: 预置文件路径
+    :return: (写入条数, 失败条数)
+    """
+    seeded, failed = 0, 0
+    translated = []
+    with open(seed_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line) if line.startswith('{') else {'prompt': line}
+                prompt = entry['prompt']
+                en_prompt = entry.get('en_prompt')
+                if en_prompt:
+                    translated.append((prompt, en_prompt))
+                else:
+                    call_silicon_flow_qwen3(prompt)
+                    seeded += 1
+            except Exception:
+                failed += 1
+
+    if translated:
+        texts = [text for pair in translated for text in pair]
+        verdicts = compliance_check_batch(texts)
+        for i, (prompt, en_prompt) in enumerate(translated):
+            if verdicts[2 * i] == 'ALLOWED' and verdicts[2 * i + 1] == 'ALLOWED':
+                translation_cache.set(prompt_key(prompt), en_prompt)
+                seeded += 1
+            else:
+                failed += 1
+    return seeded, failed
 
 
 def encode_file(file_path):
@@ -130,30 +672,245 @@ def encode_file(file_path):
     return f"data:{mime_type};base64,{encoded_string}"
 
 
-def call_bailian(file_path: str, prompt_text: str):
+def get_task_poller():
     """
-    调用百炼平台 API 进行图片编辑。
-    :param file_path: 本地图片文件路径
-    :param prompt_text: 编辑指令 (英文)
-    :return: 处理后图片的 Base64 编码字符串
-    :raises Exception: 如果调用失败或处理失败
+    获取共享的百炼异步任务轮询器 (懒加载)。
     """
-    # 再次进行合规检查 (虽然前端可能已检查，但后端也应确保)
-    compliance_check(prompt_text)
+    global _task_poller
+    if _task_poller is None:
+        with _task_poller_lock:
+            if _task_poller is None:
+                _task_poller = TaskPoller(
+                    fetch=lambda task_id: call_dashscope(
+                        'bailian-poll', ImageSynthesis.fetch, task_id, api_key=Config.BAILIAN_API_KEY
+                    ),
+                    interval=Config.BAILIAN_POLL_INTERVAL,
+                    timeout=Config.BAILIAN_TASK_TIMEOUT
+                )
+    return _task_poller
+
+
+def call_dashscope(upstream: str, func, *args, **kwargs):
+    """
+    调用 DashScope SDK 并记录上游调用指标 (SDK 不经过 http_client)。
+    """
+    start = time.perf_counter()
+    with metrics.UPSTREAM_IN_FLIGHT.track_inprogress(upstream=upstream):
+        try:
+            rsp = func(*args, **kwargs)
+        except Exception as e:
+            metrics.record_upstream(upstream, time.perf_counter() - start, exc=e)
+            raise
+    metrics.record_upstream(upstream, time.perf_counter() - start, status_code=rsp.status_code)
+    return rsp
+
+
+def save_task_record(task_id: str, status: str, image_url: str = None):
+    """
+    记录百炼异步任务的 ID 与状态，便于排查和对账。
+    """
+    now = time.time()
+    with db.transaction() as conn:
+        conn.execute(
+            "INSERT INTO bailian_tasks (task_id, status, image_url, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(task_id) DO UPDATE SET status = excluded.status,"
+            " image_url = excluded.image_url, updated_at = excluded.updated_at",
+            (task_id, status, image_url, now, now)
+        )
 
-    model_id = Config.BAILIAN_MODEL_ID
-    api_key = Config.BAILIAN_API_KEY
-    image_file_path = f'file://{file_path}'
 
-    rsp = ImageSynthesis.call(
-        api_key=api_key,
-        model=model_id,
+@metrics.timed('bailian_submit')
+def start_bailian_task(image_file_path: str, prompt_text: str, model_id: str = None):
+    """
+    提交百炼异步任务，并交给共享轮询器等待结果。
+    :param model_id: 图片编辑模型 ID，缺省时使用 BAILIAN_MODEL_ID
+    :return: (任务 ID, 任务完成时得到 DashScope 响应对象的 Future)
+    :raises Exception: 如果提交失败
+    """
+    rsp = call_dashscope(
+        'bailian',
+        ImageSynthesis.async_call,
+        api_key=Config.BAILIAN_API_KEY,
+        model=model_id or Config.BAILIAN_MODEL_ID,
         function="description_edit",
         prompt=prompt_text,
         base_image_url=image_file_path,
         n=1
     )
+    if rsp.status_code != HTTPStatus.OK:
+        raise Exception(f"提交百炼异步任务失败: "
+                        f"状态码={rsp.status_code}, "
+                        f"错误码={getattr(rsp, 'code', 'N/A')}, "
+                        f"消息={getattr(rsp, 'message', 'N/A')}")
+    task_id = rsp.output.task_id
+    save_task_record(task_id, rsp.output.task_status)
+    return task_id, get_task_poller().watch(task_id)
+
+
+def finish_bailian_task(task_id: str, result):
+    """
+    记录百炼异步任务的最终状态。
+    :param result: 任务完成时的 DashScope 响应对象，任务失败时为 None
+    :return: result
+    """
+    if result is None:
+        save_task_record(task_id, 'FAILED')
+        return None
+    results = getattr(result.output, 'results', None)
+    save_task_record(task_id, result.output.task_status, results[0].url if results else None)
+    return result
 
+
+def submit_bailian_task(image_file_path: str, prompt_text: str, model_id: str = None):
+    """
+    以异步任务方式提交图片编辑，并等待共享轮询器返回结果。
+    :return: 任务成功时的 DashScope 响应对象
+    :raises Exception: 如果提交失败、任务失败或等待超时
+    """
+    task_id, future = start_bailian_task(image_file_path, prompt_text, model_id)
+    try:
+        with metrics.stage('bailian_wait'):
+            result = future.result()
+    except Exception:
+        finish_bailian_task(task_id, None)
+        raise
+    return finish_bailian_task(task_id, result)
+
+
+def result_mime_type(image_response, image_url: str) -> str:
+    """
+    根据响应头或 URL 后缀判断结果图片的 MIME 类型。
+    """
+    mime_type = image_response.headers.get('Content-Type', '').split(';')[0].strip()
+    if not mime_type.startswith('image/'):
+        mime_type = mimetypes.guess_type(urlsplit(image_url).path)[0] or 'image/png'
+    return mime_type
+
+
+@metrics.timed('result_deliver')
+def deliver_result(image_url: str):
+    """
+    下载模型生成的图片，并按 RESULT_DELIVERY 配置返回结果。
+    - 'url': 分块流式写入上传目录，返回 {'result_url': ...}，不在内存中保留整张图片
+    - 'passthrough': 保持原始编码直接 Base64，返回 {'result': ..., 'mime_type': ...}
+    - 'base64' (默认，兼容旧前端): 解码后重新编码为 PNG 再 Base64，返回 {'result': ...}
+    :param image_url: 模型返回的结果图片地址
+    :return: 返回给前端的结果字典
+    :raises Exception: 如果下载失败
+    """
+    mode = Config.RESULT_DELIVERY
+    image_response = http_client.get(image_url, upstream='bailian-result', stream=(mode == 'url'))
+    with image_response:
+        if image_response.status_code != 200:
+            raise Exception(f"从 URL 下载处理后的图片失败: {image_url}, 状态码: {image_response.status_code}")
+        mime_type = result_mime_type(image_response, image_url)
+
+        if mode == 'url':
+            extension = mimetypes.guess_extension(mime_type) or '.png'
+            _, _, file_url_path = image_service.save_result_stream(
+                image_response.iter_content(chunk_size=Config.RESULT_CHUNK_SIZE), extension
+            )
+            return {'result_url': file_url_path}
+        return encode_result(image_response.content, mime_type)
+
+
+@metrics.timed('result_encode')
+def encode_result(image_bytes: bytes, mime_type: str):
+    """
+    将结果图片编码为 Base64 结果字典 ('passthrough' 保持原始编码，其余模式重新编码为 PNG)。
+    """
+    if Config.RESULT_DELIVERY == 'passthrough':
+        encoded_string = base64.b64encode(image_bytes).decode('utf-8')
+        return {'result': encoded_string, 'mime_type': mime_type}
+
+    processed_image = Image.open(BytesIO(image_bytes))
+    # 将处理后的图像保存为字节流
+    img_byte_arr = BytesIO()
+    processed_image.save(img_byte_arr, format='PNG')  # 或 'JPEG'
+    img_byte_arr.seek(0)
+    # 编码为Base64
+    encoded_string = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
+    return {'result': encoded_string}
+
+
+@metrics.timed('result_download')
+def download_to_cache(image_url: str):
+    """
+    将模型生成的图片分块流式写入结果缓存目录。
+    :return: (file_path, mime_type) 元组
+    :raises Exception: 如果下载失败
+    """
+    image_response = http_client.get(image_url, upstream='bailian-result', stream=True)
+    with image_response:
+        if image_response.status_code != 200:
+            raise Exception(f"从 URL 下载处理后的图片失败: {image_url}, 状态码: {image_response.status_code}")
+        mime_type = result_mime_type(image_response, image_url)
+        file_path = result_cache.new_file_path(mimetypes.guess_extension(mime_type) or '.png')
+        tmp_path = f"{file_path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in image_response.iter_content(chunk_size=Config.RESULT_CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+            os.replace(tmp_path, file_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return file_path, mime_type
+
+
+@metrics.timed('result_encode')
+def prepare_cached_result(file_path: str, mime_type: str):
+    """
+    将下载的结果文件转换为可直接返回的编码：'base64' 模式下非 PNG 的结果在写入缓存前重新编码为 PNG，
+    每个结果只编码一次，命中时直接 Base64 (见 format_cached_result)。
+    :return: (file_path, mime_type) 元组
+    """
+    if Config.RESULT_DELIVERY != 'base64' or mime_type == 'image/png':
+        return file_path, mime_type
+    png_path = result_cache.new_file_path('.png')
+    tmp_path = f"{png_path}.tmp"
+    try:
+        with Image.open(file_path) as image:
+            image.save(tmp_path, format='PNG')
+        os.replace(tmp_path, png_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        os.remove(file_path)
+    return png_path, 'image/png'
+
+
+def format_cached_result(file_path: str, mime_type: str):
+    """
+    按 RESULT_DELIVERY 配置将缓存的结果文件转换为返回给前端的结果字典。
+    :raises FileNotFoundError: 如果结果文件在查询之后被淘汰
+    """
+    if Config.RESULT_DELIVERY == 'url':
+        # 复制到上传目录，由 /uploads/ 路由提供访问，并随上传文件一起过期清理
+        with open(file_path, 'rb') as f:
+            _, _, file_url_path = image_service.save_result_stream(
+                iter(lambda: f.read(Config.RESULT_CHUNK_SIZE), b''),
+                os.path.splitext(file_path)[1]
+            )
+        return {'result_url': file_url_path}
+    with open(file_path, 'rb') as f:
+        image_bytes = f.read()
+    if Config.RESULT_DELIVERY == 'base64' and mime_type == 'image/png':
+        # 写入缓存时已编码为 PNG (见 prepare_cached_result)，命中时不再解码
+        return {'result': base64.b64encode(image_bytes).decode('utf-8')}
+    return encode_result(image_bytes, mime_type)
+
+
+def result_image_url(rsp) -> str:
+    """
+    从百炼响应中取出结果图片地址。
+    :raises Exception: 如果调用失败或响应结构不符合预期
+    """
     if rsp.status_code == HTTPStatus.OK:
         # 安全访问结果
         try:
@@ -165,18 +922,7 @@ def call_bailian(file_path: str, prompt_text: str):
             raise Exception(f"ModelScope API returned unexpected data structure: {rsp}")
 
         # print(f"处理后的图片地址: {image_url}") # 调试用
-        image_response = requests.get(image_url)
-        if image_response.status_code == 200:
-            processed_image = Image.open(BytesIO(image_response.content))
-            # 将处理后的图像保存为字节流
-            img_byte_arr = BytesIO()
-            processed_image.save(img_byte_arr, format='PNG')  # 或 'JPEG'
-            img_byte_arr.seek(0)
-            # 编码为Base64
-            encoded_string = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
-            return encoded_string
-        else:
-            raise Exception(f"从 URL 下载处理后的图片失败: {image_url}, 状态码: {image_response.status_code}")
+        return image_url
     else:
         # 提供更详细的错误信息
         error_msg = (f"调用 ModelScope API 失败: "
@@ -184,3 +930,88 @@ def call_bailian(file_path: str, prompt_text: str):
                      f"错误码={getattr(rsp, 'code', 'N/A')}, "
                      f"消息={getattr(rsp, 'message', 'N/A')}")
         raise Exception(error_msg)
+
+
+@metrics.timed('synthesize')
+def synthesize_image(file_path: str, prompt_text: str, backend=None) -> str:
+    """
+    调用百炼平台 API 进行图片编辑。
+    :param backend: 图片编辑后端 (model_router.Backend)，缺省时按路由选择
+    :return: 模型生成的结果图片地址
+    :raises admission.OverloadedError: 如果百炼繁忙，未被准入
+    :raises Exception: 如果调用失败
+    """
+    backend = backend or model_router.image.choose()
+    model_id = backend.model
+    api_key = Config.BAILIAN_API_KEY
+    image_file_path = f'file://{file_path}'
+
+    # 名额覆盖任务从提交到完成的全过程，并发数即百炼侧同时执行的任务数
+    with backend.track() as call, admission.slot(backend.provider):
+        if Config.BAILIAN_ASYNC_TASKS:
+            # 异步提交，由共享轮询器等待结果，不占用线程阻塞在 HTTP 调用上
+            rsp = submit_bailian_task(image_file_path, prompt_text, model_id)
+        else:
+            rsp = call_dashscope(
+                'bailian',
+                ImageSynthesis.call,
+                api_key=api_key,
+                model=model_id,
+                function="description_edit",
+                prompt=prompt_text,
+                base_image_url=image_file_path,
+                n=1
+            )
+        call.status_code = rsp.status_code
+    return result_image_url(rsp)
+
+
+def call_bailian(file_path: str, prompt_text: str, content_hash: str = None):
+    """
+    调用百炼平台 API 进行图片编辑，相同 (图片, 提示词, 模型) 的结果从缓存返回。
+    :param file_path: 本地图片文件路径
+    :param prompt_text: 编辑指令 (英文)
+    :param content_hash: 图片内容的 SHA256 (可选，缺省时根据文件计算)
+    :return: 返回给前端的结果字典，结构取决于 RESULT_DELIVERY 配置 (见 deliver_result)
+    :raises Exception: 如果调用失败或处理失败
+    """
+    # 再次进行合规检查 (虽然前端可能已检查，但后端也应确保)
+    compliance_check(prompt_text)
+
+    if not Config.RESULT_CACHE_ENABLED:
+        return deliver_result(synthesize_image(file_path, prompt_text))
+
+    if content_hash is None:
+        content_hash = image_service.hash_file(file_path)
+    # 先选择后端，缓存键使用实际生成结果的模型 ID，不同模型的结果互不混用
+    backend = model_router.image.choose()
+    cache_key = result_cache.make_key(content_hash, backend.model, prompt_text)
+    with metrics.stage('result_cache_lookup'):
+        cached = result_cache.lookup(cache_key)
+    if cached is not None:
+        try:
+            return format_cached_result(*cached)
+        except FileNotFoundError:
+            # 文件在查询与读取之间被淘汰，按未命中处理
+            pass
+    # 并发的相同请求只调用一次模型
+    cached = result_cache.coalesce(
+        cache_key, lambda: generate_and_cache(cache_key, file_path, prompt_text, backend)
+    )
+    return format_cached_result(*cached)
+
+
+def generate_and_cache(cache_key: str, file_path: str, prompt_text: str, backend=None):
+    """
+    调用模型生成结果并写入结果缓存 (合并请求的执行者调用)。
+    :param backend: 生成结果的图片编辑后端，须与缓存键中的模型一致
+    :return: (file_path, mime_type) 元组
+    """
+    # 其他请求可能在本请求查询缓存之后、成为执行者之前写入了结果，调用模型前再查询一次
+    cached = result_cache.lookup(cache_key, record=False)
+    if cached is not None:
+        return cached
+    image_url = synthesize_image(file_path, prompt_text, backend)
+    result_path, mime_type = prepare_cached_result(*download_to_cache(image_url))
+    result_cache.store(cache_key, result_path, mime_type)
+    return result_path, mime_type
@@ -0,0 +1,143 @@
+"""
+合规检查本地预过滤模块：在调用 LLM 之前，用 Aho-Corasick 自动机匹配已知违规词 (直接判定 DISALLOWED)，
+用白名单匹配已知合规的规范化提示词 (直接判定 ALLOWED)，其余提示词仍交给模型判断。
+词表从文件加载，文件修改后自动热更新。
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from services.cache import normalize_prompt, prompt_key
+from services.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordIndex:
+    """Aho-Corasick 多模式匹配自动机，一次扫描文本即可判断是否包含任一关键词"""
+
+    def __init__(self, keywords):
+        self._goto = [{}]  # 状态 -> {字符: 下一状态}
+        self._fail = [0]
+        self._output = [False]  # 状态是否 (经失败链) 匹配到关键词
+        for keyword in keywords:
+            self._add(keyword)
+        self._build()
+
+    def _add(self, keyword):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(False)
+            state = next_state
+        self._output[state] = True
+
+    def _build(self):
+        # 按广度优先顺序计算失败指针，并沿失败链合并匹配标记
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._output[self._fail[next_state]]:
+                    self._output[next_state] = True
+
+    def search(self, text):
+        """
+        :return: 文本是否包含任一关键词
+        """
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state]:
+                return True
+        return False
+
+
+def _read_lines(path):
+    """读取词表文件，忽略空行和 # 开头的注释行，并做与提示词相同的规范化"""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = (normalize_prompt(line) for line in f if not line.lstrip().startswith('#'))
+        return [line for line in lines if line]
+
+
+class _ListFile:
+    """按修改时间热更新的词表文件"""
+
+    def __init__(self, path, build):
+        self.path = path
+        self._build = build
+        self._mtime = None
+        self.value = build([])
+
+    def refresh(self):
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            self.value = self._build(_read_lines(self.path))
+            self._mtime = mtime
+            logger.info(f"已加载预过滤词表 {self.path}")
+        except Exception as e:
+            # 加载失败时保留旧词表
+            logger.error(f"加载预过滤词表 {self.path} 失败: {e}")
+
+
+_blocklist = _ListFile(Config.PREFILTER_BLOCKLIST_FILE, KeywordIndex)
+_allowlist = _ListFile(Config.PREFILTER_ALLOWLIST_FILE, lambda lines: {prompt_key(line) for line in lines})
+_reload_lock = threading.Lock()
+_last_check = 0.0
+
+
+def reload(force=False):
+    """
+    检查词表文件是否有更新 (间隔 PREFILTER_RELOAD_INTERVAL 秒)，有更新时重新构建。
+    """
+    global _last_check
+    now = time.monotonic()
+    if not force and now - _last_check < Config.PREFILTER_RELOAD_INTERVAL:
+        return
+    with _reload_lock:
+        if not force and now - _last_check < Config.PREFILTER_RELOAD_INTERVAL:
+            return
+        _last_check = now
+        _blocklist.refresh()
+        _allowlist.refresh()
+
+
+def classify(prompt: str):
+    """
+    本地判定提示词。
+    :param prompt: 待检查的提示词
+    :return: 'DISALLOWED' (命中违规词)、'ALLOWED' (命中白名单)，无法判定时返回 None
+    """
+    if not Config.PREFILTER_ENABLED:
+        return None
+    reload()
+    normalized = normalize_prompt(prompt)
+    # 违规词优先于白名单，同时匹配去除空白后的文本，防止用空格拆分关键词
+    blocklist = _blocklist.value
+    if blocklist.search(normalized) or blocklist.search(normalized.replace(' ', '')):
+        return 'DISALLOWED'
+    if prompt_key(prompt) in _allowlist.value:
+        return 'ALLOWED'
+    return None
@@ -0,0 +1,195 @@
+"""
+配额服务模块：按用户 (JWT 中的 identifier，未登录时为客户端 IP) 进行成本加权的令牌桶限流，并限制每日用量。
+- 每种操作按 QUOTA_COSTS 消耗令牌 (图片编辑远贵于翻译)，令牌桶以固定速率补充，容量即允许的突发量；
+- 每日预算按 UTC 自然日累计消耗的令牌数，用尽后当天拒绝；
+- 配置了 Redis 时以 Lua 脚本原子地完成检查与扣减，多进程/多节点共享配额；否则使用进程内存储 (单节点)。
+Redis 不可用时临时回退到进程内存储，不影响请求处理。
+"""
+
+import logging
+import math
+import threading
+import time
+
+from services import metrics
+from services.cache import LRUCache
+from services.config import Config
+from services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+ENABLED = Config.QUOTA_ENABLED
+DAY_SECONDS = 24 * 60 * 60
+
+# 检查每日预算与令牌桶，均满足时一并扣减。使用 Redis 服务器时间，避免各节点时钟偏差。
+# 返回 [是否允许, 重试等待秒数, 拒绝原因, 剩余令牌, 当日剩余预算 (-1 表示不限)]，数值以字符串返回以保留小数。
+_CHARGE_SCRIPT = """
+redis.replicate_commands()
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local budget = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local day = math.floor(now / 86400)
+local day_end = (day + 1) * 86400
+
+local used = 0
+if budget > 0 then
+    local daily = redis.call('HMGET', KEYS[2], 'day', 'used')
+    if tonumber(daily[1]) == day then
+        used = tonumber(daily[2]) or 0
+    end
+    if used + cost > budget then
+        return {0, tostring(day_end - now), 'daily', '0', tostring(budget - used)}
+    end
+end
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+if tokens < cost then
+    return {0, tostring((cost - tokens) / rate), 'rate', tostring(tokens), tostring(budget > 0 and budget - used or -1)}
+end
+
+tokens = tokens - cost
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+if budget > 0 then
+    redis.call('HSET', KEYS[2], 'day', day, 'used', tostring(used + cost))
+    redis.call('EXPIREAT', KEYS[2], day_end + 60)
+end
+return {1, '0', '', tostring(tokens), tostring(budget > 0 and budget - used - cost or -1)}
+"""
+
+
+class QuotaExceededError(Exception):
+    """
+    超出配额。
+    :param retry_after: 建议的重试等待时间 (秒)
+    :param scope: 'rate' (令牌桶耗尽) 或 'daily' (当日预算用尽)
+    """
+
+    def __init__(self, message, retry_after, scope):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.scope = scope
+
+
+class MemoryQuotaStore:
+    """进程内配额存储 (单节点部署)，长时间未访问的令牌桶已补满，过期淘汰不影响结果"""
+
+    def __init__(self):
+        self._buckets = LRUCache(Config.QUOTA_MEMORY_MAX_KEYS, Config.QUOTA_BUCKET_CAPACITY / Config.QUOTA_REFILL_RATE)
+        self._daily = LRUCache(Config.QUOTA_MEMORY_MAX_KEYS, DAY_SECONDS)
+        self._lock = threading.Lock()
+
+    def charge(self, key, capacity, rate, cost, budget):
+        now = time.time()
+        day = int(now // DAY_SECONDS)
+        day_end = (day + 1) * DAY_SECONDS
+        with self._lock:
+            used = 0
+            if budget > 0:
+                daily = self._daily.get(key)
+                if daily is not None and daily[0] == day:
+                    used = daily[1]
+                if used + cost > budget:
+                    return False, day_end - now, 'daily', 0, budget - used
+            tokens, ts = self._buckets.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+            if tokens < cost:
+                return False, (cost - tokens) / rate, 'rate', tokens, budget - used if budget > 0 else -1
+            tokens -= cost
+            self._buckets.set(key, (tokens, now), ttl=capacity / rate)
+            if budget > 0:
+                self._daily.set(key, (day, used + cost), ttl=day_end - now)
+            return True, 0, '', tokens, budget - used - cost if budget > 0 else -1
+
+
+class RedisQuotaStore:
+    """基于 Redis 的配额存储，令牌桶与每日用量各为一个哈希，由 Lua 脚本原子更新"""
+
+    BUCKET_PREFIX = 'chameleon:quota:bucket:'
+    DAILY_PREFIX = 'chameleon:quota:daily:'
+
+    def __init__(self, client):
+        self._script = client.register_script(_CHARGE_SCRIPT)
+
+    def charge(self, key, capacity, rate, cost, budget):
+        allowed, retry_after, scope, tokens, remaining = self._script(
+            keys=[self.BUCKET_PREFIX + key, self.DAILY_PREFIX + key],
+            args=[capacity, rate, cost, budget]
+        )
+        scope = scope.decode('utf-8') if isinstance(scope, bytes) else scope
+        return bool(allowed), float(retry_after), scope, float(tokens), float(remaining)
+
+
+_memory_store = MemoryQuotaStore()
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    获取配额存储 (懒加载)。配置了 Redis 时使用 Redis，否则使用进程内存储。
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                client = get_redis()
+                _store = RedisQuotaStore(client) if client is not None else _memory_store
+    return _store
+
+
+def client_key(session_data=None, remote_addr=None) -> str:
+    """
+    配额键：已登录时为哈希后的用户标识，否则为客户端 IP。
+    """
+    identifier = session_data.get('identifier') if session_data else None
+    if identifier:
+        return f"user:{identifier}"
+    return f"ip:{remote_addr or 'unknown'}"
+
+
+def operation_cost(operation: str, units: int = 1) -> float:
+    """
+    计算一次操作消耗的令牌数 (单次不超过令牌桶容量，否则永远无法满足)。
+    :param units: 条目数 (批量操作按条目计费)
+    """
+    cost = Config.QUOTA_COSTS.get(operation, 1) * max(1, units)
+    return min(cost, Config.QUOTA_BUCKET_CAPACITY)
+
+
+def charge(key: str, operation: str, units: int = 1):
+    """
+    为一次操作扣减配额。配额关闭时直接返回。
+    :param key: 配额键 (见 client_key)
+    :param operation: 操作名称 (QUOTA_COSTS 的键)
+    :param units: 条目数
+    :return: (剩余令牌数, 当日剩余预算)；配额关闭时返回 None，预算不限时当日剩余为 -1
+    :raises QuotaExceededError: 如果令牌不足或当日预算已用尽
+    """
+    if not ENABLED:
+        return None
+    args = (key, Config.QUOTA_BUCKET_CAPACITY, Config.QUOTA_REFILL_RATE,
+            operation_cost(operation, units), Config.QUOTA_DAILY_BUDGET)
+    store = get_store()
+    try:
+        allowed, retry_after, scope, tokens, remaining = store.charge(*args)
+    except Exception as e:
+        if store is _memory_store:
+            raise
+        # Redis 不可用时回退到进程内存储 (各节点分别计数)，避免配额检查拖垮请求
+        logger.warning(f"Redis 配额检查失败，回退到进程内存储: {e}")
+        allowed, retry_after, scope, tokens, remaining = _memory_store.charge(*args)
+
+    if not allowed:
+        metrics.QUOTA_REJECTIONS.inc(operation=operation, scope=scope)
+        retry_after = max(1, math.ceil(retry_after))
+        if scope == 'daily':
+            raise QuotaExceededError("今日用量已达上限，请明天再试", retry_after, scope)
+        raise QuotaExceededError(f"请求过于频繁，请 {retry_after} 秒后再试", retry_after, scope)
+    return tokens, remaining
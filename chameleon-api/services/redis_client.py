@@ -0,0 +1,36 @@
+"""
+Redis 客户端模块，根据 RATELIMIT_STORAGE_URL 提供进程内共享的 Redis 连接。
+"""
+
+import threading
+
+from services.config import Config
+
+_REDIS_SCHEMES = ('redis://', 'rediss://', 'unix://')
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def redis_enabled() -> bool:
+    """
+    判断当前配置的存储地址是否指向 Redis。
+    """
+    storage_url = Config.RATELIMIT_STORAGE_URL or ''
+    return storage_url.startswith(_REDIS_SCHEMES)
+
+
+def get_redis():
+    """
+    获取共享的 Redis 客户端 (懒加载，线程安全)。
+    :return: redis.Redis 实例；如果未配置 Redis 则返回 None
+    """
+    global _client
+    if not redis_enabled():
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis  # 仅在使用 Redis 时导入
+                _client = redis.Redis.from_url(Config.RATELIMIT_STORAGE_URL)
+    return _client
@@ -0,0 +1,198 @@
+"""
+图片编辑结果缓存模块：以 (上传图片内容哈希, 模型 ID, 规范化提示词) 为键，在磁盘上保存模型输出，
+按总大小做 LRU 淘汰，并合并并发的相同请求，使其只调用一次上游模型。
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from services import db, metrics
+from services.cache import normalize_prompt
+from services.config import Config
+
+logger = logging.getLogger(__name__)
+
+_inflight = {}  # key -> Future
+_inflight_async = {}  # key -> asyncio.Future (异步服务模式)
+_inflight_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evicted': 0}
+
+
+def _count(name, delta=1):
+    with _stats_lock:
+        _stats[name] += delta
+
+
+def stats():
+    """返回命中统计的快照"""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    total = snapshot['hits'] + snapshot['misses']
+    snapshot['hit_ratio'] = snapshot['hits'] / total if total else 0.0
+    return snapshot
+
+
+@metrics.register_collector
+def _collect_stats():
+    snapshot = stats()
+    return [
+        ('chameleon_result_cache_events_total', 'counter', '图片编辑结果缓存事件数',
+         [({'event': name}, snapshot[name]) for name in ('hits', 'misses', 'coalesced', 'evicted')]),
+        ('chameleon_result_cache_hit_ratio', 'gauge', '图片编辑结果缓存命中率', [({}, snapshot['hit_ratio'])]),
+    ]
+
+
+def make_key(content_hash: str, model_id: str, prompt: str) -> str:
+    """
+    计算结果缓存键。
+    """
+    raw = f"{content_hash}\n{model_id}\n{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def lookup(key: str, record: bool = True):
+    """
+    查询缓存的结果文件。
+    :param record: 是否计入命中统计 (同一请求的再次查询不重复计数)
+    :return: (file_path, mime_type)；未命中时返回 None
+    """
+    row = db.get_connection().execute(
+        "SELECT path, mime_type, last_access FROM result_cache WHERE key = ?", (key,)
+    ).fetchone()
+    if row is None:
+        if record:
+            _count('misses')
+        return None
+    file_path, mime_type, last_access = row
+    if not os.path.exists(file_path):
+        # 文件已被外部删除，记录失效
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+        if record:
+            _count('misses')
+        return None
+    now = time.time()
+    # 降低热点条目的写入频率：距上次更新超过一分钟才刷新访问时间
+    if now - last_access > 60:
+        with db.transaction() as conn:
+            conn.execute("UPDATE result_cache SET last_access = ? WHERE key = ?", (now, key))
+    if record:
+        _count('hits')
+    return file_path, mime_type
+
+
+def new_file_path(extension: str) -> str:
+    """
+    为新的缓存条目分配文件路径。
+    """
+    os.makedirs(Config.RESULT_CACHE_FOLDER, exist_ok=True)
+    return os.path.join(Config.RESULT_CACHE_FOLDER, f"{uuid.uuid4().hex}{extension}")
+
+
+def store(key: str, file_path: str, mime_type: str):
+    """
+    登记已写入磁盘的结果文件，并在超过容量上限时淘汰最久未访问的条目。
+    """
+    now = time.time()
+    size = os.path.getsize(file_path)
+    with db.transaction() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO result_cache (key, path, mime_type, size, created_at, last_access)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, file_path, mime_type, size, now, now)
+        )
+    evict(keep=key)
+
+
+def evict(keep=None):
+    """
+    按最近访问时间淘汰条目，直到总大小不超过 RESULT_CACHE_MAX_BYTES。
+    :param keep: 不参与淘汰的键 (刚写入、即将返回给调用方的条目)
+    :return: 淘汰的条目数
+    """
+    conn = db.get_connection()
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM result_cache").fetchone()[0]
+    evicted = 0
+    while total > Config.RESULT_CACHE_MAX_BYTES:
+        rows = conn.execute(
+            "SELECT key, path, size FROM result_cache WHERE key != ? ORDER BY last_access LIMIT 50",
+            (keep or '',)
+        ).fetchall()
+        if not rows:
+            break
+        victims = []
+        for key, file_path, size in rows:
+            if total <= Config.RESULT_CACHE_MAX_BYTES:
+                break
+            victims.append((key, file_path))
+            total -= size
+        placeholders = ', '.join('?' * len(victims))
+        with db.transaction() as tx:
+            tx.execute(f"DELETE FROM result_cache WHERE key IN ({placeholders})", [k for k, _ in victims])
+        for _, file_path in victims:
+            try:
+                os.remove(file_path)
+            except OSError as e:
+                logger.warning(f"删除结果缓存文件 {file_path} 失败: {e}")
+        evicted += len(victims)
+    if evicted:
+        _count('evicted', evicted)
+    return evicted
+
+
+def coalesce(key: str, func):
+    """
+    合并并发的相同请求：同一键只有第一个调用者执行 func，其余调用者等待并共享其结果或异常。
+    :param key: 结果缓存键
+    :param func: 无参函数，返回值在所有等待者之间共享
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        _count('coalesced')
+        return future.result()
+    try:
+        result = func()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+async def coalesce_async(key: str, func):
+    """
+    coalesce 的异步版本 (异步服务模式使用)：同一事件循环内同一键只有第一个调用者执行 func。
+    :param key: 结果缓存键
+    :param func: 无参函数，返回可等待对象，其结果在所有等待者之间共享
+    """
+    future = _inflight_async.get(key)
+    if future is not None:
+        _count('coalesced')
+        # shield 避免某个等待者被取消 (如客户端断开) 时取消共享的结果
+        return await asyncio.shield(future)
+    future = _inflight_async[key] = asyncio.get_running_loop().create_future()
+    try:
+        result = await func()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        # 没有其他等待者时避免 "exception was never retrieved" 警告
+        future.exception()
+        raise
+    finally:
+        _inflight_async.pop(key, None)
@@ -0,0 +1,101 @@
+"""
+数据库结构与迁移模块：应用 schema.sql 基线结构，再按 PRAGMA user_version 依次执行增量迁移。
+多个进程可能同时启动并调用 migrate()：每个迁移与其版本号更新在同一个 BEGIN IMMEDIATE 事务中执行，
+取得写锁后重新读取版本号，已由其他进程执行的迁移直接跳过。
+"""
+
+import os
+import sqlite3
+
+from services import db
+
+SCHEMA_FILE = os.path.join(os.path.dirname(__file__), 'schema.sql')
+
+# 增量迁移：(版本号, SQL 语句列表)。只能在末尾追加，不要修改已发布的条目
+MIGRATIONS = [
+    # 上传文件按内容寻址去重：image_uploads 每次上传一行 (保留上传者)，upload_contents 每个内容一行，
+    # ref_count 为引用该内容的上传记录数，降为 0 时才删除文件
+    (1, [
+        "ALTER TABLE image_uploads ADD COLUMN content_hash TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_image_uploads_content_hash ON image_uploads (content_hash)",
+        "CREATE INDEX IF NOT EXISTS idx_image_uploads_path ON image_uploads (path)",
+        """CREATE TABLE IF NOT EXISTS upload_contents (
+            content_hash TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            ref_count INTEGER NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_upload_contents_path ON upload_contents (path)",
+    ]),
+    # 图片编辑结果缓存索引表，文件保存在 RESULT_CACHE_FOLDER
+    (2, [
+        """CREATE TABLE IF NOT EXISTS result_cache (
+            key TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            mime_type TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_result_cache_last_access ON result_cache (last_access)",
+    ]),
+    # 加密会话密钥缓存 (共享层)
+    (3, [
+        """CREATE TABLE IF NOT EXISTS cache_crypto_session (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )""",
+    ]),
+    # 会话令牌吊销记录：key 为 jti:<令牌 ID> 或 user:<用户标识>
+    (4, [
+        """CREATE TABLE IF NOT EXISTS session_revocations (
+            key TEXT PRIMARY KEY,
+            revoked_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_session_revocations_revoked_at ON session_revocations (revoked_at)",
+    ]),
+]
+
+
+def _statements(script):
+    """
+    将 SQL 脚本拆分为单条语句，以便在显式事务中逐条执行 (executescript 会先提交当前事务)。
+    """
+    statements = []
+    buffer = ''
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ''
+    return statements
+
+
+def _version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate():
+    """
+    初始化数据库结构并执行未应用的迁移 (可重复调用，多进程并发调用安全)。
+    :return: 迁移后的结构版本号
+    """
+    with open(SCHEMA_FILE, 'r', encoding='utf-8') as f:
+        baseline = _statements(f.read())
+    with db.transaction(immediate=True) as conn:
+        for statement in baseline:
+            conn.execute(statement)
+    version = _version(db.get_connection())
+    for target_version, statements in MIGRATIONS:
+        if target_version <= version:
+            continue
+        with db.transaction(immediate=True) as conn:
+            # 等待写锁期间其他进程可能已执行该迁移
+            version = _version(conn)
+            if target_version <= version:
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(target_version)}")
+            version = target_version
+    return version
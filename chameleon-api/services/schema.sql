@@ -0,0 +1,48 @@
+-- 数据库表结构 (基线版本)，所有语句均可重复执行
+-- 后续的增量变更在 services/schema.py 的 MIGRATIONS 中追加
+
+-- 用户上传记录，用于定时清理过期文件
+CREATE TABLE IF NOT EXISTS image_uploads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    phone TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_image_uploads_created_at ON image_uploads (created_at);
+
+-- 图片处理异步任务
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    error_code INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs (updated_at);
+
+-- 百炼异步任务记录
+CREATE TABLE IF NOT EXISTS bailian_tasks (
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    image_url TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+-- 合规检查结论缓存 (共享层)
+CREATE TABLE IF NOT EXISTS cache_compliance (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+-- 翻译结果缓存 (共享层)
+CREATE TABLE IF NOT EXISTS cache_translation (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
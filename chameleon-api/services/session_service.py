@@ -0,0 +1,271 @@
+"""
+会话令牌服务模块：校验 JWT 会话令牌并支持吊销。
+- 已校验令牌的摘要 -> 载荷缓存在进程内 LRU 中 (不超过令牌的 exp)，命中时跳过解码与 HMAC 校验；
+- 吊销记录保存在 SQLite 或 Redis 中，进程内以布隆过滤器索引，绝大多数请求只需几次位运算即可确认未被吊销。
+可以吊销单个令牌 (按 jti) 或某个用户在吊销时刻之前签发的全部令牌。
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+
+import jwt
+
+from services import db
+from services.cache import LRUCache
+from services.config import Config
+from services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """定长布隆过滤器：不存在漏报，误报率由容量与位数组大小决定"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # 双重哈希：由一次 SHA256 的两段派生出 k 个位置
+        digest = hashlib.sha256(key.encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class SQLiteRevocationStore:
+    """基于 SQLite 的吊销记录存储 (表结构见 schema.py 迁移 4)"""
+
+    def add(self, key, revoked_at):
+        with db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_revocations (key, revoked_at) VALUES (?, ?)",
+                (key, revoked_at)
+            )
+
+    def get(self, key):
+        row = db.get_connection().execute(
+            "SELECT revoked_at FROM session_revocations WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def since(self, cutoff):
+        return db.get_connection().execute(
+            "SELECT key, revoked_at FROM session_revocations WHERE revoked_at >= ?", (cutoff,)
+        ).fetchall()
+
+    def purge(self, cutoff):
+        with db.transaction() as conn:
+            return conn.execute("DELETE FROM session_revocations WHERE revoked_at < ?", (cutoff,)).rowcount
+
+
+class RedisRevocationStore:
+    """基于 Redis 有序集合的吊销记录存储，分数为吊销时间"""
+
+    KEY = 'chameleon:session:revocations'
+
+    def __init__(self, client):
+        self.client = client
+
+    def add(self, key, revoked_at):
+        self.client.zadd(self.KEY, {key: revoked_at})
+
+    def get(self, key):
+        return self.client.zscore(self.KEY, key)
+
+    def since(self, cutoff):
+        return [(key.decode('utf-8'), score)
+                for key, score in self.client.zrangebyscore(self.KEY, cutoff, '+inf', withscores=True)]
+
+    def purge(self, cutoff):
+        return self.client.zremrangebyscore(self.KEY, '-inf', f"({cutoff}")
+
+
+_store = None
+_store_lock = threading.Lock()
+_token_cache = LRUCache(Config.SESSION_CACHE_SIZE, Config.SESSION_CACHE_TTL)
+# 布隆过滤器命中后向存储确认的结果 (吊销时间，0 表示误报)，有效期为一个同步周期
+_confirm_cache = LRUCache(Config.SESSION_CACHE_SIZE, Config.SESSION_REVOCATION_SYNC_INTERVAL)
+_bloom = None
+_bloom_lock = threading.Lock()
+_synced_at = 0.0
+_checked_at = 0.0
+
+
+def get_store():
+    """
+    获取吊销记录存储 (懒加载)。配置了 Redis 时使用 Redis，否则使用 SQLite。
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                client = get_redis()
+                _store = RedisRevocationStore(client) if client is not None else SQLiteRevocationStore()
+    return _store
+
+
+def rebuild_index():
+    """
+    从存储全量重建布隆过滤器 (启动时、清理过期记录后调用)。
+    :return: 吊销记录数
+    """
+    global _bloom, _synced_at, _checked_at
+    with _bloom_lock:
+        now = time.time()
+        rows = get_store().since(now - Config.SESSION_TOKEN_TTL)
+        capacity = Config.SESSION_BLOOM_CAPACITY
+        while capacity < len(rows) * 2:
+            capacity *= 2
+        bloom = BloomFilter(capacity, Config.SESSION_BLOOM_ERROR_RATE)
+        for key, _ in rows:
+            bloom.add(key)
+        _bloom, _synced_at, _checked_at = bloom, now, now
+        return len(rows)
+
+
+def _sync_index():
+    """按 SESSION_REVOCATION_SYNC_INTERVAL 增量加载其他进程新增的吊销记录"""
+    global _synced_at, _checked_at
+    if _bloom is None:
+        rebuild_index()
+        return
+    now = time.time()
+    if now - _checked_at < Config.SESSION_REVOCATION_SYNC_INTERVAL:
+        return
+    with _bloom_lock:
+        if now - _checked_at < Config.SESSION_REVOCATION_SYNC_INTERVAL:
+            return
+        _checked_at = now
+        # 与上次同步区间重叠一个周期，容忍进程间的时钟偏差；重复加入布隆过滤器无副作用
+        rows = get_store().since(_synced_at - Config.SESSION_REVOCATION_SYNC_INTERVAL)
+        for key, _ in rows:
+            _bloom.add(key)
+        _synced_at = now
+    if _bloom.count > _bloom.capacity:
+        rebuild_index()
+
+
+def _revoked_at(key):
+    """
+    :return: 吊销时间；未吊销时返回 None
+    """
+    if key not in _bloom:
+        return None
+    revoked_at = _confirm_cache.get(key)
+    if revoked_at is None:
+        revoked_at = get_store().get(key) or 0
+        _confirm_cache.set(key, revoked_at)
+    return revoked_at or None
+
+
+def is_revoked(payload):
+    """
+    判断令牌载荷是否已被吊销 (单个令牌吊销，或签发时间不晚于用户吊销时间)。
+    """
+    _sync_index()
+    jti = payload.get('jti')
+    if jti and _revoked_at(f"jti:{jti}") is not None:
+        return True
+    identifier = payload.get('identifier')
+    user_revoked_at = _revoked_at(f"user:{identifier}") if identifier else None
+    return user_revoked_at is not None and payload.get('iat', 0) <= user_revoked_at
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def verify_token(token: str):
+    """
+    校验会话令牌。
+    :return: JWT 载荷字典
+    :raises PermissionError: 如果令牌已过期、无效或已被吊销
+    """
+    digest = token_digest(token)
+    payload = _token_cache.get(digest)
+    if payload is not None and payload.get('exp', 0) <= time.time():
+        _token_cache.delete(digest)
+        raise PermissionError("会话已过期")
+    if payload is None:
+        try:
+            payload = jwt.decode(token, Config.SECRET_KEY, algorithms=['HS256'])
+        except jwt.ExpiredSignatureError:
+            raise PermissionError("会话已过期")
+        except jwt.InvalidTokenError:
+            raise PermissionError("无效的会话令牌")
+        ttl = min(Config.SESSION_CACHE_TTL, payload.get('exp', 0) - time.time())
+        if ttl > 0:
+            _token_cache.set(digest, payload, ttl=ttl)
+    if is_revoked(payload):
+        raise PermissionError("会话已失效，请重新登录")
+    return payload
+
+
+def bearer_token(auth_header):
+    """
+    从 Authorization 请求头中取出 Bearer 令牌。
+    :raises PermissionError: 如果请求头缺失或格式错误
+    """
+    if not auth_header or not auth_header.startswith('Bearer '):
+        raise PermissionError("缺少或无效的 Authorization 头")
+    return auth_header.split(' ')[1]
+
+
+def _revoke(key):
+    revoked_at = time.time()
+    get_store().add(key, revoked_at)
+    _confirm_cache.delete(key)
+    _sync_index()
+    with _bloom_lock:
+        _bloom.add(key)
+    logger.info(f"已吊销会话: {key}")
+
+
+def revoke_token(token: str):
+    """
+    吊销单个会话令牌 (令牌需包含 jti)。已过期的令牌无需吊销。
+    :raises PermissionError: 如果令牌无效
+    :raises ValueError: 如果令牌不包含 jti
+    """
+    try:
+        payload = jwt.decode(token, Config.SECRET_KEY, algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        return
+    except jwt.InvalidTokenError:
+        raise PermissionError("无效的会话令牌")
+    if not payload.get('jti'):
+        raise ValueError("令牌不包含 jti，只能按用户吊销")
+    _revoke(f"jti:{payload['jti']}")
+    _token_cache.delete(token_digest(token))
+
+
+def revoke_user(identifier: str):
+    """
+    吊销用户 (哈希后的标识符) 在此之前签发的全部会话令牌，用户重新登录后获得的新令牌不受影响。
+    """
+    _revoke(f"user:{identifier}")
+
+
+def purge_expired_revocations():
+    """
+    清理超过令牌最长有效期的吊销记录 (对应的令牌均已过期)，并重建布隆过滤器。
+    :return: 清理的记录数
+    """
+    purged = get_store().purge(time.time() - Config.SESSION_TOKEN_TTL)
+    rebuild_index()
+    return purged
@@ -0,0 +1,122 @@
+"""
+异步任务轮询模块，由单个后台线程统一轮询所有未完成的百炼异步任务。
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from http import HTTPStatus
+
+logger = logging.getLogger(__name__)
+
+# 百炼异步任务的终止状态
+TASK_SUCCEEDED = 'SUCCEEDED'
+TASK_FAILED_STATES = ('FAILED', 'CANCELED', 'UNKNOWN')
+
+
+class TaskPoller:
+    """
+    单线程轮询器：调用方提交 task_id 后获得 Future，
+    后台线程按固定间隔依次查询所有未完成任务，任务结束时完成对应的 Future。
+    """
+
+    def __init__(self, fetch, interval=1.0, timeout=300.0):
+        """
+        :param fetch: 查询任务状态的函数，接收 task_id，返回 DashScope 响应对象
+        :param interval: 两轮查询之间的间隔 (秒)
+        :param timeout: 单个任务的最长等待时间 (秒)
+        """
+        self._fetch = fetch
+        self._interval = interval
+        self._timeout = timeout
+        self._tasks = {}  # task_id -> (Future, deadline)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def watch(self, task_id) -> Future:
+        """
+        登记一个待轮询的任务。
+        :param task_id: 百炼异步任务 ID
+        :return: 任务成功时结果为 fetch 返回的响应对象的 Future
+        """
+        future = Future()
+        with self._lock:
+            self._tasks[task_id] = (future, time.monotonic() + self._timeout)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='bailian-task-poller', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return future
+
+    def pending_count(self) -> int:
+        """当前未完成的任务数"""
+        with self._lock:
+            return len(self._tasks)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            with self._lock:
+                snapshot = list(self._tasks.items())
+            for task_id, (future, deadline) in snapshot:
+                try:
+                    finished = self._poll_one(task_id, future, deadline)
+                except Exception:
+                    # 单个任务的意外错误不能终止轮询线程，否则其他任务永远等不到结果；超过期限后按超时结束
+                    logger.exception(f"轮询百炼任务 {task_id} 时出错")
+                    finished = False
+                if finished:
+                    with self._lock:
+                        self._tasks.pop(task_id, None)
+
+    @staticmethod
+    def _complete(future, result=None, exception=None):
+        """
+        完成 Future。调用方可能随时取消 Future (包括检查之后、设置之前)，已完成的 Future 保持不变。
+        """
+        if future.done():
+            return
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _poll_one(self, task_id, future, deadline):
+        """
+        查询单个任务，任务结束时设置 Future。
+        :return: 任务是否已结束 (无需继续轮询)
+        """
+        if future.done():
+            return True
+        if time.monotonic() > deadline:
+            self._complete(future, exception=TimeoutError(f"百炼任务 {task_id} 等待超时"))
+            return True
+        try:
+            rsp = self._fetch(task_id)
+        except Exception as e:
+            # 网络抖动等临时错误，下一轮继续查询
+            logger.warning(f"查询百炼任务 {task_id} 状态失败: {e}")
+            return False
+
+        if rsp.status_code != HTTPStatus.OK:
+            logger.warning(f"查询百炼任务 {task_id} 状态失败: 状态码={rsp.status_code}")
+            return False
+        task_status = getattr(rsp.output, 'task_status', None)
+        if task_status == TASK_SUCCEEDED:
+            self._complete(future, rsp)
+            return True
+        if task_status in TASK_FAILED_STATES:
+            self._complete(future, exception=Exception(
+                f"百炼任务 {task_id} 执行失败: "
+                f"状态={task_status}, "
+                f"错误码={getattr(rsp.output, 'code', 'N/A')}, "
+                f"消息={getattr(rsp.output, 'message', 'N/A')}"
+            ))
+            return True
+        return False
@@ -0,0 +1,16 @@
+"""
+测试配置：将 chameleon-api 目录加入模块搜索路径，在任意目录运行 pytest 均可导入 services 与 utils；
+数据库、上传目录与结果缓存目录指向临时目录，速率限制使用内存存储，测试不影响开发环境的数据。
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_workdir = tempfile.mkdtemp(prefix='chameleon-test-')
+os.environ.setdefault('CHAMELEON_APP_DATABASE', os.path.join(_workdir, 'chameleon.db'))
+os.environ.setdefault('CHAMELEON_APP_UPLOAD_FOLDER', os.path.join(_workdir, 'uploads'))
+os.environ.setdefault('CHAMELEON_APP_RESULT_CACHE_FOLDER', os.path.join(_workdir, 'result_cache'))
+os.environ.setdefault('CHAMELEON_APP_REDIS_URL', 'memory://')
@@ -0,0 +1,74 @@
+"""
+准入控制的自适应并发上限：与负载无关的耗时波动不使上限收缩，上游变慢或超时时上限收缩。
+"""
+
+import random
+
+import pytest
+
+from services import admission
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(admission.time, 'monotonic', fake)
+    return fake
+
+
+def new_limiter():
+    return admission.AdaptiveLimiter('test', initial_limit=8, min_limit=2, max_limit=32, max_queue=32,
+                                     queue_timeout=15)
+
+
+def run_saturated(limiter, clock, latency_of, calls):
+    """
+    模拟满载的闭环调用：并发数始终等于上限，每完成一次调用，时钟按吞吐量 (上限 / 耗时) 前进。
+    :param latency_of: 以当前上限为参数、返回本次调用耗时的函数
+    :return: 每次调用后的并发上限
+    """
+    limits = []
+    for _ in range(calls):
+        latency = latency_of(limiter.limit)
+        clock.now += latency / limiter.limit
+        limiter.in_flight = int(limiter.limit)
+        limiter.release(clock.now - latency)
+        limits.append(limiter.limit)
+    return limits
+
+
+def test_limit_stable_under_load_independent_variance(clock):
+    rng = random.Random(7)
+    limiter = new_limiter()
+    # 耗时服从对数正态分布 (σ=0.5)，与并发数无关：单次调用常有基线 2 倍以上的耗时
+    limits = run_saturated(limiter, clock, lambda limit: 10.0 * rng.lognormvariate(0, 0.5), 5000)
+    assert min(limits) >= 8
+    assert limits[-1] == 32
+
+
+def test_limit_shrinks_when_upstream_slows_down(clock):
+    rng = random.Random(7)
+    limiter = new_limiter()
+    run_saturated(limiter, clock, lambda limit: 10.0 * rng.lognormvariate(0, 0.5), 2000)
+    assert limiter.limit == 32
+    # 上游排队：超过 8 个并发后耗时随并发数线性增长
+    limits = run_saturated(
+        limiter, clock, lambda limit: 10.0 * max(1.0, limit / 8) * rng.lognormvariate(0, 0.5), 300)
+    assert min(limits) < 16
+
+
+def test_timeouts_shrink_limit(clock):
+    limiter = new_limiter()
+    for _ in range(20):
+        clock.now += 1.0
+        limiter.in_flight = int(limiter.limit)
+        limiter.release(clock.now - 0.5, 'timeout')
+    assert limiter.limit == 2
@@ -0,0 +1,130 @@
+"""
+异步服务模式的阻塞操作测试：结果图片分块写入磁盘且文件操作不在事件循环线程执行，
+下载被取消时不留下残缺文件，JWT 校验在线程池中执行。
+"""
+
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import async_app
+from services import async_http_client, async_model_service, session_service
+from services.config import Config
+
+CHUNKS = [b'\x89PNG', b'-chunk-1', b'-chunk-2']
+
+
+class FakeContent:
+    def __init__(self, chunks, hang=None):
+        self.chunks = chunks
+        self.hang = hang
+
+    async def iter_chunked(self, size):
+        for chunk in self.chunks:
+            yield chunk
+        if self.hang is not None:
+            self.hang.set()
+            await asyncio.sleep(3600)
+
+
+class FakeStreamResponse:
+    status = 200
+    headers = {'Content-Type': 'image/png'}
+
+    def __init__(self, content):
+        self.content = content
+
+    async def read(self):
+        return b''.join(self.content.chunks)
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def download(monkeypatch, tmp_path):
+    """结果图片地址返回 CHUNKS；记录执行文件写入的线程"""
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(Config, 'RESULT_CACHE_FOLDER', str(tmp_path / 'result_cache'))
+    os.makedirs(Config.UPLOAD_FOLDER)
+    os.makedirs(Config.RESULT_CACHE_FOLDER)
+    state = SimpleNamespace(content=FakeContent(CHUNKS), write_threads=set())
+
+    async def send(method, url, timeout, kwargs):
+        return FakeStreamResponse(state.content)
+
+    real_run_blocking = async_model_service.run_blocking
+
+    async def run_blocking(func, *args, **kwargs):
+        if getattr(func, '__name__', '') == 'write':
+            def write(*a):
+                state.write_threads.add(threading.get_ident())
+                return func(*a)
+            return await real_run_blocking(write, *args, **kwargs)
+        return await real_run_blocking(func, *args, **kwargs)
+
+    monkeypatch.setattr(async_http_client, '_send', send)
+    monkeypatch.setattr(async_model_service, 'run_blocking', run_blocking)
+    return state
+
+
+def test_url_delivery_streams_to_disk(download, monkeypatch):
+    monkeypatch.setattr(Config, 'RESULT_DELIVERY', 'url')
+
+    async def scenario():
+        return await async_model_service.deliver_result('http://result.invalid/a.png'), threading.get_ident()
+
+    result, loop_thread = asyncio.run(scenario())
+    filename = result['result_url'].rsplit('/', 1)[1]
+    with open(os.path.join(Config.UPLOAD_FOLDER, filename), 'rb') as f:
+        assert f.read() == b''.join(CHUNKS)
+    assert download.write_threads and loop_thread not in download.write_threads
+
+
+def test_download_to_cache_streams_to_disk(download):
+    file_path, mime_type = asyncio.run(async_model_service.download_to_cache('http://result.invalid/a.png'))
+    assert mime_type == 'image/png'
+    with open(file_path, 'rb') as f:
+        assert f.read() == b''.join(CHUNKS)
+    assert os.listdir(Config.RESULT_CACHE_FOLDER) == [os.path.basename(file_path)]
+
+
+def test_cancelled_download_leaves_no_partial_file(download):
+    hang = asyncio.Event()
+    download.content = FakeContent(CHUNKS, hang=hang)
+
+    async def scenario():
+        task = asyncio.create_task(async_model_service.download_to_cache('http://result.invalid/a.png'))
+        await hang.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert os.listdir(Config.RESULT_CACHE_FOLDER) == []
+
+
+def test_session_verified_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def verify_token(token):
+        threads.append(threading.get_ident())
+        if token != 'good':
+            raise PermissionError('无效的令牌')
+        return {'sub': 'user'}
+
+    monkeypatch.setattr(session_service, 'verify_token', verify_token)
+
+    async def scenario():
+        good = SimpleNamespace(headers={'Authorization': 'Bearer good'})
+        bad = SimpleNamespace(headers={'Authorization': 'Bearer bad'})
+        return (await async_app.get_session_data(good), await async_app.optional_session_data(bad),
+                threading.get_ident())
+
+    session_data, missing, loop_thread = asyncio.run(scenario())
+    assert session_data == {'sub': 'user'}
+    assert missing is None
+    assert len(threads) == 2 and loop_thread not in threads
@@ -0,0 +1,99 @@
+"""
+压测工具测试：百分位数与场景汇总、上游特征参数解析、模拟上游的环境变量，
+以及模拟的硅基流动接口对服务实际发出的合规与批量合规请求返回可解析的响应。
+"""
+
+import asyncio
+import json
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from benchmarks import fake_upstreams, load_test
+from services import model_service
+
+
+def test_percentile_interpolates():
+    samples = [4, 1, 3, 2]
+    assert load_test.percentile(samples, 0) == 1
+    assert load_test.percentile(samples, 50) == 2.5
+    assert load_test.percentile(samples, 100) == 4
+    assert load_test.percentile([7], 99) == 7
+    assert load_test.percentile([], 50) is None
+
+
+def test_summarize():
+    result = load_test.summarize([0.1, 0.2, 0.3], {200: 3, 503: 1}, {'超时': 1}, duration=2.0)
+    assert (result['requests'], result['succeeded'], result['failed']) == (5, 3, 2)
+    assert result['throughput_rps'] == 1.5
+    assert result['latency_ms']['p50'] == 200.0 and result['latency_ms']['max'] == 300.0
+    assert result['status_counts'] == {'200': 3, '503': 1}
+
+
+def test_summarize_without_successes():
+    result = load_test.summarize([], {}, {'连接失败': 2}, duration=0)
+    assert result['succeeded'] == 0 and result['throughput_rps'] is None
+    assert set(result['latency_ms'].values()) == {None}
+
+
+def test_parse_profiles():
+    profiles = fake_upstreams.parse_profiles(['siliconflow:latency=50,errors=0.5,status=429', 'github:'])
+    assert set(profiles) == set(fake_upstreams.UPSTREAMS)
+    assert profiles['siliconflow'].to_dict() == {
+        'latency': 50.0, 'jitter': 100.0, 'errors': 0.5, 'status': 429, 'slow': 0.0, 'slow_latency': 0.0,
+    }
+    assert profiles['github'].latency == fake_upstreams.DEFAULT_PROFILES['github']['latency']
+    assert not profiles['dashscope'].should_fail()
+    assert fake_upstreams.Profile(errors=1).should_fail()
+
+
+@pytest.mark.parametrize('spec', ['openai:latency=1', 'siliconflow:delay=1', 'siliconflow:latency=fast'])
+def test_parse_profiles_rejects_invalid(spec):
+    with pytest.raises(ValueError):
+        fake_upstreams.parse_profiles([spec])
+
+
+def test_app_environment():
+    env = fake_upstreams.app_environment('http://127.0.0.1:1', backup_llm=True)
+    assert env['CHAMELEON_APP_SILICON_FLOW_LLM_URL'] == 'http://127.0.0.1:1/siliconflow/v1/chat/completions'
+    [backend] = json.loads(env['CHAMELEON_APP_LLM_BACKENDS'])
+    assert backend['url'] == 'http://127.0.0.1:1/backup/v1/chat/completions'
+    assert 'CHAMELEON_APP_LLM_BACKENDS' not in fake_upstreams.app_environment('http://127.0.0.1:1')
+    assert fake_upstreams.parse_size('640X480') == (640, 480)
+
+
+def packed_payload(monkeypatch, prompts):
+    """截获 call_packed_compliance 发出的请求体"""
+    captured = []
+
+    def post_chat_completion(payload):
+        captured.append(payload)
+        raise ConnectionError('captured')
+
+    monkeypatch.setattr(model_service, 'post_chat_completion', post_chat_completion)
+    with pytest.raises(ConnectionError):
+        model_service.call_packed_compliance(prompts)
+    return captured[0]
+
+
+def test_fake_siliconflow_answers_service_payloads(monkeypatch):
+    profiles = fake_upstreams.parse_profiles(['siliconflow:latency=0,jitter=0'])
+    upstreams = fake_upstreams.FakeUpstreams(profiles, image_size=(8, 8))
+    prompts = ['把天空换成晚霞', '加一只猫']
+    packed_request = packed_payload(monkeypatch, prompts)
+
+    async def complete(client, payload):
+        response = await client.post('/siliconflow/v1/chat/completions', json=payload)
+        assert response.status == 200
+        return (await response.json())['choices'][0]['message']['content']
+
+    async def scenario():
+        async with TestClient(TestServer(upstreams.create_app())) as client:
+            verdict = await complete(client, model_service.compliance_payload(prompts[0]))
+            packed = await complete(client, packed_request)
+            return verdict, packed
+
+    verdict, packed = asyncio.run(scenario())
+    assert verdict.strip() == 'ALLOWED'
+    assert json.loads(packed) == {'verdicts': ['ALLOWED', 'ALLOWED']}
+    assert upstreams.stats['siliconflow'] == {'requests': 2, 'errors': 0}
@@ -0,0 +1,113 @@
+"""
+批量合规检查测试：词表与缓存命中的提示词不请求模型、重复提示词只检查一次、按批大小分组打包，
+打包响应无法解析时回退为单条检查，熔断或过载时结论为空；打包响应的解析与校验。
+"""
+
+import secrets
+import threading
+
+import pytest
+
+from services import admission, http_client, model_service, prefilter, schema
+from services.cache import prompt_key
+from services.config import Config
+
+
+class FakeResponse:
+    status_code = 200
+    text = ''
+
+    def __init__(self, content):
+        self.content = content
+
+    def json(self):
+        return {'choices': [{'message': {'content': self.content}}]}
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """打包检查按文本是否含 bad 返回结论，记录每次打包与单条检查的提示词"""
+    schema.migrate()
+    monkeypatch.setattr(Config, 'COMPLIANCE_BATCH_SIZE', 3)
+    state = {'packed': [], 'single': [], 'packed_error': None}
+    lock = threading.Lock()
+
+    def call_packed_compliance(prompts):
+        with lock:
+            state['packed'].append(list(prompts))
+        if state['packed_error']:
+            raise state['packed_error']
+        return ['DISALLOWED' if 'bad' in p else 'ALLOWED' for p in prompts]
+
+    def single_verdict(prompt):
+        with lock:
+            state['single'].append(prompt)
+        return 'DISALLOWED' if 'bad' in prompt else 'ALLOWED'
+
+    monkeypatch.setattr(prefilter, 'classify', lambda prompt: 'DISALLOWED' if 'blocked' in prompt else None)
+    monkeypatch.setattr(model_service, 'call_packed_compliance', call_packed_compliance)
+    monkeypatch.setattr(model_service, '_single_verdict', single_verdict)
+    return state
+
+
+def unique(text):
+    return f"{text} {secrets.token_hex(4)}"
+
+
+def test_short_circuits_prefilter_cache_and_blank(model):
+    cached = unique('cached')
+    model_service.compliance_cache.set(prompt_key(cached), 'ALLOWED')
+    verdicts = model_service.compliance_check_batch([cached, unique('blocked'), '   '])
+    assert verdicts == ['ALLOWED', 'DISALLOWED', None]
+    assert model['packed'] == [] and model['single'] == []
+
+
+def test_deduplicates_and_chunks(model):
+    prompts = [unique(f'p{i}') for i in range(5)] + [unique('bad')]
+    duplicate = '  ' + prompts[0].upper()
+    verdicts = model_service.compliance_check_batch(prompts + [duplicate])
+    assert verdicts == ['ALLOWED'] * 5 + ['DISALLOWED', 'ALLOWED']
+    assert sorted(len(chunk) for chunk in model['packed']) == [3, 3]
+    assert sorted(p for chunk in model['packed'] for p in chunk) == sorted(prompts)
+    # 打包检查的结论写入缓存
+    assert model_service.compliance_cache.get(prompt_key(prompts[-1])) == 'DISALLOWED'
+    assert model_service.compliance_check_batch(prompts[:1]) == ['ALLOWED']
+    assert len(model['packed']) == 2
+
+
+def test_single_prompt_chunk_uses_single_check(model):
+    prompt = unique('alone')
+    assert model_service.compliance_check_batch([prompt]) == ['ALLOWED']
+    assert model['packed'] == [] and model['single'] == [prompt]
+
+
+def test_falls_back_to_single_checks(model):
+    model['packed_error'] = ValueError('批量合规响应的结论数量不符')
+    prompts = [unique('a'), unique('bad')]
+    assert model_service.compliance_check_batch(prompts) == ['ALLOWED', 'DISALLOWED']
+    assert sorted(model['single']) == sorted(prompts)
+
+
+@pytest.mark.parametrize('error', [
+    http_client.CircuitOpenError('熔断'),
+    admission.OverloadedError('过载', 1),
+])
+def test_unavailable_upstream_yields_no_verdict(model, error):
+    model['packed_error'] = error
+    assert model_service.compliance_check_batch([unique('a'), unique('b')]) == [None, None]
+    assert model['single'] == []
+
+
+@pytest.mark.parametrize('content, expected', [
+    ('{"verdicts": ["allowed", " DISALLOWED "]}', ['ALLOWED', 'DISALLOWED']),
+    ('{"verdicts": ["ALLOWED"]}', ValueError),
+    ('{"verdicts": ["ALLOWED", "MAYBE"]}', ValueError),
+    ('ALLOWED, ALLOWED', ValueError),
+])
+def test_call_packed_compliance_validates_response(monkeypatch, content, expected):
+    monkeypatch.setattr(model_service, 'post_chat_completion', lambda payload: FakeResponse(content))
+    if expected is ValueError:
+        with pytest.raises(ValueError):
+            model_service.call_packed_compliance(['a', 'b'])
+    else:
+        assert model_service.call_packed_compliance(['a', 'b']) == expected
@@ -0,0 +1,137 @@
+"""
+合规结论缓存测试：规范化后相同的提示词共用缓存键，明确的结论缓存后不再调用模型，
+两级缓存的本地/共享层命中、共享层故障降级与预热。
+"""
+
+import secrets
+
+import pytest
+
+from services import cache, model_service, prefilter, schema
+from services.cache import LRUCache, SQLiteCacheTier, TieredCache, prompt_key
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+    def json(self):
+        return {'choices': [{'message': {'content': self.content}}]}
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """合规检查模型依次返回 replies 中的输出，记录调用次数"""
+    schema.migrate()
+    state = {'replies': [], 'calls': 0}
+
+    def post_chat_completion(payload):
+        state['calls'] += 1
+        return FakeResponse(state['replies'].pop(0))
+
+    monkeypatch.setattr(prefilter, 'classify', lambda prompt: None)
+    monkeypatch.setattr(model_service, 'post_chat_completion', post_chat_completion)
+    return state
+
+
+def unique(text):
+    return f"{text} {secrets.token_hex(4)}"
+
+
+def test_prompt_key_normalizes():
+    assert prompt_key('  Make   the SKY red ') == prompt_key('make the sky red')
+    assert prompt_key('ＡＢＣ　１２３') == prompt_key('abc 123')
+    assert prompt_key('make the sky red') != prompt_key('make the sky blue')
+
+
+def test_allowed_verdict_cached_for_equivalent_prompts(model):
+    prompt = unique('把天空换成晚霞')
+    model['replies'] = ['ALLOWED']
+    model_service.compliance_check(prompt)
+    model_service.compliance_check('  ' + prompt.upper() + ' ')
+    assert model['calls'] == 1
+
+
+def test_disallowed_verdict_cached(model):
+    prompt = unique('违规内容')
+    model['replies'] = ['DISALLOWED']
+    for _ in range(2):
+        with pytest.raises(PermissionError):
+            model_service.compliance_check(prompt)
+    assert model['calls'] == 1
+
+
+def test_unclear_output_not_cached(model):
+    prompt = unique('含糊的提示词')
+    model['replies'] = ['I think it is fine', 'ALLOWED']
+    model_service.compliance_check(prompt)
+    model_service.compliance_check(prompt)
+    assert model['calls'] == 2
+    assert model_service.compliance_cache.get(prompt_key(prompt)) == 'ALLOWED'
+
+
+def test_lru_cache_ttl_and_capacity():
+    lru = LRUCache(max_size=2, ttl=60)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.get('a')
+    lru.set('c', 3)
+    # 最久未访问的 b 被淘汰
+    assert (lru.get('a'), lru.get('b'), lru.get('c')) == (1, None, 3)
+    lru.set('d', 4, ttl=-1)
+    assert lru.get('d') is None
+
+
+class BrokenTier:
+    def get(self, key):
+        raise ConnectionError('shared tier down')
+
+    def set(self, key, value, ttl=None):
+        raise ConnectionError('shared tier down')
+
+    def delete(self, key):
+        raise ConnectionError('shared tier down')
+
+
+def test_tiered_cache_shared_hit_fills_local():
+    schema.migrate()
+    shared = SQLiteCacheTier('cache_compliance', ttl=60, max_size=100)
+    key = unique('tiered')
+    shared.set(key, 'ALLOWED')
+    tiered = TieredCache('test-tiered', LRUCache(10, 60), shared)
+    try:
+        assert tiered.get(key) == 'ALLOWED'
+        assert tiered.local.get(key) == 'ALLOWED'
+        assert tiered.get(unique('missing')) is None
+        stats = tiered.stats()
+        assert (stats['shared_hits'], stats['misses']) == (1, 1)
+    finally:
+        cache._tiered_caches.remove(tiered)
+
+
+def test_tiered_cache_degrades_when_shared_tier_fails():
+    tiered = TieredCache('test-broken', LRUCache(10, 60), BrokenTier())
+    try:
+        tiered.set('k', 'ALLOWED')
+        assert tiered.get('k') == 'ALLOWED'
+        assert tiered.get('other') is None
+        assert tiered.stats()['errors'] == 2
+    finally:
+        cache._tiered_caches.remove(tiered)
+
+
+def test_warm_loads_unexpired_entries():
+    schema.migrate()
+    shared = SQLiteCacheTier('cache_compliance', ttl=60, max_size=100)
+    live, expired = unique('live'), unique('expired')
+    shared.set(live, 'ALLOWED')
+    shared.set(expired, 'ALLOWED', ttl=-1)
+    tiered = TieredCache('test-warm', LRUCache(1000, 60), shared)
+    try:
+        assert tiered.warm() >= 1
+        assert tiered.local.get(live) == 'ALLOWED'
+        assert tiered.local.get(expired) is None
+    finally:
+        cache._tiered_caches.remove(tiered)
@@ -0,0 +1,77 @@
+"""
+数据库连接层测试：按线程复用连接、WAL 模式、事务提交与回滚、批量写入。
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from services import db
+from services.config import Config
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'DATABASE', str(tmp_path / 'db.db'))
+    with db.transaction() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    yield
+    db.close_connection()
+
+
+def names():
+    return [row['name'] for row in db.get_connection().execute("SELECT name FROM items ORDER BY id")]
+
+
+def test_connection_reused_per_thread(database):
+    conn = db.get_connection()
+    assert db.get_connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+    other = []
+    thread = threading.Thread(target=lambda: (other.append(db.get_connection()), db.close_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+def test_connection_follows_database_setting(database, tmp_path, monkeypatch):
+    conn = db.get_connection()
+    monkeypatch.setattr(Config, 'DATABASE', str(tmp_path / 'other.db'))
+    assert db.get_connection() is not conn
+
+
+def test_transaction_commits_and_rolls_back(database):
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO items (name) VALUES ('kept')")
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.transaction(immediate=True) as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('discarded')")
+            conn.execute("INSERT INTO items (name) VALUES (NULL)")
+    assert names() == ['kept']
+
+
+def test_immediate_transaction_blocks_other_writers(database, monkeypatch):
+    monkeypatch.setattr(Config, 'DB_BUSY_TIMEOUT_MS', 50)
+    errors = []
+
+    def write():
+        try:
+            with db.transaction(immediate=True) as conn:
+                conn.execute("INSERT INTO items (name) VALUES ('other')")
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+        finally:
+            db.close_connection()
+
+    with db.transaction(immediate=True):
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join()
+    assert len(errors) == 1 and 'locked' in str(errors[0])
+
+
+def test_execute_batch(database):
+    assert db.execute_batch("INSERT INTO items (name) VALUES (?)", [('a',), ('b',), ('c',)]) == 3
+    assert names() == ['a', 'b', 'c']
@@ -0,0 +1,98 @@
+"""
+过期清理测试：按批删除过期记录 (每次运行最多 EXPIRY_MAX_BATCHES 批)、未过期记录保留、
+仍被其他记录引用的文件不删除，以及清理统计。
+"""
+
+import os
+
+import pytest
+
+from services import db, expiry_service, image_service, schema
+from services.config import Config
+
+
+class ImmediatePool:
+    """同步执行提交的任务，便于断言删除结果"""
+
+    def submit(self, func, *args):
+        func(*args)
+
+
+@pytest.fixture
+def expiry(tmp_path, monkeypatch):
+    """独立的数据库与上传目录，每批 2 条、每次运行最多 2 批"""
+    monkeypatch.setattr(Config, 'DATABASE', str(tmp_path / 'expiry.db'))
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(Config, 'EXPIRY_BATCH_SIZE', 2)
+    monkeypatch.setattr(Config, 'EXPIRY_MAX_BATCHES', 2)
+    monkeypatch.setattr(expiry_service, '_file_pool', ImmediatePool())
+    os.makedirs(Config.UPLOAD_FOLDER)
+    schema.migrate()
+    yield
+    db.close_connection()
+
+
+def add_upload(name, created_at='2000-01-01 00:00:00', content_hash=None, path=None):
+    """登记一条上传记录并写入对应文件；created_at 为 None 时使用当前时间"""
+    path = path or os.path.join(Config.UPLOAD_FOLDER, f'{name}.png')
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(name.encode())
+    image_service.record_upload(name, f'{name}.png', path, content_hash)
+    if created_at is not None:
+        with db.transaction() as conn:
+            conn.execute("UPDATE image_uploads SET created_at = ? WHERE phone = ?", (created_at, name))
+    return path
+
+
+def upload_count():
+    return db.get_connection().execute("SELECT COUNT(*) FROM image_uploads").fetchone()[0]
+
+
+def test_expires_in_bounded_batches(expiry):
+    expired = [add_upload(f'old-{i}', f'2000-01-01 00:00:0{i}') for i in range(5)]
+    fresh = add_upload('fresh', created_at=None)
+    before = expiry_service.get_stats()
+
+    # 每次运行最多 2 批 × 2 条，最早的记录先删除
+    assert expiry_service.expire_uploads() == 4
+    assert [os.path.exists(path) for path in expired] == [False] * 4 + [True]
+    assert expiry_service.expire_uploads() == 1
+    assert expiry_service.expire_uploads() == 0
+    assert upload_count() == 1
+    assert not os.path.exists(expired[4]) and os.path.exists(fresh)
+
+    stats = expiry_service.get_stats()
+    assert stats['runs'] - before['runs'] == 3
+    assert stats['rows_deleted'] - before['rows_deleted'] == 5
+    assert stats['files_removed'] - before['files_removed'] == 5
+    assert stats['bytes_reclaimed'] - before['bytes_reclaimed'] == sum(len(f'old-{i}') for i in range(5))
+
+
+def test_shared_content_removed_with_last_reference(expiry):
+    path = add_upload('first', '2000-01-01 00:00:00', content_hash='h1')
+    add_upload('second', created_at=None, content_hash='h1', path=path)
+
+    assert expiry_service.expire_uploads() == 1
+    assert os.path.exists(path)
+    with db.transaction() as conn:
+        conn.execute("UPDATE image_uploads SET created_at = '2000-01-01 00:00:00'")
+    assert expiry_service.expire_uploads() == 1
+    assert not os.path.exists(path)
+    assert db.get_connection().execute("SELECT COUNT(*) FROM upload_contents").fetchone()[0] == 0
+
+
+def test_legacy_path_kept_while_referenced(expiry):
+    # 没有内容哈希的旧记录按路径判断引用
+    path = add_upload('legacy-old')
+    add_upload('legacy-new', created_at=None, path=path)
+    assert expiry_service.expire_uploads() == 1
+    assert os.path.exists(path)
+
+
+def test_missing_file_is_not_an_error(expiry):
+    path = add_upload('gone')
+    os.remove(path)
+    before = expiry_service.get_stats()
+    assert expiry_service.expire_uploads() == 1
+    assert expiry_service.get_stats()['remove_errors'] == before['remove_errors']
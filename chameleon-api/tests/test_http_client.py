@@ -0,0 +1,165 @@
+"""
+出站 HTTP 客户端熔断器测试：关闭 → 打开 → 半开 → 关闭/重新打开的状态转换、5xx 与 4xx 的计数，
+半开试探请求被取消或本地出错时释放试探名额，熔断器不会停留在半开。
+"""
+
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from services import async_http_client, http_client
+from services.config import Config
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """每个测试独立的上游名称；冷却时间为 0，打开后下一个请求即为试探请求"""
+    monkeypatch.setattr(Config, 'HTTP_BREAKER_THRESHOLD', 1)
+    monkeypatch.setattr(Config, 'HTTP_BREAKER_RESET_SECONDS', 0)
+    name = f'test-upstream-{next(_names)}'
+    http_client.get_breaker(name).record_failure()
+    assert http_client.breaker_state(name) == 'half_open'
+    return name
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(http_client, 'time', SimpleNamespace(monotonic=clock.monotonic, perf_counter=clock.monotonic))
+    return clock
+
+
+def test_opens_after_threshold_and_recovers(clock):
+    breaker = http_client.CircuitBreaker('test-transitions', failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(http_client.CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 30
+    assert breaker.state == 'half_open'
+    assert breaker.before_call() is True
+    # 试探请求进行中，其他请求仍被拒绝
+    with pytest.raises(http_client.CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.before_call() is False
+
+
+def test_failed_trial_reopens(clock):
+    breaker = http_client.CircuitBreaker('test-transitions', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.before_call() is True
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    clock.now += 29
+    with pytest.raises(http_client.CircuitOpenError):
+        breaker.before_call()
+    clock.now += 1
+    assert breaker.state == 'half_open'
+
+
+def test_success_resets_failure_count(clock):
+    breaker = http_client.CircuitBreaker('test-transitions', failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+
+
+class StatusSession:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def request(self, method, url, **kwargs):
+        return SimpleNamespace(status_code=self.status_code)
+
+
+def test_5xx_counts_as_failure_but_4xx_does_not(upstream, monkeypatch):
+    breaker = http_client.get_breaker(upstream)
+    breaker.record_success()
+    breaker.reset_timeout = 60
+    monkeypatch.setattr(http_client, 'get_session', lambda url: StatusSession(404))
+    assert http_client.get('http://example.invalid/', upstream=upstream).status_code == 404
+    assert breaker.state == 'closed'
+    monkeypatch.setattr(http_client, 'get_session', lambda url: StatusSession(503))
+    assert http_client.get('http://example.invalid/', upstream=upstream).status_code == 503
+    assert breaker.state == 'open'
+    with pytest.raises(http_client.CircuitOpenError):
+        http_client.get('http://example.invalid/', upstream=upstream)
+
+
+class FailingSession:
+    def __init__(self, exc):
+        self.exc = exc
+
+    def request(self, method, url, **kwargs):
+        raise self.exc
+
+
+def test_local_error_releases_sync_trial(upstream, monkeypatch):
+    monkeypatch.setattr(http_client, 'get_session', lambda url: FailingSession(ValueError('bad payload')))
+    with pytest.raises(ValueError):
+        http_client.get('http://example.invalid/', upstream=upstream)
+    breaker = http_client.get_breaker(upstream)
+    # 未计为失败，且下一个请求可以继续试探
+    assert breaker.state == 'half_open'
+    assert breaker.before_call() is True
+
+
+def test_network_error_reopens_sync_trial(upstream, monkeypatch):
+    monkeypatch.setattr(http_client, 'get_session',
+                        lambda url: FailingSession(requests.exceptions.ConnectionError('refused')))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        http_client.get('http://example.invalid/', upstream=upstream)
+    breaker = http_client.get_breaker(upstream)
+    # 试探失败重新打开 (放大冷却时间以观察打开状态)
+    breaker.reset_timeout = 60
+    assert breaker.state == 'open'
+
+
+def test_cancelled_async_trial_is_released(upstream, monkeypatch):
+    started = asyncio.Event()
+
+    async def hanging_send(method, url, timeout, kwargs):
+        started.set()
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(async_http_client, '_send', hanging_send)
+
+    async def scenario():
+        task = asyncio.create_task(async_http_client.get('http://example.invalid/', upstream=upstream))
+        await started.wait()
+        # 试探请求进行中，其他请求被拒绝
+        with pytest.raises(http_client.CircuitOpenError):
+            http_client.get_breaker(upstream).before_call()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    breaker = http_client.get_breaker(upstream)
+    assert breaker.state == 'half_open'
+    assert breaker.before_call() is True
+    breaker.record_success()
+    assert breaker.state == 'closed'
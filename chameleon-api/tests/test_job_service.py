@@ -0,0 +1,93 @@
+"""
+图片处理任务队列测试：任务状态流转 (排队 → 执行中 → 成功/失败)、错误码映射、排队上限与过期清理。
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import admission, job_service, schema
+from services.config import Config
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    """SQLite 存储、单个工作线程、最多 2 个未完成任务"""
+    schema.migrate()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='test-job-worker')
+    monkeypatch.setattr(job_service, '_store', job_service.SQLiteJobStore())
+    monkeypatch.setattr(job_service, '_executor', executor)
+    monkeypatch.setattr(job_service, '_slots', threading.BoundedSemaphore(2))
+    yield
+    executor.shutdown(wait=True)
+
+
+def wait_finished(job_id):
+    job = job_service.get_job(job_id)
+    deadline = time.monotonic() + 5
+    while job['status'] not in job_service.FINISHED_STATES and time.monotonic() < deadline:
+        job = job_service.wait_for_update(job_id, job['updated_at'], timeout=1)
+    return job
+
+
+def test_job_lifecycle(jobs):
+    started, release = threading.Event(), threading.Event()
+
+    def work(name):
+        started.set()
+        release.wait(5)
+        return {'result_url': f'/uploads/{name}.png'}
+
+    job_id = job_service.submit_job('owner-1', work, 'sunset')
+    assert job_service.get_job(job_id)['owner'] == 'owner-1'
+    assert started.wait(5)
+    assert job_service.get_job(job_id)['status'] == job_service.JOB_RUNNING
+    release.set()
+
+    job = wait_finished(job_id)
+    assert job['status'] == job_service.JOB_SUCCEEDED
+    view = job_service.public_view(job)
+    assert view['job_id'] == job_id and view['result_url'] == '/uploads/sunset.png'
+    assert 'error' not in view
+
+
+@pytest.mark.parametrize('exc, error, error_code', [
+    (PermissionError('提示词包含不允许的内容'), '提示词包含不允许的内容', 403),
+    (ValueError('文件类型或大小无效'), '文件类型或大小无效', 400),
+    (admission.OverloadedError('百炼繁忙', 1), '百炼繁忙', 503),
+    (RuntimeError('内部细节'), '图片处理失败', 500),
+])
+def test_failed_job_maps_error_code(jobs, exc, error, error_code):
+    def work():
+        raise exc
+
+    job = wait_finished(job_service.submit_job('owner-1', work))
+    assert job['status'] == job_service.JOB_FAILED
+    view = job_service.public_view(job)
+    assert (view['error'], view['error_code']) == (error, error_code)
+
+
+def test_pending_limit_rejects_and_recovers(jobs):
+    release = threading.Event()
+    first = job_service.submit_job('owner-1', release.wait, 5)
+    second = job_service.submit_job('owner-1', release.wait, 5)
+    with pytest.raises(job_service.JobQueueFullError):
+        job_service.submit_job('owner-1', release.wait, 5)
+
+    release.set()
+    assert wait_finished(first)['status'] == job_service.JOB_SUCCEEDED
+    assert wait_finished(second)['status'] == job_service.JOB_SUCCEEDED
+    # 任务结束后释放名额，可以继续提交
+    third = job_service.submit_job('owner-1', lambda: None)
+    assert wait_finished(third)['status'] == job_service.JOB_SUCCEEDED
+
+
+def test_purge_expired_jobs(jobs, monkeypatch):
+    job_id = job_service.submit_job('owner-1', lambda: None)
+    wait_finished(job_id)
+    assert job_service.purge_expired_jobs() == 0
+    monkeypatch.setattr(Config, 'JOB_TTL_SECONDS', -1)
+    assert job_service.purge_expired_jobs() >= 1
+    assert job_service.get_job(job_id) is None
@@ -0,0 +1,90 @@
+"""
+大模型输出解析测试：推理块、代码围栏、截断的围栏与夹杂说明文字的 JSON 对象；
+流式字段提取在任意位置切分输出 (含转义序列与 UTF-16 代理对中间) 时结果一致。
+"""
+
+import json
+
+import pytest
+
+from utils.llm_json import JsonFieldStream, parse_json_object
+
+
+@pytest.mark.parametrize('content', [
+    '{"result": "ALLOWED", "en_prompt": "a cat"}',
+    '  \n{"result": "ALLOWED", "en_prompt": "a cat"}\n',
+    '<think>先判断是否合规 {"draft": 1}</think>{"result": "ALLOWED", "en_prompt": "a cat"}',
+    '<THINK>\n推理\n</THINK>\n```json\n{"result": "ALLOWED", "en_prompt": "a cat"}\n```',
+    '结果如下：\n```\n{"result": "ALLOWED", "en_prompt": "a cat"}\n```\n以上。',
+    '```json\n{"result": "ALLOWED", "en_prompt": "a cat"}',
+    '好的，{"result": "ALLOWED", "en_prompt": "a cat"} 希望对你有帮助',
+    '{not json} 然后 {"result": "ALLOWED", "en_prompt": "a cat"}',
+])
+def test_extracts_object(content):
+    assert parse_json_object(content) == {'result': 'ALLOWED', 'en_prompt': 'a cat'}
+
+
+def test_keeps_braces_inside_strings():
+    assert parse_json_object('说明 {"en_prompt": "a {curly} cat"} 结束') == {'en_prompt': 'a {curly} cat'}
+
+
+def test_returns_first_object_when_several():
+    assert parse_json_object('{"a": 1} {"b": 2}') == {'a': 1}
+
+
+def test_skips_top_level_array():
+    assert parse_json_object('[1, 2] {"a": [{"b": 1}]}') == {'a': [{'b': 1}]}
+
+
+@pytest.mark.parametrize('content', [
+    '',
+    'ALLOWED',
+    '<think>{"result": "ALLOWED"}</think>',
+    '["ALLOWED"]',
+    '{"result": "ALLOWED"',
+    None,
+    {'result': 'ALLOWED'},
+])
+def test_rejects_unparseable(content):
+    with pytest.raises(ValueError):
+        parse_json_object(content)
+
+
+STREAM_VALUE = 'a "quoted" cat\\ on\ta\nmat 😀 é \u4e2d'
+STREAM_OUTPUT = ('<think>可能输出 {"en_prompt": "draft"}</think>\n'
+                 + '{"en_prompt": ' + json.dumps(STREAM_VALUE) + ', "note": "ignored"}')
+
+
+def feed_all(chunks):
+    stream = JsonFieldStream('en_prompt')
+    pieces = [stream.feed(chunk) for chunk in chunks]
+    return stream, ''.join(pieces)
+
+
+def test_stream_extracts_field_across_every_split():
+    for i in range(len(STREAM_OUTPUT) + 1):
+        for j in range(i, len(STREAM_OUTPUT) + 1, 7):
+            stream, text = feed_all([STREAM_OUTPUT[:i], STREAM_OUTPUT[i:j], STREAM_OUTPUT[j:]])
+            assert stream.done and text == stream.value == STREAM_VALUE, (i, j)
+
+
+def test_stream_char_by_char_with_surrogate_pair_escape():
+    output = '{"en_prompt": "smile \\ud83d\\ude00 \\u00e9"}'
+    stream, text = feed_all(list(output))
+    assert stream.done and text == 'smile 😀 é'
+
+
+def test_stream_yields_content_before_completion():
+    stream = JsonFieldStream('en_prompt')
+    assert stream.feed('<think>"en_prompt": "x"') == ''
+    assert stream.feed('</think>{"en_prompt": "a ca') == 'a ca'
+    assert not stream.done
+    assert stream.feed('t"}') == 't'
+    assert stream.done
+    assert stream.feed(' trailing') == ''
+
+
+def test_stream_rejects_invalid_escape():
+    stream = JsonFieldStream('en_prompt')
+    with pytest.raises(ValueError):
+        stream.feed('{"en_prompt": "bad \\x escape"}')
@@ -0,0 +1,126 @@
+"""
+指标模块测试：计数器、仪表与累积直方图的 Prometheus 文本输出，标签转义，@timed 与 stage 记录耗时与异常，
+上游调用结果分类，采集函数导出，以及关闭指标时不记录、不包装。
+"""
+
+import pytest
+
+from services import metrics
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    """开启指标，测试中新建的指标在结束后移除"""
+    monkeypatch.setattr(metrics, 'ENABLED', True)
+    existing = list(metrics._metrics)
+    collectors = list(metrics._collectors)
+    yield
+    metrics._metrics[:] = existing
+    metrics._collectors[:] = collectors
+
+
+def lines(name):
+    return [line for line in metrics.render().splitlines() if line.startswith(name)]
+
+
+def test_counter_and_gauge(enabled):
+    counter = metrics.Counter('test_events_total', '事件数', labels=('kind',))
+    counter.inc(kind='a')
+    counter.inc(2, kind='a')
+    counter.inc(kind='say "hi"\n')
+    gauge = metrics.Gauge('test_in_flight', '进行中')
+    with gauge.track_inprogress():
+        gauge.inc()
+        assert lines('test_in_flight') == ['test_in_flight 2']
+    assert lines('test_in_flight') == ['test_in_flight 1']
+    assert lines('test_events_total') == [
+        'test_events_total{kind="a"} 3',
+        'test_events_total{kind="say \\"hi\\"\\n"} 1',
+    ]
+    assert '# TYPE test_events_total counter' in metrics.render()
+
+
+def test_histogram_cumulative_buckets(enabled):
+    histogram = metrics.Histogram('test_seconds', '耗时', labels=('stage',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, stage='s')
+    assert lines('test_seconds') == [
+        'test_seconds_bucket{stage="s",le="0.1"} 1',
+        'test_seconds_bucket{stage="s",le="1"} 3',
+        'test_seconds_bucket{stage="s",le="+Inf"} 4',
+        'test_seconds_sum{stage="s"} 4.05',
+        'test_seconds_count{stage="s"} 4',
+    ]
+
+
+def stage_counts(name):
+    histogram = metrics.STAGE_SECONDS._values.get((name,))
+    return metrics.STAGE_ERRORS._values.get((name,), 0), histogram[2] if histogram else 0
+
+
+def test_timed_records_duration_and_errors(enabled):
+    @metrics.timed('test_stage_timed')
+    def work(fail):
+        if fail:
+            raise RuntimeError('失败')
+        return 'done'
+
+    assert work.__name__ == 'work'
+    assert work(False) == 'done'
+    with pytest.raises(RuntimeError):
+        work(True)
+    with pytest.raises(KeyError):
+        with metrics.stage('test_stage_timed'):
+            raise KeyError('k')
+    assert stage_counts('test_stage_timed') == (2, 3)
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', False)
+
+    def work():
+        return 1
+
+    assert metrics.timed('test_stage_disabled')(work) is work
+    metrics.UPSTREAM_REQUESTS.inc(upstream='test-disabled', outcome='ok')
+    with metrics.stage('test_stage_disabled'):
+        pass
+    assert ('test-disabled', 'ok') not in metrics.UPSTREAM_REQUESTS._values
+    assert stage_counts('test_stage_disabled') == (0, 0)
+
+
+class ReadTimeout(Exception):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+@pytest.mark.parametrize('status_code, exc, outcome', [
+    (200, None, 'ok'),
+    (302, None, 'ok'),
+    (429, None, 'http_4xx'),
+    (503, None, 'http_5xx'),
+    (None, ReadTimeout(), 'timeout'),
+    (None, TimeoutError(), 'timeout'),
+    (None, CircuitOpenError(), 'circuit_open'),
+    (None, ConnectionError(), 'error'),
+])
+def test_upstream_outcome(status_code, exc, outcome):
+    assert metrics.upstream_outcome(status_code, exc) == outcome
+
+
+def test_record_upstream_and_collector(enabled):
+    metrics.record_upstream('test-upstream', 0.2, status_code=503)
+
+    @metrics.register_collector
+    def collect():
+        return [('test_cache_hits', 'gauge', '缓存命中数', [({'cache': 'a'}, 5), ({'cache': 'b'}, 0.5)])]
+
+    output = metrics.render()
+    assert 'chameleon_upstream_requests_total{upstream="test-upstream",outcome="http_5xx"} 1' in output
+    assert 'chameleon_upstream_duration_seconds_count{upstream="test-upstream"} 1' in output
+    assert '# TYPE test_cache_hits gauge' in output
+    assert lines('test_cache_hits') == ['test_cache_hits{cache="a"} 5', 'test_cache_hits{cache="b"} 0.5']
+    assert output.endswith('\n')
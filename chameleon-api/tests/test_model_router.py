@@ -0,0 +1,213 @@
+"""
+模型路由与对冲请求测试：按优先级与 p95 选择后端、对冲预算、耗时样本的记录规则、首选后端变慢时对冲、
+快速失败时转移、对冲中落选的半开试探请求被取消后熔断器仍可恢复。
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+
+from services import admission, async_http_client, async_model_service, http_client, model_router, model_service
+from services.config import Config
+
+
+@pytest.fixture(autouse=True)
+def no_explore(monkeypatch):
+    monkeypatch.setattr(Config, 'ROUTING_EXPLORE_RATE', 0.0)
+
+
+def record(backend, seconds, count=Config.ROUTING_MIN_SAMPLES):
+    for _ in range(count):
+        backend.record(seconds)
+
+
+def new_router():
+    return model_router.Router('llm', [
+        model_router.Backend('cheap', 'cheap-model', 'test-cheap', url='http://cheap.invalid/v1/chat/completions'),
+        model_router.Backend('fast', 'fast-model', 'test-fast', url='http://fast.invalid/v1/chat/completions'),
+    ])
+
+
+def test_p95_unknown_until_enough_samples():
+    tracker = model_router.LatencyTracker(100, 60)
+    for i in range(Config.ROUTING_MIN_SAMPLES - 1):
+        tracker.record(i)
+    assert tracker.p95() is None
+    tracker = model_router.LatencyTracker(100, 60)
+    for i in range(100):
+        tracker.record(i / 100)
+    assert tracker.p95() == pytest.approx(0.95)
+
+
+def test_cold_start_uses_priority_order():
+    router = new_router()
+    assert [backend.name for backend in router.ranked()] == ['cheap', 'fast']
+
+
+def test_prefers_cheaper_backend_within_tolerance():
+    router = new_router()
+    cheap, fast = router.backends
+    record(cheap, 1.1)
+    record(fast, 1.0)
+    assert router.choose() is cheap
+
+
+def test_switches_to_faster_backend_beyond_tolerance():
+    router = new_router()
+    cheap, fast = router.backends
+    record(cheap, 3.0)
+    record(fast, 1.0)
+    assert router.choose() is fast
+    assert router.ranked()[1] is cheap
+
+
+def test_skips_backend_with_open_breaker(monkeypatch):
+    router = new_router()
+    cheap, fast = router.backends
+    monkeypatch.setattr(model_router.http_client, 'breaker_state',
+                        lambda provider: 'open' if provider == 'test-cheap' else 'closed')
+    assert router.ranked() == [fast]
+
+
+def test_hedge_budget_limits_ratio():
+    budget = model_router.HedgeBudget(0.1, burst=10)
+    spent = 0
+    for _ in range(1000):
+        budget.deposit()
+        spent += budget.try_spend()
+    assert spent <= 100
+
+
+def tracked(backend, status_code=None, exc=None):
+    """在 backend.track() 中模拟一次调用，返回新增的耗时样本"""
+    before = len(backend.latency._samples)
+    try:
+        with backend.track() as call:
+            if exc is not None:
+                raise exc
+            call.status_code = status_code
+    except Exception:
+        pass
+    return [seconds for _, seconds in list(backend.latency._samples)[before:]]
+
+
+def test_only_upstream_failures_are_recorded_as_failures():
+    backend = new_router().backends[0]
+    assert tracked(backend, 200)[0] < 1
+    assert tracked(backend, 503) == [Config.HTTP_READ_TIMEOUT]
+    assert tracked(backend, exc=requests.exceptions.ConnectionError()) == [Config.HTTP_READ_TIMEOUT]
+    assert tracked(backend, exc=TimeoutError()) == [Config.HTTP_READ_TIMEOUT]
+    # 客户端错误、未准入、熔断与本地错误不反映后端耗时
+    assert tracked(backend, 400) == []
+    assert tracked(backend, 429) == []
+    assert tracked(backend, exc=admission.OverloadedError('busy', 1)) == []
+    assert tracked(backend, exc=http_client.CircuitOpenError()) == []
+    assert tracked(backend, exc=ValueError()) == []
+
+
+class FakeResponse:
+    def __init__(self, backend, status_code):
+        self.backend = backend
+        self.status_code = status_code
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """两个 LLM 后端，行为 (耗时, 状态码) 由测试设定；对冲预算充足"""
+    router = new_router()
+    monkeypatch.setattr(model_router, 'llm', router)
+    monkeypatch.setattr(model_router, 'hedge_budget', model_router.HedgeBudget(1.0))
+    monkeypatch.setattr(Config, 'HEDGE_ENABLED', True)
+    monkeypatch.setattr(Config, 'HEDGE_DEFAULT_DELAY', 0.05)
+    behaviour = {'cheap': (0.0, 200), 'fast': (0.0, 200)}
+    calls = []
+
+    def call_llm_backend(backend, payload):
+        calls.append(backend.name)
+        seconds, status_code = behaviour[backend.name]
+        time.sleep(seconds)
+        return FakeResponse(backend.name, status_code)
+
+    monkeypatch.setattr(model_service, 'call_llm_backend', call_llm_backend)
+    return behaviour, calls
+
+
+def test_fast_primary_is_not_hedged(llm):
+    behaviour, calls = llm
+    assert model_service.post_chat_completion({}).backend == 'cheap'
+    assert calls == ['cheap']
+
+
+def test_slow_primary_is_hedged(llm):
+    behaviour, calls = llm
+    behaviour['cheap'] = (0.5, 200)
+    started = time.perf_counter()
+    assert model_service.post_chat_completion({}).backend == 'fast'
+    assert time.perf_counter() - started < 0.4
+    assert calls == ['cheap', 'fast']
+
+
+def test_failed_primary_fails_over(llm):
+    behaviour, calls = llm
+    behaviour['cheap'] = (0.0, 503)
+    assert model_service.post_chat_completion({}).backend == 'fast'
+
+
+def test_no_hedge_without_budget(llm, monkeypatch):
+    behaviour, calls = llm
+    behaviour['cheap'] = (0.2, 200)
+    monkeypatch.setattr(model_router, 'hedge_budget', model_router.HedgeBudget(0.0))
+    assert model_service.post_chat_completion({}).backend == 'cheap'
+    assert calls == ['cheap']
+
+
+class FakeAiohttpResponse:
+    status = 200
+    headers = {}
+
+    async def read(self):
+        return b'{}'
+
+    def release(self):
+        pass
+
+
+def test_cancelled_hedge_releases_half_open_breaker(monkeypatch):
+    """首选后端处于半开，其试探请求在对冲中落选被取消后，熔断器仍可再次试探，且不记录耗时样本"""
+    router = new_router()
+    cheap, fast = router.backends
+    monkeypatch.setattr(model_router, 'llm', router)
+    monkeypatch.setattr(model_router, 'hedge_budget', model_router.HedgeBudget(1.0))
+    monkeypatch.setattr(Config, 'HEDGE_ENABLED', True)
+    monkeypatch.setattr(Config, 'HEDGE_DEFAULT_DELAY', 0.05)
+    monkeypatch.setattr(admission, 'ENABLED', False)
+    monkeypatch.setattr(http_client, '_breakers', {})
+    breaker = http_client._breakers[cheap.provider] = http_client.CircuitBreaker(cheap.provider, 1, 0)
+    breaker.record_failure()
+    assert breaker.state == 'half_open'
+
+    async def send(method, url, timeout, kwargs):
+        if url == cheap.url:
+            await asyncio.sleep(3600)
+        return FakeAiohttpResponse()
+
+    monkeypatch.setattr(async_http_client, '_send', send)
+
+    async def scenario():
+        response = await async_model_service._post_chat_completion({})
+        # 让被取消的任务执行完清理
+        await asyncio.sleep(0)
+        return response
+
+    assert asyncio.run(scenario()).status_code == 200
+    assert breaker.state == 'half_open'
+    assert breaker.before_call() is True
+    assert len(cheap.latency._samples) == 0
+    assert len(fast.latency._samples) == 1
@@ -0,0 +1,92 @@
+"""
+本地预过滤测试：Aho-Corasick 自动机与逐词查找结果一致 (含重叠、互为后缀的关键词)，
+违规词优先于白名单，词表文件修改后热更新、加载失败时保留旧词表。
+"""
+
+import os
+import random
+
+import pytest
+
+from services import prefilter
+from services.config import Config
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('ushers', True),
+    ('ahishe', True),
+    ('hxrs', False),
+    ('abce', False),
+    ('xabcdx', True),
+    ('xbcx', False),
+    ('', False),
+])
+def test_keyword_index_matches(text, expected):
+    index = prefilter.KeywordIndex(['he', 'she', 'his', 'hers', 'abcd', 'bcx y'])
+    assert index.search(text) is expected
+
+
+def test_keyword_index_agrees_with_naive_search():
+    rng = random.Random(7)
+    alphabet = 'abc违禁'
+    for _ in range(200):
+        keywords = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 6))]
+        index = prefilter.KeywordIndex(keywords)
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+        assert index.search(text) == any(keyword in text for keyword in keywords), (keywords, text)
+
+
+def test_empty_index_matches_nothing():
+    assert prefilter.KeywordIndex([]).search('anything') is False
+
+
+@pytest.fixture
+def lists(tmp_path, monkeypatch):
+    blocklist = tmp_path / 'blocklist.txt'
+    allowlist = tmp_path / 'allowlist.txt'
+    blocklist.write_text('# 注释行\n违禁品\nWeapon\n', encoding='utf-8')
+    allowlist.write_text('把天空换成晚霞\n', encoding='utf-8')
+    monkeypatch.setattr(Config, 'PREFILTER_ENABLED', True)
+    monkeypatch.setattr(prefilter, '_blocklist', prefilter._ListFile(str(blocklist), prefilter.KeywordIndex))
+    monkeypatch.setattr(prefilter, '_allowlist', prefilter._ListFile(
+        str(allowlist), lambda lines: {prefilter.prompt_key(line) for line in lines}))
+    prefilter.reload(force=True)
+    return blocklist, allowlist
+
+
+def rewrite(path, content, mtime):
+    path.write_text(content, encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+
+
+def test_classify_uses_both_lists(lists):
+    assert prefilter.classify('把背景换成违禁品') == 'DISALLOWED'
+    # 规范化后匹配：全角、大小写与空格拆分
+    assert prefilter.classify('ADD A ＷＥＡＰＯＮ') == 'DISALLOWED'
+    assert prefilter.classify('add a wea pon') == 'DISALLOWED'
+    assert prefilter.classify('  把天空换成晚霞 ') == 'ALLOWED'
+    assert prefilter.classify('把天空换成蓝色') is None
+
+
+def test_blocklist_wins_over_allowlist(lists):
+    blocklist, allowlist = lists
+    rewrite(allowlist, '把背景换成违禁品\n', 2000)
+    prefilter.reload(force=True)
+    assert prefilter.classify('把背景换成违禁品') == 'DISALLOWED'
+
+
+def test_hot_reload_and_failed_reload(lists):
+    blocklist, _ = lists
+    assert prefilter.classify('加一把刀') is None
+    rewrite(blocklist, '刀\n', 1000)
+    # 未到检查间隔 (PREFILTER_RELOAD_INTERVAL) 时不重新加载
+    assert prefilter.classify('加一把刀') is None
+    prefilter.reload(force=True)
+    assert prefilter.classify('加一把刀') == 'DISALLOWED'
+    assert prefilter.classify('把背景换成违禁品') is None
+
+    # 无法解码的文件加载失败，保留旧词表
+    blocklist.write_bytes(b'\xff\xfe\xfa')
+    os.utime(blocklist, (3000, 3000))
+    prefilter.reload(force=True)
+    assert prefilter.classify('加一把刀') == 'DISALLOWED'
@@ -0,0 +1,81 @@
+"""
+上传图片预处理测试：按档位缩小、按 EXIF 方向旋转并去除元数据、透明图保持 PNG、拒绝非 PNG/JPEG 内容；
+进程池中子进程崩溃后自动重建。
+"""
+
+import os
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from services import image_service
+from services.config import Config
+from utils.process_pool import ProcessPool
+
+
+def encode(image, image_format, **params):
+    output = BytesIO()
+    image.save(output, format=image_format, **params)
+    return output.getvalue()
+
+
+def decode(data):
+    image = Image.open(BytesIO(data))
+    image.load()
+    return image
+
+
+def test_downscales_to_max_side():
+    data, extension = image_service.preprocess_image(encode(Image.new('RGB', (3000, 1500)), 'JPEG'), 1000, 85)
+    assert extension == 'jpg'
+    assert decode(data).size == (1000, 500)
+
+
+def test_keeps_small_image_size():
+    data, _ = image_service.preprocess_image(encode(Image.new('RGB', (300, 200)), 'PNG'), 1000, 85)
+    assert decode(data).size == (300, 200)
+
+
+def test_applies_orientation_and_strips_exif():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # 顺时针旋转 90° 显示
+    exif[0x010F] = 'camera'
+    source = encode(Image.new('RGB', (40, 20)), 'JPEG', exif=exif.tobytes())
+    image = decode(image_service.preprocess_image(source, 1000, 85)[0])
+    assert image.size == (20, 40)
+    assert not image.getexif()
+
+
+def test_transparent_image_stays_png():
+    data, extension = image_service.preprocess_image(encode(Image.new('RGBA', (10, 10), (0, 0, 0, 0)), 'PNG'), 1000, 85)
+    assert extension == 'png'
+    assert decode(data).mode == 'RGBA'
+
+
+@pytest.mark.parametrize('data', [
+    b'not an image',
+    encode(Image.new('RGB', (10, 10)), 'GIF'),
+    encode(Image.new('RGB', (10, 10)), 'PNG')[:40],
+])
+def test_rejects_unsupported_content(data):
+    with pytest.raises(ValueError):
+        image_service.preprocess_image(data, 1000, 85)
+
+
+def test_unknown_quality_profile(monkeypatch):
+    monkeypatch.setattr(Config, 'IMAGE_QUALITY_PROFILE', 'ultra')
+    with pytest.raises(ValueError):
+        image_service.run_preprocess(b'')
+
+
+def test_process_pool_recovers_from_crashed_worker():
+    pool = ProcessPool('测试', 1)
+    try:
+        assert pool.run(pow, 2, 10, timeout=60) == 1024
+        with pytest.raises(BrokenProcessPool):
+            pool.run(os._exit, 1, timeout=60)
+        assert pool.run(pow, 3, 3, timeout=60) == 27
+    finally:
+        pool.shutdown()
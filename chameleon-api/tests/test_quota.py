@@ -0,0 +1,99 @@
+"""
+配额服务测试：令牌桶与每日预算的检查与扣减。进程内存储与 Redis Lua 脚本运行相同的场景，
+Redis 场景仅在设置 CHAMELEON_TEST_REDIS_URL 时运行 (会写入该 Redis 的 chameleon:quota:* 键)。
+"""
+
+import os
+import secrets
+
+import pytest
+
+from services import quota_service
+from services.config import Config
+
+NO_REFILL = 1e-9  # 测试期间令牌桶不补充，结果与时钟无关
+
+
+def memory_store():
+    return quota_service.MemoryQuotaStore()
+
+
+def redis_store():
+    url = os.environ.get('CHAMELEON_TEST_REDIS_URL')
+    if not url:
+        pytest.skip('未设置 CHAMELEON_TEST_REDIS_URL')
+    import redis
+    return quota_service.RedisQuotaStore(redis.Redis.from_url(url))
+
+
+@pytest.fixture(params=[memory_store, redis_store], ids=['memory', 'redis'])
+def store(request):
+    return request.param()
+
+
+def test_bucket_allows_burst_then_rejects(store):
+    key = secrets.token_hex(8)
+    assert store.charge(key, 10, NO_REFILL, 4, 0)[:3] == (True, 0, '')
+    allowed, _, _, tokens, remaining = store.charge(key, 10, NO_REFILL, 4, 0)
+    assert allowed and tokens == pytest.approx(2) and remaining == -1
+    allowed, retry_after, scope, tokens, _ = store.charge(key, 10, NO_REFILL, 4, 0)
+    assert not allowed and scope == 'rate'
+    assert retry_after == pytest.approx(2 / NO_REFILL, rel=1e-3)
+    # 被拒绝的请求不扣减令牌
+    assert store.charge(key, 10, NO_REFILL, 2, 0)[0]
+
+
+def test_daily_budget(store):
+    key = secrets.token_hex(8)
+    assert store.charge(key, 100, NO_REFILL, 4, 10)[4] == pytest.approx(6)
+    assert store.charge(key, 100, NO_REFILL, 4, 10)[4] == pytest.approx(2)
+    allowed, retry_after, scope, _, remaining = store.charge(key, 100, NO_REFILL, 4, 10)
+    assert not allowed and scope == 'daily' and remaining == pytest.approx(2)
+    assert 0 < retry_after <= quota_service.DAY_SECONDS
+    assert store.charge(key, 100, NO_REFILL, 2, 10)[0]
+
+
+def test_keys_are_independent(store):
+    first, second = secrets.token_hex(8), secrets.token_hex(8)
+    assert store.charge(first, 5, NO_REFILL, 5, 0)[0]
+    assert not store.charge(first, 5, NO_REFILL, 1, 0)[0]
+    assert store.charge(second, 5, NO_REFILL, 5, 0)[0]
+
+
+def test_memory_bucket_refills_over_time(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(quota_service.time, 'time', lambda: now[0])
+    store = quota_service.MemoryQuotaStore()
+    assert store.charge('user:a', 10, 2, 10, 0)[0]
+    assert not store.charge('user:a', 10, 2, 4, 0)[0]
+    now[0] += 2
+    allowed, _, _, tokens, _ = store.charge('user:a', 10, 2, 4, 0)
+    assert allowed and tokens == pytest.approx(0)
+
+
+def test_operation_cost_is_weighted_and_capped():
+    assert quota_service.operation_cost('process', 2) == min(
+        Config.QUOTA_COSTS['process'] * 2, Config.QUOTA_BUCKET_CAPACITY)
+    assert quota_service.operation_cost('process', 1000) == Config.QUOTA_BUCKET_CAPACITY
+
+
+def test_charge_raises_with_scope(monkeypatch):
+    monkeypatch.setattr(quota_service, 'ENABLED', True)
+    monkeypatch.setattr(quota_service, '_store', quota_service.MemoryQuotaStore())
+    monkeypatch.setattr(Config, 'QUOTA_REFILL_RATE', NO_REFILL)
+    key = f"user:{secrets.token_hex(8)}"
+    with pytest.raises(quota_service.QuotaExceededError) as excinfo:
+        for _ in range(1000):
+            quota_service.charge(key, 'process')
+    assert excinfo.value.scope in ('rate', 'daily') and excinfo.value.retry_after >= 1
+
+
+def test_charge_falls_back_to_memory_store_when_redis_fails(monkeypatch):
+    class BrokenStore:
+        def charge(self, *args):
+            raise ConnectionError('redis down')
+
+    monkeypatch.setattr(quota_service, 'ENABLED', True)
+    monkeypatch.setattr(quota_service, '_store', BrokenStore())
+    tokens, _ = quota_service.charge(f"user:{secrets.token_hex(8)}", 'translate')
+    assert tokens == pytest.approx(Config.QUOTA_BUCKET_CAPACITY - quota_service.operation_cost('translate'))
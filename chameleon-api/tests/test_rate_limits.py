@@ -0,0 +1,48 @@
+"""
+未启用配额时，单张与批量图片处理共用速率限制，批量请求按条目数计数 (Flask 与异步服务模式)。
+"""
+
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import app as flask_app
+import async_app
+from services import quota_service
+
+
+@pytest.fixture(autouse=True)
+def quota_disabled(monkeypatch):
+    monkeypatch.setattr(quota_service, 'ENABLED', False)
+
+
+def test_flask_batch_items_count_against_process_limit():
+    flask_app.limiter.reset()
+    client = flask_app.app.test_client()
+    # 未登录的请求同样计数 (限流在会话校验之前)，8 个条目 + 2 次单张处理用完每分钟 10 次
+    assert client.post('/api/process/batch', data={'prompts': ['x'] * 8}).status_code != 429
+    assert client.post('/api/process').status_code != 429
+    assert client.post('/api/process').status_code != 429
+    assert client.post('/api/process').status_code == 429
+    assert client.post('/api/process/batch', data={'prompts': ['x']}).status_code == 429
+
+
+def test_async_batch_items_count_against_process_limit():
+    async def run():
+        async_app._rate_limiter.storage.reset()
+        app = async_app.web.Application(middlewares=[async_app.rate_limit_middleware])
+        app.add_routes(async_app.routes)
+        async with TestClient(TestServer(app)) as client:
+            form = aiohttp.FormData()
+            for _ in range(8):
+                form.add_field('prompts', 'x')
+            statuses = [(await client.post('/api/process/batch', data=form)).status]
+            for _ in range(3):
+                statuses.append((await client.post('/api/process', data={'prompt': 'x'})).status)
+        return statuses
+
+    statuses = asyncio.run(run())
+    assert 429 not in statuses[:3]
+    assert statuses[3] == 429
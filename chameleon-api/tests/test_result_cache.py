@@ -0,0 +1,103 @@
+"""
+图片编辑结果缓存：'base64' 模式下结果只在写入缓存时编码一次，命中不解码图片；
+命中的文件被淘汰时按未命中处理，合并请求的执行者调用模型前再查询一次缓存。
+"""
+
+import base64
+import os
+import secrets
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from services import model_router, model_service, result_cache, schema
+from services.config import Config
+
+
+def image_bytes(image_format):
+    output = BytesIO()
+    Image.new('RGB', (8, 8), tuple(secrets.token_bytes(3))).save(output, format=image_format)
+    return output.getvalue()
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """模拟图片编辑模型：每次调用生成一张 JPEG 结果，记录调用次数"""
+    schema.migrate()
+    monkeypatch.setattr(Config, 'RESULT_DELIVERY', 'base64')
+    monkeypatch.setattr(model_service, 'compliance_check', lambda prompt: None)
+    calls = []
+
+    def synthesize_image(file_path, prompt_text, backend=None):
+        calls.append(backend.model)
+        return f"https://example.invalid/{len(calls)}.jpg"
+
+    def download_to_cache(image_url):
+        file_path = result_cache.new_file_path('.jpg')
+        with open(file_path, 'wb') as f:
+            f.write(image_bytes('JPEG'))
+        return file_path, 'image/jpeg'
+
+    monkeypatch.setattr(model_service, 'synthesize_image', synthesize_image)
+    monkeypatch.setattr(model_service, 'download_to_cache', download_to_cache)
+    return calls
+
+
+def test_result_encoded_once_and_hit_skips_decoding(model, monkeypatch):
+    content_hash = secrets.token_hex(32)
+    first = model_service.call_bailian('unused.png', 'add a hat', content_hash)
+    key = result_cache.make_key(content_hash, Config.BAILIAN_MODEL_ID, 'add a hat')
+    file_path, mime_type = result_cache.lookup(key)
+    assert mime_type == 'image/png'
+    with open(file_path, 'rb') as f:
+        assert base64.b64decode(first['result']) == f.read()
+
+    def no_decode(*args, **kwargs):
+        raise AssertionError("命中时不应解码图片")
+
+    monkeypatch.setattr(model_service.Image, 'open', no_decode)
+    assert model_service.call_bailian('unused.png', 'add a hat', content_hash) == first
+    assert len(model) == 1
+
+
+def test_evicted_file_on_hit_is_regenerated(model, monkeypatch):
+    content_hash = secrets.token_hex(32)
+    model_service.call_bailian('unused.png', 'add a scarf', content_hash)
+    lookup = result_cache.lookup
+
+    def lookup_then_evict(key, record=True):
+        cached = lookup(key, record)
+        if cached is not None and record:
+            # 模拟查询之后、读取之前文件被淘汰
+            os.remove(cached[0])
+        return cached
+
+    monkeypatch.setattr(result_cache, 'lookup', lookup_then_evict)
+    result = model_service.call_bailian('unused.png', 'add a scarf', content_hash)
+    assert base64.b64decode(result['result']).startswith(b'\x89PNG')
+    assert len(model) == 2
+
+
+def test_leader_rechecks_cache_before_calling_model(model):
+    content_hash = secrets.token_hex(32)
+    model_service.call_bailian('unused.png', 'add a cape', content_hash)
+    key = result_cache.make_key(content_hash, Config.BAILIAN_MODEL_ID, 'add a cape')
+    # 请求查询未命中后、成为执行者前，结果已由其他请求写入
+    assert model_service.generate_and_cache(key, 'unused.png', 'add a cape') == result_cache.lookup(key)
+    assert len(model) == 1
+
+
+def test_results_keyed_by_routed_model(model, monkeypatch):
+    primary = model_router.image.backends[0]
+    other = model_router.Backend('other-edit', 'other-edit-model', 'bailian')
+    content_hash = secrets.token_hex(32)
+    monkeypatch.setattr(model_router.image, 'choose', lambda: other)
+    model_service.call_bailian('unused.png', 'add a crown', content_hash)
+
+    assert model == ['other-edit-model']
+    assert result_cache.lookup(result_cache.make_key(content_hash, 'other-edit-model', 'add a crown')) is not None
+    # 路由回主模型时不使用其他模型生成的结果
+    monkeypatch.setattr(model_router.image, 'choose', lambda: primary)
+    model_service.call_bailian('unused.png', 'add a crown', content_hash)
+    assert model == ['other-edit-model', primary.model]
@@ -0,0 +1,94 @@
+"""
+结果图片交付测试：'url' 模式分块写入上传目录且不读取完整响应体，'passthrough' 保持原始编码，
+'base64' 重新编码为 PNG，MIME 类型按响应头或 URL 后缀判断。
+"""
+
+import base64
+import os
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from services import http_client, model_service
+from services.config import Config
+
+
+def jpeg_bytes():
+    output = BytesIO()
+    Image.new('RGB', (16, 16), (200, 30, 30)).save(output, format='JPEG')
+    return output.getvalue()
+
+
+class FakeStreamResponse:
+    """只允许分块读取的响应；访问 content 表示整张图片被读入内存"""
+
+    def __init__(self, data, status_code=200, content_type='image/jpeg'):
+        self.data = data
+        self.status_code = status_code
+        self.headers = {'Content-Type': content_type} if content_type else {}
+        self.buffered = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i:i + chunk_size]
+
+    @property
+    def content(self):
+        self.buffered = True
+        return self.data
+
+
+@pytest.fixture
+def result(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(Config, 'RESULT_CHUNK_SIZE', 64)
+    response = FakeStreamResponse(jpeg_bytes())
+    monkeypatch.setattr(http_client, 'get', lambda url, **kwargs: response)
+    return response
+
+
+def test_url_mode_streams_to_upload_folder(result, monkeypatch):
+    monkeypatch.setattr(Config, 'RESULT_DELIVERY', 'url')
+    delivered = model_service.deliver_result('http://result.invalid/out')
+    filename = delivered['result_url'].rsplit('/', 1)[1]
+    assert filename.endswith('.jpg')
+    with open(os.path.join(Config.UPLOAD_FOLDER, filename), 'rb') as f:
+        assert f.read() == result.data
+    assert not result.buffered
+
+
+def test_passthrough_keeps_original_encoding(result, monkeypatch):
+    monkeypatch.setattr(Config, 'RESULT_DELIVERY', 'passthrough')
+    delivered = model_service.deliver_result('http://result.invalid/out')
+    assert base64.b64decode(delivered['result']) == result.data
+    assert delivered['mime_type'] == 'image/jpeg'
+
+
+def test_base64_reencodes_as_png(result, monkeypatch):
+    monkeypatch.setattr(Config, 'RESULT_DELIVERY', 'base64')
+    delivered = model_service.deliver_result('http://result.invalid/out')
+    with Image.open(BytesIO(base64.b64decode(delivered['result']))) as image:
+        assert image.format == 'PNG' and image.size == (16, 16)
+
+
+def test_failed_download_raises(result, monkeypatch):
+    result.status_code = 404
+    with pytest.raises(Exception, match='404'):
+        model_service.deliver_result('http://result.invalid/out')
+
+
+@pytest.mark.parametrize('content_type, url, expected', [
+    ('image/webp; charset=binary', 'http://result.invalid/a.png', 'image/webp'),
+    ('application/octet-stream', 'http://result.invalid/a.jpg?sig=1', 'image/jpeg'),
+    (None, 'http://result.invalid/noext', 'image/png'),
+])
+def test_result_mime_type(content_type, url, expected):
+    response = FakeStreamResponse(b'', content_type=content_type)
+    assert model_service.result_mime_type(response, url) == expected
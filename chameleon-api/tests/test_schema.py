@@ -0,0 +1,62 @@
+"""
+数据库迁移测试：多个进程同时迁移新数据库、迁移失败时整体回滚 (含版本号)。
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from services import db, schema
+from services.config import Config
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    path = str(tmp_path / 'migrate.db')
+    monkeypatch.setattr(Config, 'DATABASE', path)
+    yield path
+    db.close_connection()
+
+
+def tables():
+    rows = db.get_connection().execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    return {row['name'] for row in rows}
+
+
+def test_concurrent_processes_migrate_once(database):
+    env = dict(os.environ, CHAMELEON_APP_DATABASE=database)
+    script = "from services import schema; print(schema.migrate())"
+    processes = [subprocess.Popen([sys.executable, '-c', script], cwd=API_DIR, env=env,
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                 for _ in range(4)]
+    results = [process.communicate(timeout=60) for process in processes]
+    latest = schema.MIGRATIONS[-1][0]
+    for process, (stdout, stderr) in zip(processes, results):
+        assert process.returncode == 0, stderr
+        assert stdout.strip() == str(latest)
+    assert schema.migrate() == latest
+    assert {'upload_contents', 'result_cache', 'session_revocations'} <= tables()
+
+
+def test_failed_migration_rolls_back_with_version(database, monkeypatch):
+    latest = schema.migrate()
+    monkeypatch.setattr(schema, 'MIGRATIONS', schema.MIGRATIONS + [
+        (latest + 1, ["CREATE TABLE migrate_probe (id INTEGER)", "INSERT INTO missing_table VALUES (1)"]),
+    ])
+    with pytest.raises(sqlite3.OperationalError):
+        schema.migrate()
+    assert db.get_connection().execute("PRAGMA user_version").fetchone()[0] == latest
+    assert 'migrate_probe' not in tables()
+
+
+def test_statements_split_on_complete_statements():
+    script = "-- 注释\nCREATE TABLE a (x TEXT DEFAULT ';');\nCREATE INDEX i ON a (x);\n"
+    assert schema._statements(script) == [
+        "-- 注释\nCREATE TABLE a (x TEXT DEFAULT ';');",
+        "CREATE INDEX i ON a (x);",
+    ]
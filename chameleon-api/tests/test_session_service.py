@@ -0,0 +1,87 @@
+"""
+会话令牌校验缓存与吊销索引：布隆过滤器没有漏报，缓存的令牌被吊销后立即失效。
+"""
+
+import secrets
+import time
+
+import jwt
+import pytest
+
+from services import auth_service, schema, session_service
+from services.config import Config
+
+
+@pytest.fixture(autouse=True)
+def store():
+    schema.migrate()
+    session_service.rebuild_index()
+    return session_service.get_store()
+
+
+def make_token(identifier=None, iat=None, exp=None, jti=True):
+    now = time.time()
+    payload = {
+        'identifier': identifier or secrets.token_hex(8),
+        'github_login': 'octocat',
+        'iat': int(now if iat is None else iat),
+        'exp': int(now + 3600 if exp is None else exp),
+    }
+    if jti:
+        payload['jti'] = secrets.token_hex(16)
+    return jwt.encode(payload, Config.SECRET_KEY, algorithm='HS256')
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = session_service.BloomFilter(1000, 0.01)
+    keys = [f"jti:{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other:{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.03
+
+
+def test_issued_token_verifies_and_is_cached():
+    token, _ = auth_service.issue_session_token({'id': 42, 'login': 'octocat'})
+    payload = session_service.verify_token(token)
+    assert payload['github_login'] == 'octocat'
+    assert session_service._token_cache.get(session_service.token_digest(token)) == payload
+
+
+def test_rejects_invalid_and_expired_tokens():
+    with pytest.raises(PermissionError, match='无效'):
+        session_service.verify_token('not-a-token')
+    with pytest.raises(PermissionError, match='过期'):
+        session_service.verify_token(make_token(iat=time.time() - 7200, exp=time.time() - 3600))
+
+
+def test_revoked_token_rejected_even_when_cached():
+    token = make_token()
+    session_service.verify_token(token)
+    session_service.revoke_token(token)
+    with pytest.raises(PermissionError, match='失效'):
+        session_service.verify_token(token)
+
+
+def test_revoke_user_rejects_only_earlier_tokens():
+    identifier = secrets.token_hex(8)
+    earlier = make_token(identifier, iat=time.time() - 60)
+    session_service.verify_token(earlier)
+    session_service.revoke_user(identifier)
+    with pytest.raises(PermissionError):
+        session_service.verify_token(earlier)
+    # 吊销之后重新登录获得的令牌不受影响 (iat 以秒为单位，等到下一秒再签发)
+    time.sleep(1.1)
+    later = make_token(identifier)
+    assert session_service.verify_token(later)['identifier'] == identifier
+
+
+def test_revocation_by_other_process_picked_up_after_sync(store, monkeypatch):
+    token = make_token()
+    session_service.verify_token(token)
+    # 其他进程写入的吊销记录在下一个同步周期加载到布隆过滤器
+    store.add(f"jti:{jwt.decode(token, Config.SECRET_KEY, algorithms=['HS256'])['jti']}", time.time())
+    monkeypatch.setattr(session_service, '_checked_at', 0.0)
+    with pytest.raises(PermissionError):
+        session_service.verify_token(token)
@@ -0,0 +1,104 @@
+"""
+utils/sm2_fast 测试：与 gmssl 加密结果互通、拒绝无效密文、wNAF 表示可还原标量。
+"""
+
+import random
+import secrets
+
+import pytest
+from gmssl import sm2
+
+from utils import sm2_fast
+
+
+def new_keypair():
+    while True:
+        private_key = f"{secrets.randbelow(sm2_fast.N - 2) + 1:064x}"
+        public_key = sm2_fast.FastSM2(private_key).public_key()
+        # gmssl 将以 04 开头的公钥视为带有未压缩点前缀，加密时出错，跳过这类密钥
+        if not public_key.startswith('04'):
+            return private_key, public_key
+
+
+@pytest.fixture(scope='module')
+def keypair():
+    return new_keypair()
+
+
+def gmssl_encrypt(public_key, message):
+    return sm2.CryptSM2(public_key=public_key, private_key=None, mode=1).encrypt(message)
+
+
+def test_public_key_matches_gmssl():
+    private_key, public_key = new_keypair()
+    gmssl = sm2.CryptSM2(public_key=public_key, private_key=private_key, mode=1)
+    # gmssl 以私钥解密自身加密的密文，公钥错误时校验失败
+    assert gmssl.decrypt(gmssl.encrypt(b'check')) == b'check'
+
+
+@pytest.mark.parametrize('length', [1, 2, 31, 32, 33, 64, 100, 1000])
+def test_decrypts_gmssl_ciphertext(length):
+    for _ in range(3):
+        private_key, public_key = new_keypair()
+        message = secrets.token_bytes(length)
+        assert sm2_fast.FastSM2(private_key).decrypt(gmssl_encrypt(public_key, message)) == message
+
+
+def test_decrypts_utf8_prompt(keypair):
+    private_key, public_key = keypair
+    message = '把天空换成晚霞'.encode('utf-8')
+    assert sm2_fast.FastSM2(private_key).decrypt(gmssl_encrypt(public_key, message)) == message
+
+
+def test_rejects_off_curve_c1(keypair):
+    private_key, public_key = keypair
+    ciphertext = bytearray(gmssl_encrypt(public_key, b'hello'))
+    ciphertext[63] ^= 1  # 修改 y 坐标，点不再满足曲线方程
+    with pytest.raises(ValueError, match='C1'):
+        sm2_fast.FastSM2(private_key).decrypt(bytes(ciphertext))
+
+
+def test_rejects_tampered_c3(keypair):
+    private_key, public_key = keypair
+    ciphertext = bytearray(gmssl_encrypt(public_key, b'hello'))
+    ciphertext[64] ^= 1
+    with pytest.raises(ValueError, match='完整性'):
+        sm2_fast.FastSM2(private_key).decrypt(bytes(ciphertext))
+
+
+def test_rejects_tampered_c2(keypair):
+    private_key, public_key = keypair
+    ciphertext = bytearray(gmssl_encrypt(public_key, b'hello'))
+    ciphertext[-1] ^= 1
+    with pytest.raises(ValueError):
+        sm2_fast.FastSM2(private_key).decrypt(bytes(ciphertext))
+
+
+def test_rejects_short_ciphertext(keypair):
+    private_key, _ = keypair
+    with pytest.raises(ValueError):
+        sm2_fast.FastSM2(private_key).decrypt(b'\x00' * 96)
+
+
+def test_wnaf_reconstructs_scalar():
+    rng = random.Random(20241017)
+    scalars = [1, 2, 3, 7, 8, 15, 16, sm2_fast.N - 1] + [rng.randrange(1, sm2_fast.N) for _ in range(200)]
+    for k in scalars:
+        digits = sm2_fast.wnaf(k)
+        assert sum(digit << i for i, digit in enumerate(digits)) == k
+        nonzero = [i for i, digit in enumerate(digits) if digit]
+        # 非零位为奇数且绝对值小于 2^(w-1)，相邻非零位之间至少间隔 w-1 个零
+        assert all(digits[i] % 2 == 1 and abs(digits[i]) < 1 << (sm2_fast.WINDOW - 1) for i in nonzero)
+        assert all(b - a >= sm2_fast.WINDOW for a, b in zip(nonzero, nonzero[1:]))
+
+
+def test_scalar_mult_matches_repeated_addition():
+    point = (sm2_fast.GX, sm2_fast.GY)
+    expected = sm2_fast.scalar_mult(sm2_fast.wnaf(1), *point)
+    assert expected == point
+    for k in range(2, 20):
+        jacobian = (sm2_fast._num(sm2_fast.GX), sm2_fast._num(sm2_fast.GY), sm2_fast._num(1))
+        total = jacobian
+        for _ in range(k - 1):
+            total = sm2_fast._add(total, jacobian)
+        assert sm2_fast.scalar_mult(sm2_fast.wnaf(k), *point) == sm2_fast._to_affine(total)
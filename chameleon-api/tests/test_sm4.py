@@ -0,0 +1,92 @@
+"""
+utils/sm4 与加密会话测试：SM4-CBC 两种实现互通、HMAC-SM3 与标准实现一致、会话密文的认证与解密。
+"""
+
+import hashlib
+import hmac
+import secrets
+
+import pytest
+from gmssl import sm4 as gmssl_sm4
+
+from services import crypto_session
+from utils import sm4
+
+
+def gmssl_encrypt(key, iv, plaintext):
+    crypt = gmssl_sm4.CryptSM4()
+    crypt.set_key(key, gmssl_sm4.SM4_ENCRYPT)
+    return crypt.crypt_cbc(iv, plaintext)
+
+
+@pytest.mark.parametrize('length', [0, 1, 15, 16, 17, 100])
+def test_cbc_round_trip_matches_gmssl(length):
+    key, iv, plaintext = secrets.token_bytes(16), secrets.token_bytes(16), secrets.token_bytes(length)
+    ciphertext = sm4.encrypt_cbc(key, iv, plaintext)
+    # 无论使用 cryptography 还是 gmssl，密文与 gmssl 一致 (同为 PKCS#7 填充)
+    assert ciphertext == gmssl_encrypt(key, iv, plaintext)
+    assert sm4.decrypt_cbc(key, iv, ciphertext) == plaintext
+
+
+def test_cbc_rejects_invalid_lengths():
+    key, iv = secrets.token_bytes(16), secrets.token_bytes(16)
+    with pytest.raises(ValueError):
+        sm4.decrypt_cbc(key, iv, b'')
+    with pytest.raises(ValueError):
+        sm4.decrypt_cbc(key, iv, secrets.token_bytes(17))
+    with pytest.raises(ValueError):
+        sm4.decrypt_cbc(key, iv[:8], secrets.token_bytes(16))
+
+
+@pytest.mark.skipif('sm3' not in hashlib.algorithms_available, reason='OpenSSL 未提供 SM3')
+@pytest.mark.parametrize('key_length', [0, 16, 64, 65, 100])
+def test_hmac_sm3_matches_standard_hmac(key_length):
+    key, data = secrets.token_bytes(key_length), secrets.token_bytes(50)
+    assert sm4.hmac_sm3(key, data) == hmac.new(key, data, 'sm3').digest()
+
+
+def test_verify_hmac_sm3():
+    key, data = secrets.token_bytes(16), b'payload'
+    mac = sm4.hmac_sm3(key, data)
+    assert sm4.verify_hmac_sm3(key, data, mac)
+    assert not sm4.verify_hmac_sm3(key, data + b'!', mac)
+    assert not sm4.verify_hmac_sm3(secrets.token_bytes(16), data, mac)
+
+
+@pytest.fixture
+def session():
+    """直接登记一个会话密钥 (跳过 SM2 密钥交换)"""
+    key = secrets.token_bytes(crypto_session.KEY_SIZE)
+    session_id = secrets.token_urlsafe(24)
+    crypto_session.session_cache.set(session_id, {'key': key.hex(), 'owner': None})
+    return session_id, key
+
+
+def session_ciphertext(session_id, key, plaintext):
+    iv = secrets.token_bytes(16)
+    data = sm4.encrypt_cbc(key[:16], iv, plaintext.encode('utf-8'))
+    mac = sm4.hmac_sm3(key[16:], iv + data)
+    return f"{crypto_session.SESSION_PREFIX}{session_id}:{iv.hex()}:{data.hex()}:{mac.hex()}"
+
+
+def test_decrypts_session_prompt(session):
+    ciphertext = session_ciphertext(*session, '把天空换成晚霞')
+    assert crypto_session.decrypt_prompt(ciphertext) == '把天空换成晚霞'
+
+
+def test_rejects_tampered_session_ciphertext(session):
+    prefix, iv, data, mac = session_ciphertext(*session, 'hello').rsplit(':', 3)
+    tampered = f"{prefix}:{iv}:{data[:-2]}{int(data[-2:], 16) ^ 1:02x}:{mac}"
+    with pytest.raises(ValueError, match='认证失败'):
+        crypto_session.decrypt_prompt(tampered)
+
+
+def test_rejects_unknown_session(session):
+    _, key = session
+    with pytest.raises(ValueError, match='不存在'):
+        crypto_session.decrypt_prompt(session_ciphertext('unknown', key, 'hello'))
+
+
+def test_rejects_malformed_session_ciphertext():
+    with pytest.raises(ValueError, match='格式'):
+        crypto_session.decrypt_prompt('sm4:only:three:parts')
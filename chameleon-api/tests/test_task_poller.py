@@ -0,0 +1,77 @@
+"""
+百炼异步任务轮询器测试：任务成功、失败与超时时完成 Future；调用方取消 Future 或单个任务出错时轮询线程继续工作。
+"""
+
+from concurrent.futures import CancelledError
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+
+from services.task_poller import TaskPoller
+
+
+def response(task_status, status_code=HTTPStatus.OK):
+    return SimpleNamespace(status_code=status_code, output=SimpleNamespace(task_status=task_status))
+
+
+class FakeFetch:
+    """按 task_id 返回预设的响应序列，最后一个响应重复返回；值为可调用对象时调用它"""
+
+    def __init__(self, **responses):
+        self.responses = {task_id: list(items) for task_id, items in responses.items()}
+
+    def __call__(self, task_id):
+        items = self.responses[task_id]
+        item = items.pop(0) if len(items) > 1 else items[0]
+        return item() if callable(item) else item
+
+
+def test_task_lifecycle():
+    fetch = FakeFetch(
+        ok=[response('PENDING'), response('RUNNING'), response('SUCCEEDED')],
+        failed=[response('RUNNING'), response('FAILED')],
+        flaky=[response(None, HTTPStatus.SERVICE_UNAVAILABLE), response('SUCCEEDED')],
+        slow=[response('RUNNING')],
+    )
+    poller = TaskPoller(fetch, interval=0.01, timeout=0.5)
+    ok, failed, flaky, slow = (poller.watch(task_id) for task_id in ('ok', 'failed', 'flaky', 'slow'))
+
+    assert ok.result(timeout=5).output.task_status == 'SUCCEEDED'
+    assert flaky.result(timeout=5).output.task_status == 'SUCCEEDED'
+    with pytest.raises(Exception, match='FAILED'):
+        failed.result(timeout=5)
+    with pytest.raises(TimeoutError):
+        slow.result(timeout=5)
+    assert poller.pending_count() == 0
+
+
+def test_cancel_during_poll_does_not_kill_thread():
+    futures = {}
+
+    def cancel_then_succeed():
+        # 模拟调用方在轮询器检查之后、设置结果之前取消
+        futures['cancelled'].cancel()
+        return response('SUCCEEDED')
+
+    running = response('RUNNING')
+    fetch = FakeFetch(cancelled=[running, cancel_then_succeed], ok=[running, running, response('SUCCEEDED')])
+    poller = TaskPoller(fetch, interval=0.01)
+    futures['cancelled'] = poller.watch('cancelled')
+    ok = poller.watch('ok')
+    with pytest.raises(CancelledError):
+        futures['cancelled'].result(timeout=5)
+    assert ok.result(timeout=5).output.task_status == 'SUCCEEDED'
+
+
+def test_unexpected_error_does_not_kill_thread():
+    # 缺少 output 的响应使 _poll_one 抛出 AttributeError
+    broken = SimpleNamespace(status_code=HTTPStatus.OK)
+    running = response('RUNNING')
+    poller = TaskPoller(FakeFetch(broken=[running, broken], ok=[running, running, response('SUCCEEDED')]),
+                        interval=0.01, timeout=0.3)
+    broken_future = poller.watch('broken')
+    ok = poller.watch('ok')
+    assert ok.result(timeout=5).output.task_status == 'SUCCEEDED'
+    with pytest.raises(TimeoutError):
+        broken_future.result(timeout=5)
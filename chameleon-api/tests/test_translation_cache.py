@@ -0,0 +1,75 @@
+"""
+翻译缓存与本地违规词表的交互：词表更新后，此前缓存的译文不再返回；预置的译文须先通过合规检查。
+"""
+
+import json
+
+import pytest
+
+from services import model_service, prefilter, schema
+from services.cache import prompt_key
+
+
+@pytest.fixture
+def blocklist(monkeypatch):
+    schema.migrate()
+    blocked = set()
+
+    def classify(prompt):
+        return 'DISALLOWED' if any(word in prompt for word in blocked) else None
+
+    def no_model_call(payload):
+        raise AssertionError("不应调用模型")
+
+    monkeypatch.setattr(prefilter, 'classify', classify)
+    monkeypatch.setattr(model_service, 'post_chat_completion', no_model_call)
+    return blocked
+
+
+def test_cache_hit_marks_translation_allowed(blocklist):
+    model_service.translation_cache.set(prompt_key('把天空换成晚霞'), 'make the sky a sunset')
+    assert model_service.call_silicon_flow_qwen3('把天空换成晚霞') == 'make the sky a sunset'
+    assert model_service.compliance_cache.get(prompt_key('make the sky a sunset')) == 'ALLOWED'
+
+
+def test_blocklisted_prompt_evicts_cached_translation(blocklist):
+    model_service.translation_cache.set(prompt_key('把背景换成违禁品'), 'replace the background with contraband')
+    model_service.cached_translation('把背景换成违禁品')
+    blocklist.add('违禁品')
+
+    with pytest.raises(PermissionError):
+        model_service.call_silicon_flow_qwen3('把背景换成违禁品')
+    with pytest.raises(PermissionError):
+        model_service.stream_translation('把背景换成违禁品')
+    assert model_service.translation_cache.get(prompt_key('把背景换成违禁品')) is None
+    assert model_service.compliance_cache.get(prompt_key('replace the background with contraband')) is None
+
+
+def test_blocklisted_translation_is_treated_as_miss(blocklist):
+    model_service.translation_cache.set(prompt_key('加一把武器'), 'add a weapon')
+    blocklist.add('weapon')
+
+    assert model_service.cached_translation('加一把武器') == (prompt_key('加一把武器'), None)
+    assert model_service.translation_cache.get(prompt_key('加一把武器')) is None
+
+
+def test_seeded_translations_pass_compliance(blocklist, monkeypatch, tmp_path):
+    checked = []
+
+    def compliance_check_batch(texts):
+        checked.extend(texts)
+        return ['DISALLOWED' if 'weapon' in text else None if 'timeout' in text else 'ALLOWED' for text in texts]
+
+    monkeypatch.setattr(model_service, 'compliance_check_batch', compliance_check_batch)
+    seed = tmp_path / 'seed.jsonl'
+    seed.write_text('\n'.join(json.dumps(entry, ensure_ascii=False) for entry in [
+        {'prompt': '预置：换成雪景', 'en_prompt': 'seeded: make it snowy'},
+        {'prompt': '预置：加一把刀', 'en_prompt': 'seeded: add a weapon'},
+        {'prompt': '预置：检查超时', 'en_prompt': 'seeded: timeout'},
+    ]), encoding='utf-8')
+
+    assert model_service.seed_translation_cache(str(seed)) == (1, 2)
+    assert '预置：换成雪景' in checked and 'seeded: make it snowy' in checked
+    assert model_service.translation_cache.get(prompt_key('预置：换成雪景')) == 'seeded: make it snowy'
+    assert model_service.translation_cache.get(prompt_key('预置：加一把刀')) is None
+    assert model_service.translation_cache.get(prompt_key('预置：检查超时')) is None
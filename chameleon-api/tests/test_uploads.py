@@ -0,0 +1,110 @@
+"""
+上传文件的内容寻址与引用计数：每次上传保留一行记录，内容的引用计数降为 0 时才删除文件。
+"""
+
+import os
+import secrets
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from services import db, expiry_service, image_service, schema
+from services.config import Config
+
+
+class ImmediatePool:
+    """同步执行提交的任务，便于断言删除结果"""
+
+    def submit(self, func, *args):
+        func(*args)
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    schema.migrate()
+    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+    monkeypatch.setattr(Config, 'IMAGE_PREPROCESS_ENABLED', False)
+    monkeypatch.setattr(expiry_service, '_file_pool', ImmediatePool())
+
+
+def png_bytes():
+    output = BytesIO()
+    Image.new('RGB', (8, 8), tuple(secrets.token_bytes(3))).save(output, format='PNG')
+    return output.getvalue()
+
+
+def upload(data, filename, identifier):
+    return image_service.save_temp_image(FileStorage(BytesIO(data), filename=filename), identifier, identifier)
+
+
+def ref_count(content_hash):
+    row = db.get_connection().execute(
+        "SELECT ref_count FROM upload_contents WHERE content_hash = ?", (content_hash,)).fetchone()
+    return row[0] if row else None
+
+
+def age_upload(identifier):
+    with db.transaction() as conn:
+        conn.execute("UPDATE image_uploads SET created_at = '2000-01-01 00:00:00' WHERE phone = ?", (identifier,))
+
+
+def test_extension_follows_content_not_filename(uploads):
+    data = png_bytes()
+    first = upload(data, 'photo.png', 'alice')
+    second = upload(data, 'photo.jpg', 'bob')
+
+    assert first[1] == second[1] and first[1].endswith('.png')
+    assert ref_count(first[3]) == 2
+    owners = db.get_connection().execute(
+        "SELECT phone FROM image_uploads WHERE content_hash = ? ORDER BY phone", (first[3],)).fetchall()
+    assert [row[0] for row in owners] == ['alice', 'bob']
+
+
+def test_rejects_non_image_content(uploads):
+    with pytest.raises(ValueError):
+        upload(b'not an image', 'photo.png', 'mallory')
+
+
+def test_file_removed_when_last_reference_expires(uploads):
+    data = png_bytes()
+    _, file_path, _, content_hash = upload(data, 'a.png', 'carol')
+    upload(data, 'b.png', 'dave')
+
+    age_upload('carol')
+    expiry_service.expire_uploads()
+    assert ref_count(content_hash) == 1
+    assert os.path.exists(file_path)
+
+    age_upload('dave')
+    expiry_service.expire_uploads()
+    assert ref_count(content_hash) is None
+    assert not os.path.exists(file_path)
+
+
+def test_reupload_after_expiry_keeps_file(uploads):
+    data = png_bytes()
+    _, file_path, _, content_hash = upload(data, 'a.png', 'erin')
+    age_upload('erin')
+    expiry_service.expire_uploads()
+    assert not os.path.exists(file_path)
+
+    # 同一内容重新上传后登记新的引用，排队中的删除任务不能再删除文件
+    upload(data, 'a.png', 'frank')
+    expiry_service._remove_file(file_path)
+    assert os.path.exists(file_path)
+    assert ref_count(content_hash) == 1
+
+
+def test_reconcile_skips_referenced_files(uploads, monkeypatch):
+    _, file_path, _, _ = upload(png_bytes(), 'a.png', 'grace')
+    orphan_path = os.path.join(Config.UPLOAD_FOLDER, 'orphan.png')
+    with open(orphan_path, 'wb') as f:
+        f.write(b'orphan')
+    for path in (file_path, orphan_path):
+        os.utime(path, (0, 0))
+
+    expiry_service.reconcile_orphans()
+    assert os.path.exists(file_path)
+    assert not os.path.exists(orphan_path)
@@ -0,0 +1,116 @@
+"""
+大模型输出解析工具模块，从模型返回的文本中稳健地提取 JSON 对象。
+"""
+
+import json
+import re
+
+# Qwen3 等模型可能输出的推理块
+_THINK_RE = re.compile(r'<think>.*?</think>', re.DOTALL | re.IGNORECASE)
+# markdown 代码围栏，如 ```json ... ```
+_FENCE_RE = re.compile(r'```(?:json|JSON)?\s*(.*?)\s*```', re.DOTALL)
+
+
+def parse_json_object(content: str) -> dict:
+    """
+    从模型输出中提取 JSON 对象。
+    依次去除推理块和 markdown 代码围栏，优先整体解析，失败时定位文本中第一个完整的 JSON 对象。
+    :param content: 模型返回的原始文本
+    :return: 解析得到的字典
+    :raises ValueError: 如果文本中不包含可解析的 JSON 对象
+    """
+    if not isinstance(content, str):
+        raise ValueError("模型输出不是文本")
+    text = _THINK_RE.sub('', content).strip()
+    fenced = _FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    elif text.startswith('```'):
+        # 输出被截断，只有起始围栏
+        text = re.sub(r'^```(?:json|JSON)?', '', text).strip()
+
+    try:
+        value = json.loads(text)
+        if isinstance(value, dict):
+            return value
+    except json.JSONDecodeError:
+        pass
+
+    decoder = json.JSONDecoder()
+    start = text.find('{')
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = text.find('{', start + 1)
+    raise ValueError(f"无法从模型输出中解析 JSON 对象: {content[:200]}")
+
+
+class JsonFieldStream:
+    """
+    从模型的流式输出中增量提取某个 JSON 字符串字段的值，字段内容到达即可返回，
+    无需等待完整输出。推理块 (<think>) 中的内容会被跳过。
+    """
+
+    def __init__(self, field: str):
+        self._pattern = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ''
+        self._pos = None  # 字段值在缓冲区中的解析位置，None 表示尚未找到字段
+        self.done = False
+        self.value = ''
+
+    def feed(self, chunk: str) -> str:
+        """
+        追加一段模型输出。
+        :param chunk: 新到达的文本片段
+        :return: 本次新解析出的字段内容 (已处理转义)，没有新内容时返回空字符串
+        :raises ValueError: 如果字段值中包含无效的转义序列
+        """
+        self._buffer += chunk
+        if self.done:
+            return ''
+        if self._pos is None:
+            lowered = self._buffer.lower()
+            think_open, think_close = lowered.rfind('<think>'), lowered.rfind('</think>')
+            if think_open > think_close:
+                return ''  # 推理块尚未结束
+            start = think_close + len('</think>') if think_close != -1 else 0
+            match = self._pattern.search(self._buffer, start)
+            if match is None:
+                return ''
+            self._pos = match.end()
+
+        buffer, i, out = self._buffer, self._pos, []
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self.done = True
+                i += 1
+                break
+            if char != '\\':
+                out.append(char)
+                i += 1
+                continue
+            # 转义序列不完整时等待后续片段
+            if i + 1 >= len(buffer):
+                break
+            if buffer[i + 1] != 'u':
+                length = 2
+            elif i + 6 > len(buffer):
+                break
+            elif 0xD800 <= int(buffer[i + 2:i + 6], 16) < 0xDC00:
+                # UTF-16 代理对需要与后一个 \uXXXX 一起解码
+                if i + 12 > len(buffer):
+                    break
+                length = 12
+            else:
+                length = 6
+            out.append(json.loads(f'"{buffer[i:i + length]}"'))
+            i += length
+        self._pos = i
+        text = ''.join(out)
+        self.value += text
+        return text
@@ -0,0 +1,116 @@
+"""
+进程池工具模块，供 CPU 密集的任务 (图片预处理、SM2 解密) 使用。
+- 支持时使用 forkserver 启动子进程 (不从多线程的服务进程 fork)，并在 forkserver 中预加载任务模块；
+- 子进程在父进程退出后自行退出，父进程正常退出 (含 SIGTERM，见 app.py) 时关闭进程池，不遗留孤儿进程；
+- 子进程崩溃导致进程池不可用 (BrokenProcessPool) 时重建进程池，之后的任务不受影响。
+注意：子进程会以 __mp_main__ 重新导入启动脚本 (如 app.py)，启动脚本在导入时不能执行初始化。
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+_preload = set()
+_preload_lock = threading.Lock()
+
+
+def _context(preload):
+    """
+    获取启动子进程的上下文。forkserver 在首个子进程启动前设置的预加载模块才生效，
+    因此登记的模块会累积，先创建的进程池也会预加载后登记的模块 (如果 forkserver 尚未启动)。
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    with _preload_lock:
+        _preload.update(preload)
+        context.set_forkserver_preload(sorted(_preload))
+    return context
+
+
+def _exit_with_parent():
+    """子进程初始化：父进程退出 (包括被强制结束) 后随之退出"""
+    parent = multiprocessing.parent_process()
+    if parent is None:
+        return
+
+    def watch():
+        parent.join()
+        os._exit(0)
+
+    threading.Thread(target=watch, name='parent-watch', daemon=True).start()
+
+
+class ProcessPool:
+    """
+    懒加载、可自动重建的进程池。
+    :param name: 进程池名称 (日志使用)
+    :param max_workers: 子进程数
+    :param preload: 在 forkserver 中预加载的模块名列表 (通常为任务函数所在模块)
+    """
+
+    def __init__(self, name, max_workers, preload=()):
+        self.name = name
+        self.max_workers = max_workers
+        self.preload = list(preload)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    def _get(self):
+        executor = self._executor
+        if executor is None:
+            with self._lock:
+                executor = self._executor
+                if executor is None:
+                    executor = self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=_context(self.preload),
+                        initializer=_exit_with_parent
+                    )
+                    if not self._atexit_registered:
+                        atexit.register(self.shutdown)
+                        self._atexit_registered = True
+        return executor
+
+    def _reset(self, executor):
+        """丢弃已损坏的进程池，下次提交时重新创建"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        logger.warning(f"{self.name} 进程池已损坏 (子进程异常退出)，将重新创建")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, func, *args, timeout=None):
+        """
+        在进程池中执行函数并等待结果。
+        :raises BrokenProcessPool: 如果执行期间子进程异常退出 (进程池随后重建，本次任务不重试，
+                                   避免导致崩溃的输入反复击垮新的子进程)
+        """
+        executor = self._get()
+        try:
+            future = executor.submit(func, *args)
+        except BrokenProcessPool:
+            # 进程池在本次提交前已损坏，任务尚未执行，重建后提交
+            self._reset(executor)
+            executor = self._get()
+            future = executor.submit(func, *args)
+        try:
+            return future.result(timeout=timeout)
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+
+    def shutdown(self):
+        """关闭进程池 (进程退出时自动调用)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
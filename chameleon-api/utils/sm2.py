@@ -4,10 +4,17 @@ SM2 加密/解密/签名工具模块。
 """
 
 import binascii  # 导入 binascii 用于十六进制转换
+import logging
+import threading
 
 from gmssl import sm2
 
+from services import metrics
 from services.config import Config
+from utils import sm2_fast
+from utils.process_pool import ProcessPool
+
+logger = logging.getLogger(__name__)
 
 # 初始化 SM2 密钥对
 sm2_util = sm2.CryptSM2(
@@ -17,6 +24,80 @@ sm2_util = sm2.CryptSM2(
 )
 
 
+def build_decryptor(backend: str, private_key: str = None, public_key: str = None):
+    """
+    按名称创建解密实现，返回接收密文字节、返回明文字节的函数。
+    :param backend: auto / fast / gmssl
+    :raises ValueError: 如果实现名称未知，或指定 fast 但私钥无效
+    """
+    private_key = private_key or Config.SM2_PRIVATE_KEY
+    public_key = public_key or Config.SM2_PUBLIC_KEY
+    if backend in ('auto', 'fast'):
+        try:
+            # 私钥的预计算在此处完成一次，之后每次解密直接复用
+            return sm2_fast.FastSM2(private_key).decrypt
+        except ValueError:
+            if backend == 'fast':
+                raise
+            logger.warning("SM2 私钥无法用于快速解密实现，回退到 gmssl")
+    elif backend != 'gmssl':
+        raise ValueError(f"未知的 SM2 解密实现: {backend}")
+    if private_key == Config.SM2_PRIVATE_KEY and public_key == Config.SM2_PUBLIC_KEY:
+        return sm2_util.decrypt
+    return sm2.CryptSM2(public_key=public_key, private_key=private_key, mode=1).decrypt
+
+
+_decrypt = None
+_decrypt_lock = threading.Lock()
+_inflight = 0
+_inflight_lock = threading.Lock()
+
+# SM2 解密进程池，并发解密较多时分担 CPU，避免请求线程争用 GIL
+process_pool = ProcessPool('SM2 解密', Config.SM2_PROCESS_WORKERS, preload=[__name__])
+
+
+def get_decryptor():
+    """
+    获取按 SM2_BACKEND 选定的解密实现 (懒加载，首次解密时完成私钥预计算，导入本模块没有额外开销)。
+    """
+    global _decrypt
+    if _decrypt is None:
+        with _decrypt_lock:
+            if _decrypt is None:
+                _decrypt = build_decryptor(Config.SM2_BACKEND)
+    return _decrypt
+
+
+def _decrypt_in_worker(ciphertext_bytes: bytes) -> bytes:
+    """进程池中执行的解密 (子进程按相同配置创建解密实现)"""
+    return get_decryptor()(ciphertext_bytes)
+
+
+@metrics.register_collector
+def _collect_inflight():
+    return [('chameleon_sm2_decrypts_in_flight', 'gauge', '进行中的 SM2 解密数 (启用进程池时统计)', [({}, _inflight)])]
+
+
+@metrics.timed('decrypt_sm2')
+def decrypt_bytes(ciphertext_bytes: bytes) -> bytes:
+    """
+    解密密文字节；并发解密数超过 SM2_OFFLOAD_THRESHOLD 时转交进程池执行。
+    """
+    global _inflight
+    if Config.SM2_PROCESS_WORKERS <= 0:
+        return get_decryptor()(ciphertext_bytes)
+    with _inflight_lock:
+        _inflight += 1
+        offload = _inflight > Config.SM2_OFFLOAD_THRESHOLD
+    try:
+        if offload:
+            return process_pool.run(_decrypt_in_worker, ciphertext_bytes)
+        return get_decryptor()(ciphertext_bytes)
+    finally:
+        with _inflight_lock:
+            _inflight -= 1
+
+
 def encrypt_data(plaintext: str) -> str:
     """
     使用SM2公钥加密数据。
@@ -46,7 +127,7 @@ def decrypt_data(ciphertext_hex: str) -> str:
         # 将十六进制字符串转换回 bytes
         ciphertext_bytes = bytes.fromhex(ciphertext_hex)  # 使用 bytes.fromhex()
         # SM2解密 (返回 bytes)
-        decrypted_bytes = sm2_util.decrypt(ciphertext_bytes)
+        decrypted_bytes = decrypt_bytes(ciphertext_bytes)
         # 转换为字符串
         decrypted_text = decrypted_bytes.decode('utf-8')
         return decrypted_text
@@ -0,0 +1,195 @@
+"""
+SM2 快速解密实现：以整数运算代替 gmssl 的十六进制字符串运算，
+使用 Jacobian 坐标 (a = -3 优化的倍点公式) 与私钥预先计算的 wNAF 表示完成标量乘法。
+安装 gmpy2 时自动使用其原生大整数运算。
+"""
+
+import hashlib
+
+from gmssl import sm3
+
+try:
+    import gmpy2
+except ImportError:  # 可选依赖
+    gmpy2 = None
+
+# SM2 推荐曲线参数 (GB/T 32918.5)
+P = 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00000000FFFFFFFFFFFFFFFF
+A = 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF00000000FFFFFFFFFFFFFFFC
+B = 0x28E9FA9E9D9F5E344D5A9E4BCF6509A7F39789F515AB8F92DDBCBD414D940E93
+N = 0xFFFFFFFEFFFFFFFFFFFFFFFFFFFFFFFF7203DF6B21C6052B53BBF40939D54123
+GX = 0x32C4AE2C1F1981195F9904466A39C9948FE30BBFF2660BE1715A4589334C74C7
+GY = 0xBC3736A2F4F6779C59BDCEE36B692153D0A9877CC62A474002DF32E52139F0A0
+
+WINDOW = 4  # wNAF 窗口宽度，预计算 2^(WINDOW-2) 个奇数倍点
+
+NATIVE = gmpy2 is not None
+_num = gmpy2.mpz if NATIVE else int
+
+
+def _invert(value):
+    if NATIVE:
+        return gmpy2.invert(value, P)
+    return pow(value, -1, P)
+
+
+if 'sm3' in hashlib.algorithms_available:
+    def sm3_hash(data: bytes) -> bytes:
+        return hashlib.new('sm3', data).digest()
+else:
+    def sm3_hash(data: bytes) -> bytes:
+        return bytes.fromhex(sm3.sm3_hash(list(data)))
+
+
+def kdf(z: bytes, klen: int) -> bytes:
+    """
+    SM2 密钥派生函数 (基于 SM3)。
+    """
+    out = bytearray()
+    counter = 1
+    while len(out) < klen:
+        out += sm3_hash(z + counter.to_bytes(4, 'big'))
+        counter += 1
+    return bytes(out[:klen])
+
+
+def _double(point):
+    """Jacobian 坐标倍点 (a = -3)"""
+    x, y, z = point
+    if not y:
+        return (_num(1), _num(1), _num(0))
+    zz = z * z % P
+    m = 3 * (x - zz) * (x + zz) % P
+    yy = y * y % P
+    s = 4 * x * yy % P
+    x3 = (m * m - 2 * s) % P
+    y3 = (m * (s - x3) - 8 * yy * yy) % P
+    z3 = 2 * y * z % P
+    return (x3, y3, z3)
+
+
+def _add(p1, p2):
+    """Jacobian 坐标点加"""
+    x1, y1, z1 = p1
+    x2, y2, z2 = p2
+    if not z1:
+        return p2
+    if not z2:
+        return p1
+    z1z1 = z1 * z1 % P
+    z2z2 = z2 * z2 % P
+    u1 = x1 * z2z2 % P
+    u2 = x2 * z1z1 % P
+    s1 = y1 * z2 * z2z2 % P
+    s2 = y2 * z1 * z1z1 % P
+    h = (u2 - u1) % P
+    r = (s2 - s1) % P
+    if not h:
+        return _double(p1) if not r else (_num(1), _num(1), _num(0))
+    hh = h * h % P
+    hhh = h * hh % P
+    v = u1 * hh % P
+    x3 = (r * r - hhh - 2 * v) % P
+    y3 = (r * (v - x3) - s1 * hhh) % P
+    z3 = h * z1 * z2 % P
+    return (x3, y3, z3)
+
+
+def _negate(point):
+    x, y, z = point
+    return (x, (-y) % P, z)
+
+
+def _to_affine(point):
+    x, y, z = point
+    if not z:
+        raise ValueError("结果为无穷远点")
+    z_inv = _invert(z)
+    z_inv2 = z_inv * z_inv % P
+    return int(x * z_inv2 % P), int(y * z_inv2 * z_inv % P)
+
+
+def wnaf(k: int, width: int = WINDOW):
+    """
+    计算标量的 wNAF 表示 (低位在前)，非零位均为奇数且相邻非零位至少间隔 width-1 个零。
+    """
+    digits = []
+    while k:
+        if k & 1:
+            digit = k % (1 << width)
+            if digit >= 1 << (width - 1):
+                digit -= 1 << width
+            k -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        k >>= 1
+    return digits
+
+
+def scalar_mult(digits, x: int, y: int):
+    """
+    使用预先计算的 wNAF 表示计算 k·(x, y)。
+    :return: 仿射坐标 (x, y)
+    """
+    base = (_num(x), _num(y), _num(1))
+    twice = _double(base)
+    # 奇数倍点表：table[i] = (2i+1)·P
+    table = [base]
+    for _ in range((1 << (WINDOW - 2)) - 1):
+        table.append(_add(table[-1], twice))
+    result = (_num(1), _num(1), _num(0))
+    for digit in reversed(digits):
+        result = _double(result)
+        if digit > 0:
+            result = _add(result, table[digit >> 1])
+        elif digit < 0:
+            result = _add(result, _negate(table[(-digit) >> 1]))
+    return _to_affine(result)
+
+
+def is_on_curve(x: int, y: int) -> bool:
+    return 0 <= x < P and 0 <= y < P and (y * y - x * x * x - A * x - B) % P == 0
+
+
+class FastSM2:
+    """
+    固定私钥的 SM2 解密上下文：私钥的 wNAF 表示在创建时计算一次，之后每次解密只需一次标量乘法。
+    密文格式与 gmssl (mode=1, C1C3C2) 相同：C1 为 64 字节的 x||y (无 04 前缀)。
+    """
+
+    def __init__(self, private_key_hex: str):
+        self._digits = wnaf(int(private_key_hex, 16))
+
+    def public_key(self) -> str:
+        """由私钥计算公钥 (十六进制 x||y)，用于生成测试密钥与自检"""
+        k = 0
+        for digit in reversed(self._digits):
+            k = 2 * k + digit
+        x, y = scalar_mult(wnaf(k), GX, GY)
+        return f"{x:064x}{y:064x}"
+
+    def decrypt(self, ciphertext: bytes) -> bytes:
+        """
+        :param ciphertext: C1 (64 字节) || C3 (32 字节) || C2
+        :return: 明文字节
+        :raises ValueError: 如果密文格式错误或完整性校验失败
+        """
+        if len(ciphertext) <= 96:
+            raise ValueError("密文长度不足")
+        x1 = int.from_bytes(ciphertext[:32], 'big')
+        y1 = int.from_bytes(ciphertext[32:64], 'big')
+        # 拒绝不在曲线上的 C1，防止无效曲线攻击
+        if not is_on_curve(x1, y1):
+            raise ValueError("C1 不是曲线上的点")
+        c3, c2 = ciphertext[64:96], ciphertext[96:]
+
+        x2, y2 = scalar_mult(self._digits, x1, y1)
+        x2_bytes, y2_bytes = x2.to_bytes(32, 'big'), y2.to_bytes(32, 'big')
+        t = kdf(x2_bytes + y2_bytes, len(c2))
+        if not any(t):
+            raise ValueError("密钥派生结果全为零")
+        message = bytes(a ^ b for a, b in zip(c2, t))
+        if sm3_hash(x2_bytes + message + y2_bytes) != c3:
+            raise ValueError("密文完整性校验失败")
+        return message
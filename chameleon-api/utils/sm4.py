@@ -0,0 +1,68 @@
+"""
+SM4 对称加密工具模块 (CBC 模式 + PKCS#7 填充)，以及 HMAC-SM3 消息认证。
+安装 cryptography 时使用其 OpenSSL 实现，否则回退到 gmssl。
+"""
+
+import hmac
+
+from gmssl import sm4
+
+from utils.sm2_fast import sm3_hash
+
+try:
+    from cryptography.hazmat.primitives import padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:  # 可选依赖
+    Cipher = None
+
+BLOCK_SIZE = 16
+_HMAC_BLOCK_SIZE = 64  # SM3 分组长度
+
+
+def hmac_sm3(key: bytes, data: bytes) -> bytes:
+    """
+    计算 HMAC-SM3 (RFC 2104)。
+    """
+    if len(key) > _HMAC_BLOCK_SIZE:
+        key = sm3_hash(key)
+    key = key.ljust(_HMAC_BLOCK_SIZE, b'\x00')
+    inner = sm3_hash(bytes(b ^ 0x36 for b in key) + data)
+    return sm3_hash(bytes(b ^ 0x5c for b in key) + inner)
+
+
+def verify_hmac_sm3(key: bytes, data: bytes, mac: bytes) -> bool:
+    """
+    以常量时间比较校验 HMAC-SM3。
+    """
+    return hmac.compare_digest(hmac_sm3(key, data), mac)
+
+
+def encrypt_cbc(key: bytes, iv: bytes, plaintext: bytes) -> bytes:
+    """
+    使用 SM4-CBC 加密数据 (PKCS#7 填充)。
+    """
+    if Cipher is not None:
+        padder = padding.PKCS7(BLOCK_SIZE * 8).padder()
+        padded = padder.update(plaintext) + padder.finalize()
+        encryptor = Cipher(algorithms.SM4(key), modes.CBC(iv)).encryptor()
+        return encryptor.update(padded) + encryptor.finalize()
+    crypt = sm4.CryptSM4()
+    crypt.set_key(key, sm4.SM4_ENCRYPT)
+    return crypt.crypt_cbc(iv, plaintext)
+
+
+def decrypt_cbc(key: bytes, iv: bytes, ciphertext: bytes) -> bytes:
+    """
+    使用 SM4-CBC 解密数据并去除 PKCS#7 填充。
+    :raises ValueError: 如果密文长度或填充无效
+    """
+    if not ciphertext or len(ciphertext) % BLOCK_SIZE or len(iv) != BLOCK_SIZE:
+        raise ValueError("SM4 密文或 IV 长度无效")
+    if Cipher is not None:
+        decryptor = Cipher(algorithms.SM4(key), modes.CBC(iv)).decryptor()
+        padded = decryptor.update(ciphertext) + decryptor.finalize()
+        unpadder = padding.PKCS7(BLOCK_SIZE * 8).unpadder()
+        return unpadder.update(padded) + unpadder.finalize()
+    crypt = sm4.CryptSM4()
+    crypt.set_key(key, sm4.SM4_DECRYPT)
+    return crypt.crypt_cbc(iv, ciphertext)
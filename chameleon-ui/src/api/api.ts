@@ -16,3 +16,45 @@ export const alovaInstance = createAlova({
     }
   }
 });
+
+// 以 POST 发起 SSE 请求并逐条回调服务端事件 (EventSource 不支持 POST 和自定义请求头)
+export const postEventStream = async (
+  url: string,
+  body: unknown,
+  headers: Record<string, string>,
+  onEvent: (event: string, data: any) => void
+): Promise<void> => {
+  const response = await fetch(`${apiBaseUrl}${url}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream', ...headers },
+    body: JSON.stringify(body)
+  });
+  const contentType = response.headers.get('Content-Type') || '';
+  if (!contentType.includes('text/event-stream') || !response.body) {
+    // 开始推送前失败 (如会话过期、内容不合规) 时返回普通 JSON
+    const data = await response.json();
+    onEvent(data.error ? 'error' : 'done', data);
+    return;
+  }
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      const dataLines: string[] = [];
+      for (const line of frame.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+      }
+      if (dataLines.length) onEvent(event, JSON.parse(dataLines.join('\n')));
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+};
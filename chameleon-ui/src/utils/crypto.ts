@@ -1,6 +1,6 @@
 // src/utils/crypto.ts
 
-import { sm2 } from 'sm-crypto-v2';
+import { sm2, sm3, sm4 } from 'sm-crypto-v2';
 
 // 从后端获取或配置公钥
 const SM2_PUBLIC_KEY: string = "04535ae65ad7809a9600fa58ca27cda8785dfb964f566d61365d64f3b4307208a42cf5202aa0e7f163216c69f37f0e71287d573d88351bc794dba78d5e6abc2bd8"; // 替换为实际公钥
@@ -25,6 +25,50 @@ export function encryptData(plaintext: string, publicKey: string): string | null
     }
 }
 
+// 加密会话：一次 SM2 密钥交换后，提示词使用 SM4-CBC 加密并附带 HMAC-SM3
+export interface CryptoSession {
+    id: string;
+    key: string; // 64 位十六进制：前 16 字节为 SM4 密钥，后 16 字节为 HMAC 密钥
+    expiresAt: number;
+}
+
+const SESSION_PREFIX = 'sm4:';
+
+function randomHex(bytes: number): string {
+    const buffer = new Uint8Array(bytes);
+    crypto.getRandomValues(buffer);
+    return Array.from(buffer, b => b.toString(16).padStart(2, '0')).join('');
+}
+
+function hexToBytes(hex: string): Uint8Array {
+    const bytes = new Uint8Array(hex.length / 2);
+    for (let i = 0; i < bytes.length; i++) {
+        bytes[i] = parseInt(hex.substr(i * 2, 2), 16);
+    }
+    return bytes;
+}
+
+// 生成会话密钥 (十六进制)，SM2 加密后提交到 /api/crypto/session
+export function generateSessionKey(): string {
+    return randomHex(32);
+}
+
+export function sessionEncrypt(plaintext: string, session: CryptoSession): string | null {
+    if (!plaintext || !session) {
+        console.error("Missing plaintext or session for encryption");
+        return null;
+    }
+    try {
+        const iv = randomHex(16);
+        const ciphertext = sm4.encrypt(plaintext, session.key.slice(0, 32), { mode: 'cbc', iv });
+        const mac = sm3(hexToBytes(iv + ciphertext), { key: session.key.slice(32) });
+        return `${SESSION_PREFIX}${session.id}:${iv}:${ciphertext}:${mac}`;
+    } catch (err) {
+        console.error("Session encryption error:", err);
+        return null;
+    }
+}
+
 export function decryptData(ciphertextHex: string, privateKey: string): string | null {
     if (!ciphertextHex || !privateKey) {
         console.error("Missing ciphertext or privateKey for decryption");